@@ -11,13 +11,14 @@ import random
 from dotenv import load_dotenv
 from itertools import combinations
 from typing import Optional
+from time import monotonic  # the /time command's handler takes the name `time`
 import re
 import datetime
 import asyncio
 import glob
 from discord.ui import Button, View
 import pytz
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, ImageChops
 # Removed pilmoji import due to dependency issues 
 import io
 import json
@@ -25,49 +26,108 @@ from pathlib import Path
 import requests
 import requests
 import tempfile
+import threading
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import dataclasses
+import bisect
+import gzip
+import hashlib
+import signal
 import gspread
 from google.oauth2.service_account import Credentials
 import firebase_admin
 from firebase_admin import credentials, firestore
 
 # Firebase Configuration
-try:
-    if not firebase_admin._apps:
-        if os.environ.get("FIREBASE_CREDENTIALS"):
-            # Load from raw JSON string Environment Variable instead of a complicated file mount
-            cred_dict = json.loads(os.environ.get("FIREBASE_CREDENTIALS"))
-            cred = credentials.Certificate(cred_dict)
-            firebase_admin.initialize_app(cred)
-            db = firestore.client()
-            print("✅ Connected to Firebase Firestore (via Env Var)")
-        elif os.path.exists('firebase_credentials.json'):
-            cred = credentials.Certificate('firebase_credentials.json')
-            firebase_admin.initialize_app(cred)
-            db = firestore.client()
-            print("✅ Connected to Firebase Firestore (via File)")
-        else:
-            print("⚠️ Firebase credentials not found (JSON file or Env Var missing). Firebase disabled.")
+# Connecting takes a while, so it happens in a worker thread after login (see
+# TournamentBot.start_services) instead of at import time.
+db = None
+firebase_ready = threading.Event()  # set once the connection attempt has finished, whatever the outcome
+_firebase_lock = threading.Lock()
+
+def firebase_configured() -> bool:
+    """Whether Firebase credentials are available, without connecting"""
+    return bool(firebase_admin._apps or os.environ.get("FIREBASE_CREDENTIALS")
+                or os.path.exists('firebase_credentials.json'))
+
+def connect_firebase():
+    """Blocking: initialize Firebase once and return the Firestore client, or None.
+    Callers arriving while the first attempt runs wait for it."""
+    global db
+    with _firebase_lock:
+        if firebase_ready.is_set():
+            return db
+        try:
+            if not firebase_admin._apps:
+                if os.environ.get("FIREBASE_CREDENTIALS"):
+                    # Load from raw JSON string Environment Variable instead of a complicated file mount
+                    cred_dict = json.loads(os.environ.get("FIREBASE_CREDENTIALS"))
+                    cred = credentials.Certificate(cred_dict)
+                    firebase_admin.initialize_app(cred)
+                    db = firestore.client()
+                    print("✅ Connected to Firebase Firestore (via Env Var)")
+                elif os.path.exists('firebase_credentials.json'):
+                    cred = credentials.Certificate('firebase_credentials.json')
+                    firebase_admin.initialize_app(cred)
+                    db = firestore.client()
+                    print("✅ Connected to Firebase Firestore (via File)")
+                else:
+                    print("⚠️ Firebase credentials not found (JSON file or Env Var missing). Firebase disabled.")
+                    db = None
+            else:
+                db = firestore.client()
+                print("✅ Connected to Firebase Firestore")
+        except Exception as e:
+            print(f"❌ Firebase initialization error: {e}")
             db = None
-    else:
-        db = firestore.client()
-        print("✅ Connected to Firebase Firestore")
-except Exception as e:
-    print(f"❌ Firebase initialization error: {e}")
-    db = None
+        finally:
+            firebase_ready.set()
+        return db
 
 # Google Sheets Configuration
 GOOGLE_SHEET_ID = "1i8yWJhe-T4cYQtrzfp4HcqH8UmndDi8yydWnMYDfcMI"  # Replace with your actual Sheet ID if different
 SERVICE_ACCOUNT_FILE = "service_account.json"
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
 
+# Event Details columns (1-based) written after the row is created
+EVENT_SHEET_COLUMNS = {"judge": 9, "recorder": 10, "winner": 11, "score": 12, "remarks": 13}
+
 class GoogleSheetManager:
+    """Google Sheet logging. Handlers only queue operations; the persistence worker sends
+    them in a thread as one append_rows per worksheet plus one batch_update of cells.
+
+    row_index maps event ID -> Event Details row number. It is filled from the rows our
+    own appends report, and rebuilt from one read of column A when an event is missing.
+    Before each batch_update the targeted rows' event IDs are read back (one call), so a
+    sheet sorted or with rows deleted by hand rebuilds the index instead of being
+    written into the wrong rows.
+
+    connect() runs in a worker thread after login and sets ready once it has finished.
+    """
+
     def __init__(self):
         self.client = None
+        self.spreadsheet = None
         self.event_sheet = None
         self.attendance_sheet = None
-        self.connect()
+        self.pending = []  # queued operations, oldest first
+        self.api_calls = 0
+        self.row_index = {}
+        self.ready = threading.Event()
+        self._connect_lock = threading.Lock()
 
     def connect(self):
+        """Blocking: authorize and open the worksheets; only the first call does anything"""
+        with self._connect_lock:
+            if self.ready.is_set():
+                return
+            try:
+                self._open()
+            finally:
+                self.ready.set()
+
+    def _open(self):
         try:
             if os.path.exists(SERVICE_ACCOUNT_FILE):
                 credentials = Credentials.from_service_account_file(
@@ -75,7 +135,7 @@ class GoogleSheetManager:
                 )
                 self.client = gspread.authorize(credentials)
                 # Open specific worksheets
-                sheet = self.client.open_by_key(GOOGLE_SHEET_ID)
+                sheet = self.spreadsheet = self.client.open_by_key(GOOGLE_SHEET_ID)
                 try:
                     self.event_sheet = sheet.worksheet("Event Details")
                 except:
@@ -94,76 +154,227 @@ class GoogleSheetManager:
         except Exception as e:
             print(f"❌ Error connecting to Google Sheet: {e}")
 
+    def _queue(self, operation: dict):
+        self.pending.append(operation)
+        request_save("sheets")
+
     def log_event_creation(self, event_data):
         if not self.event_sheet: return
-        try:
-            # Columns: EventID, Tournament, Mode, Round, Team1, Team2, Date, Time, Judge, Recorder, Winner, Score, Remarks
-            row = [
-                event_data['event_id'],
-                event_data['tournament'],
-                event_data.get('mode', 'MW'),
-                event_data['round'],
-                event_data['team1_captain'].name,
-                event_data['team2_captain'].name,
-                event_data['date_str'],
-                event_data['time_str'],
-                "Unassigned", # Judge
-                "Unassigned", # Recorder
-                "Pending", # Winner
-                "Pending",  # Score/Result
-                "" # Remarks
-            ]
-            self.event_sheet.append_row(row)
-        except Exception as e:
-            print(f"Error logging event to sheet: {e}")
+        # Columns: EventID, Tournament, Mode, Round, Team1, Team2, Date, Time, Judge, Recorder, Winner, Score, Remarks
+        row = [
+            event_data['id'],
+            event_data['tournament'],
+            event_data.get('mode', 'MW'),
+            event_data['round'],
+            event_data['team1_name'],
+            event_data['team2_name'],
+            event_data['date_str'],
+            event_data['time_str'],
+            "Unassigned", # Judge
+            "Unassigned", # Recorder
+            "Pending", # Winner
+            "Pending",  # Score/Result
+            "" # Remarks
+        ]
+        self._queue({'op': 'append', 'sheet': 'event_sheet', 'row': row})
 
     def update_event_staff(self, event_id, judge_name=None, recorder_name=None):
         if not self.event_sheet: return
-        try:
-            cell = self.event_sheet.find(event_id)
-            if cell:
-                if judge_name:
-                    self.event_sheet.update_cell(cell.row, 9, judge_name) # Column 9 (I) is Judge
-                if recorder_name:
-                    self.event_sheet.update_cell(cell.row, 10, recorder_name) # Column 10 (J) is Recorder
-        except Exception as e:
-            print(f"Error updating staff in sheet: {e}")
+        cells = {}
+        if judge_name:
+            cells[EVENT_SHEET_COLUMNS["judge"]] = judge_name
+        if recorder_name:
+            cells[EVENT_SHEET_COLUMNS["recorder"]] = recorder_name
+        if cells:
+            self._queue({'op': 'update', 'sheet': 'event_sheet', 'event_id': event_id, 'cells': list(cells.items())})
 
     def log_event_result(self, event_id, winner_name, score_text, remarks):
         if not self.event_sheet: return
-        try:
-            cell = self.event_sheet.find(event_id)
-            if cell:
-                self.event_sheet.update_cell(cell.row, 11, winner_name) # Column 11 (K) Winner
-                self.event_sheet.update_cell(cell.row, 12, score_text)  # Column 12 (L) Score
-                # Column 13 (M) Remarks
-                if remarks:
-                    self.event_sheet.update_cell(cell.row, 13, remarks)
-        except Exception as e:
-            print(f"Error logging result to sheet: {e}")
+        cells = {EVENT_SHEET_COLUMNS["winner"]: winner_name, EVENT_SHEET_COLUMNS["score"]: score_text}
+        if remarks:
+            cells[EVENT_SHEET_COLUMNS["remarks"]] = remarks
+        self._queue({'op': 'update', 'sheet': 'event_sheet', 'event_id': event_id, 'cells': list(cells.items())})
 
     def log_attendance(self, date_str, time_str, event_name, role, staff_name, marked_by):
-        if not self.attendance_sheet: return
+        """Queue an attendance row and return it"""
+        # Columns based on assumption: Date, Time, Event Name, Judge Name, Recorder Name, Marked By
+        # We map inputs to these columns.
+        judge_val = staff_name if role.lower() == "judge" else ""
+        recorder_val = staff_name if role.lower() == "recorder" else ""
+        
+        row = [
+            date_str,
+            time_str,
+            event_name,
+            judge_val,
+            recorder_val,
+            marked_by
+        ]
+        if self.attendance_sheet:
+            self._queue({'op': 'append', 'sheet': 'attendance_sheet', 'row': row})
+        return row
+
+    def take_pending(self) -> list:
+        operations, self.pending = self.pending, []
+        return operations
+
+    def requeue(self, operations: list):
+        """Put operations that weren't sent back in front of newer ones"""
+        self.pending[:0] = operations
+
+    def send(self, operations: list):
+        """Blocking: send queued operations, removing each group from the list once it
+        has been written so a failure leaves only the unsent ones behind.
+
+        Appends go first so updates can find rows created in the same flush.
+        """
+        for sheet_name in ('event_sheet', 'attendance_sheet'):
+            rows = [op['row'] for op in operations if op['op'] == 'append' and op['sheet'] == sheet_name]
+            if rows and getattr(self, sheet_name) is None:
+                # Queued by an earlier run whose worksheet is gone; there is nowhere to send them
+                print(f"⚠️ Dropping {len(rows)} queued row(s): {sheet_name} is not connected")
+                operations[:] = [op for op in operations if not (op['op'] == 'append' and op['sheet'] == sheet_name)]
+            elif rows:
+                response = getattr(self, sheet_name).append_rows(rows)
+                self.api_calls += 1
+                operations[:] = [op for op in operations if not (op['op'] == 'append' and op['sheet'] == sheet_name)]
+                if sheet_name == 'event_sheet':
+                    self._index_appended(rows, response)
+
+        updates = [op for op in operations if op['op'] == 'update']
+        if not updates:
+            return
+        if not self.event_sheet:
+            print(f"⚠️ Dropping {len(updates)} queued update(s): event_sheet is not connected")
+            operations.clear()
+            return
+        # Later updates to the same cell win
+        cells = {}
+        for op in updates:
+            for column, value in op['cells']:
+                cells[(op['event_id'], column)] = value
+        event_ids = {event_id for event_id, _ in cells}
+        if any(event_id not in self.row_index for event_id in event_ids):
+            self.rebuild_row_index()
+        elif not self._rows_hold(event_ids):
+            print("⚠️ Event Details rows were moved, re-reading the event IDs")
+            self.rebuild_row_index()
+        data = []
+        for (event_id, column), value in cells.items():
+            if event_id not in self.row_index:
+                print(f"⚠️ Event {event_id} not found in sheet, skipping update")
+                continue
+            data.append({'range': gspread.utils.rowcol_to_a1(self.row_index[event_id], column), 'values': [[value]]})
+        if data:
+            self.event_sheet.batch_update(data)
+            self.api_calls += 1
+        operations.clear()
+
+    def _rows_hold(self, event_ids: set) -> bool:
+        """Blocking: whether the indexed rows still hold these events, reading column A of
+        just those rows in one call"""
+        event_ids = sorted(event_ids)
+        values = self.event_sheet.batch_get([f"A{self.row_index[event_id]}" for event_id in event_ids])
+        self.api_calls += 1
+        return all(cell_range and cell_range[0] and cell_range[0][0] == event_id
+                   for event_id, cell_range in zip(event_ids, values))
+
+    def _index_appended(self, rows: list, response):
+        """Index appended event rows from the range the append reports, e.g. 'Event Details'!A12:M13"""
         try:
-            # Columns based on assumption: Date, Time, Event Name, Judge Name, Recorder Name, Marked By
-            # We map inputs to these columns.
-            judge_val = staff_name if role.lower() == "judge" else ""
-            recorder_val = staff_name if role.lower() == "recorder" else ""
-            
-            row = [
-                date_str,
-                time_str,
-                event_name,
-                judge_val,
-                recorder_val,
-                marked_by
-            ]
-            self.attendance_sheet.append_row(row)
-        except Exception as e:
-            print(f"Error logging attendance to sheet: {e}")
-            
+            updated_range = response['updates']['updatedRange']
+            first_row = int(re.search(r'!\D*(\d+)', updated_range).group(1))
+        except (TypeError, KeyError, AttributeError):
+            # Unknown row numbers: the next lookup misses and rebuilds the index
+            return
+        for offset, row in enumerate(rows):
+            self.row_index[row[0]] = first_row + offset
+
+    def rebuild_row_index(self):
+        """Blocking: re-read the event ID column (one API call) and index every row"""
+        event_ids = self.event_sheet.col_values(1)
+        self.api_calls += 1
+        self.row_index = {}
+        for number, event_id in enumerate(event_ids, start=1):
+            if event_id:
+                # Like find(), the first row with the ID wins
+                self.row_index.setdefault(event_id, number)
+
+    def reconcile(self, event_rows: list, attendance_rows: list) -> dict:
+        """Blocking: make the sheets match the expected rows with as few API calls as possible.
+
+        Both worksheets are read with one batch get. Event Details rows are matched on event
+        ID: missing ones are appended, differing cells rewritten in one batch_update (None
+        in an expected row means "don't know, leave it"). Attendance rows are matched on
+        event name, judge and recorder, and only missing ones appended. Rows that aren't
+        expected are left alone.
+        """
+        calls_before = self.api_calls
+        sheets = [self.event_sheet] + ([self.attendance_sheet] if self.attendance_sheet else [])
+        response = self.spreadsheet.values_batch_get([f"'{sheet.title}'!A:M" for sheet in sheets])
+        self.api_calls += 1
+        ranges = [value_range.get('values', []) for value_range in response.get('valueRanges', [])]
+        current_events = ranges[0] if ranges else []
+        current_attendance = ranges[1] if len(ranges) > 1 else []
+
+        self.row_index = {}
+        for number, row in enumerate(current_events, start=1):
+            if row and row[0]:
+                self.row_index.setdefault(row[0], number)
+
+        report = {'checked': len(event_rows), 'rows_updated': 0, 'cells_updated': 0,
+                  'events_appended': 0, 'attendance_appended': 0}
+        data, missing = [], []
+        for expected in event_rows:
+            number = self.row_index.get(expected[0])
+            if number is None:
+                missing.append(["" if value is None else value for value in expected])
+                continue
+            current = current_events[number - 1]
+            changed = 0
+            for column, value in enumerate(expected, start=1):
+                if value is None:
+                    continue
+                if (current[column - 1] if column <= len(current) else "") != str(value):
+                    data.append({'range': gspread.utils.rowcol_to_a1(number, column), 'values': [[value]]})
+                    changed += 1
+            if changed:
+                report['rows_updated'] += 1
+                report['cells_updated'] += changed
+        if data:
+            self.event_sheet.batch_update(data)
+            self.api_calls += 1
+        if missing:
+            self._index_appended(missing, self.event_sheet.append_rows(missing))
+            self.api_calls += 1
+            report['events_appended'] = len(missing)
+
+        if self.attendance_sheet:
+            logged = {}
+            for row in current_attendance[1:]:
+                row = row + [""] * (5 - len(row))
+                key = (row[2], row[3], row[4])
+                logged[key] = logged.get(key, 0) + 1
+            missing = []
+            for row in attendance_rows:
+                key = (row[2], row[3], row[4])
+                if logged.get(key):
+                    logged[key] -= 1
+                else:
+                    missing.append(row)
+            if missing:
+                self.attendance_sheet.append_rows(missing)
+                self.api_calls += 1
+                report['attendance_appended'] = len(missing)
+
+        report['api_calls'] = self.api_calls - calls_before
+        return report
+
     def erase_sheets(self):
         """Clears out all rows except the headers to prepare for a new tournament."""
+        # Queued rows belong to the tournament being wiped
+        self.pending.clear()
+        self.row_index = {}
         if self.event_sheet:
             try:
                 # Get total rows to ensure we clear enough
@@ -227,11 +438,1212 @@ intents.members = True
 intents.guilds = True
 intents.guild_messages = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class TournamentTree(app_commands.CommandTree):
+    """Command tree that turns commands away until startup has loaded the bot's data"""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if self.client.data_ready.is_set():
+            return True
+        if interaction.type is discord.InteractionType.autocomplete:
+            # Autocomplete can't carry a message; offer nothing until the data is loaded
+            await interaction.response.autocomplete([])
+            return False
+        await interaction.response.send_message(
+            "⏳ The bot is still starting up. Please try again in a few seconds.", ephemeral=True
+        )
+        return False
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.CheckFailure) and not self.client.data_ready.is_set():
+            return  # already answered by interaction_check
+        await super().on_error(interaction, error)
+
+
+class TournamentBot(commands.Bot):
+    """Bot that starts the background persistence worker and flushes it on shutdown.
+
+    Firebase and Google Sheets are connected in worker threads after login, alongside
+    the gateway connect, and the data is loaded once they are up. data_ready is set
+    when commands can be served.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, tree_cls=TournamentTree, **kwargs)
+        self.data_ready = asyncio.Event()
+        self.startup_task = None
+
+    async def setup_hook(self):
+        persistence_queue.start()
+        # Railway and Docker stop the bot with SIGTERM: close cleanly so queued saves get flushed
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.request_close)
+        except (NotImplementedError, RuntimeError):
+            pass  # no signal handlers on Windows event loops
+        self.startup_task = asyncio.create_task(self.start_services())
+
+    def request_close(self):
+        print("🛑 SIGTERM received, saving and shutting down")
+        asyncio.create_task(self.close())
+
+    async def start_services(self):
+        """Connect to Firebase and Google Sheets concurrently, then load the data"""
+        global storage
+        started = monotonic()
+        try:
+            remove_stale_posters()
+            connections = [asyncio.to_thread(sheet_manager.connect)]
+            if isinstance(storage, FirestoreStorage):
+                connections.append(asyncio.to_thread(connect_firebase))
+            await asyncio.gather(*connections)
+            if isinstance(storage, FirestoreStorage) and db is None:
+                print("⚠️ Firebase unavailable, falling back to local JSON files")
+                storage = JsonStorage()
+            print(f"🔌 External services connected in {monotonic() - started:.2f}s")
+
+            # Deliver writes the last run left in the outbox before reading the data back
+            await persistence_queue.flush()
+            # Storage reads run in worker threads so heartbeats keep going; the stores are filled here
+            events, rules, stats, rollups = await asyncio.gather(
+                asyncio.to_thread(storage.load_active_events),
+                asyncio.to_thread(storage.load, 'tournament_rules'),
+                asyncio.to_thread(storage.load, 'staff_stats'),
+                asyncio.to_thread(storage.load, 'staff_rollups'),
+                return_exceptions=True
+            )
+            load_scheduled_events(events)
+            load_rules(rules)
+            load_staff_stats(stats, rollups)
+            print(f"📦 Data loaded {monotonic() - started:.2f}s after login")
+        except Exception as e:
+            print(f"❌ Error during startup: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            # Never leave commands refused forever; whatever loaded is served
+            self.data_ready.set()
+
+        try:
+            # Decode the poster templates before the first match is created
+            await asyncio.to_thread(template_cache.warm, template_registry.all_paths())
+        except Exception as e:
+            print(f"Error preloading poster templates: {e}")
+
+    async def close(self):
+        await persistence_queue.stop()
+        await super().close()
+
+
+bot = TournamentBot(command_prefix="!", intents=intents)
 tree = bot.tree
 
+# ===========================================================================================
+# CHANGE-TRACKING STORES (so saves only write what changed)
+# ===========================================================================================
+
+# Firestore rejects batches with more than 500 writes
+FIRESTORE_BATCH_LIMIT = 500
+
+class TrackedRecord(dict):
+    """Record dict that reports in-place edits back to the TrackedStore holding it"""
+    __slots__ = ('_store', '_key')
+
+    def __init__(self, data, store, key):
+        super().__init__(data)
+        self._store = store
+        self._key = key
+
+    def _touch(self):
+        if self._store is not None:
+            self._store.mark_modified(self._key)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._touch()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._touch()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._touch()
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self._touch()
+        return value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._touch()
+        return super().setdefault(key, default)
+
+
+class TrackedStore(dict):
+    """Dict of records remembering which keys were created, modified or removed
+    since the last save so only those get persisted."""
+
+    def __init__(self):
+        super().__init__()
+        self.created = set()
+        self.modified = set()
+        self.removed = set()
+
+    def _new_record(self, key, data):
+        return TrackedRecord(data, self, key)
+
+    def _on_insert(self, key, record):
+        """Hook for subclasses keeping indexes over the records"""
+
+    def _on_remove(self, key, record):
+        """Hook for subclasses keeping indexes over the records"""
+
+    def _wrap(self, key, data):
+        if getattr(data, '_store', None) is self and data._key == key:
+            return data
+        return self._new_record(key, data)
+
+    def __setitem__(self, key, data):
+        previous = super().get(key)
+        wrapped = self._wrap(key, data)
+        super().__setitem__(key, wrapped)
+        if previous is not wrapped:
+            if previous is not None:
+                previous._store = None
+                self._on_remove(key, previous)
+            self._on_insert(key, wrapped)
+        if key in self.created:
+            return
+        if previous is None and key not in self.removed:
+            self.created.add(key)
+        else:
+            self.removed.discard(key)
+            self.modified.add(key)
+
+    def __delitem__(self, key):
+        data = super().pop(key)
+        data._store = None
+        self._on_remove(key, data)
+        self.modified.discard(key)
+        if key in self.created:
+            # Never persisted, nothing to delete
+            self.created.discard(key)
+        else:
+            self.removed.add(key)
+
+    def pop(self, key, *default):
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        data = self[key]
+        del self[key]
+        return data
+
+    def popitem(self):
+        key = next(reversed(self))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default if default is not None else {}
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, data in dict(*args, **kwargs).items():
+            self[key] = data
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+    def mark_modified(self, key):
+        if key in self and key not in self.created:
+            self.modified.add(key)
+
+    def apply(self, key, values: dict):
+        """Update a record in memory only, for changes the caller persists another way"""
+        record = super().get(key)
+        if record is None:
+            self.adopt(key, values)
+        else:
+            dict.update(record, values)
+
+    def adopt(self, key, data):
+        """Add a record that already exists in storage without marking it dirty"""
+        previous = super().get(key)
+        if previous is not None:
+            previous._store = None
+            self._on_remove(key, previous)
+        record = self._new_record(key, data)
+        super().__setitem__(key, record)
+        self._on_insert(key, record)
+        return record
+
+    def load(self, data):
+        """Replace the contents with freshly loaded records without marking anything dirty"""
+        for key, record in self.items():
+            record._store = None
+            self._on_remove(key, record)
+        super().clear()
+        for key, record in data.items():
+            record = self._new_record(key, record)
+            super().__setitem__(key, record)
+            self._on_insert(key, record)
+        self.created, self.modified, self.removed = set(), set(), set()
+
+    def has_changes(self) -> bool:
+        return bool(self.created or self.modified or self.removed)
+
+    def take_changes(self):
+        """Return (created, modified, removed) and start tracking afresh"""
+        changes = (self.created, self.modified, self.removed)
+        self.created, self.modified, self.removed = set(), set(), set()
+        return changes
+
+    def restore_changes(self, created, modified, removed):
+        """Put back changes from a failed save so the next save retries them"""
+        self.created |= {key for key in created if key in self}
+        self.modified |= {key for key in modified if key in self and key not in self.created}
+        self.removed |= {key for key in removed if key not in self}
+
+
+def to_member_id(value) -> Optional[int]:
+    """Reduce a Member/User, mention string or numeric string to a Discord user ID"""
+    if value is None or isinstance(value, int):
+        return value
+    if hasattr(value, 'id'):
+        return value.id
+    match = re.search(r'\d+', str(value))
+    return int(match.group()) if match else None
+
+
+@dataclasses.dataclass(slots=True, eq=False, repr=False)
+class Event:
+    """One scheduled match.
+
+    Member fields hold Discord user IDs only; use member()/mention() to resolve them when
+    a handler needs the person. Handlers can keep using dict-style access
+    (event['judge'] = member, event.get('round')): those writes coerce members to IDs and
+    are reported to the EventStore holding the event, which keeps its indexes in step.
+    Plain attribute assignment skips that, so stored events should be changed via [].
+    Keys that aren't fields go to `extra`.
+    """
+    id: Optional[str] = None
+    status: Optional[str] = None
+    datetime: "Optional[datetime.datetime]" = None
+    date_str: Optional[str] = None
+    time_str: Optional[str] = None
+    created_at: Optional[str] = None
+    created_by: Optional[int] = None
+    tournament: Optional[str] = None
+    mode: Optional[str] = None
+    round: Optional[str] = None
+    group: Optional[str] = None
+    team1_name: Optional[str] = None
+    team2_name: Optional[str] = None
+    team1_captain: Optional[str] = None  # display text, e.g. "Team (<@id>)"
+    team2_captain: Optional[str] = None
+    team1_display_name: Optional[str] = None
+    team2_display_name: Optional[str] = None
+    captain1_id: Optional[int] = None
+    captain2_id: Optional[int] = None
+    channel_id: Optional[int] = None
+    schedule_channel_id: Optional[int] = None
+    schedule_message_id: Optional[int] = None
+    poster_url: Optional[str] = None  # the uploaded poster attachment, reused by later posts
+    poster_encoding: Optional[dict] = None  # format, quality, size and encode time of the poster
+    judge: Optional[int] = None
+    recorder: Optional[int] = None
+    result_added: Optional[bool] = None
+    team1_score: Optional[int] = None
+    team2_score: Optional[int] = None
+    number_of_matches: Optional[int] = None
+    winner: Optional[str] = None
+    sheet_result: Optional[dict] = None  # what the result logged to Google Sheets, for /sheet-reconcile
+    extra: Optional[dict] = None
+    _store: object = dataclasses.field(default=None, init=False)
+    _key: Optional[str] = dataclasses.field(default=None, init=False)
+
+    def __post_init__(self):
+        if isinstance(self.datetime, str):
+            self.datetime = datetime.datetime.fromisoformat(self.datetime)
+        for name in EVENT_MEMBER_FIELDS:
+            value = getattr(self, name)
+            if value is not None and not isinstance(value, int):
+                setattr(self, name, to_member_id(value))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Event':
+        """Build an event from a stored record (or the dict a handler put together)"""
+        if EVENT_FIELD_SET.issuperset(data):
+            return _event_from_record(cls, data)
+        # Keys that aren't fields (older records) are kept in extra
+        known, extra = {}, {}
+        for key, value in data.items():
+            if key in EVENT_FIELD_SET:
+                known[key] = value
+            else:
+                extra[key] = value
+        event = _event_from_record(cls, known)
+        event.extra = extra
+        return event
+
+    # to_dict() is generated from EVENT_FIELDS below the class
+
+    def _touch(self):
+        if self._store is not None:
+            self._store.mark_modified(self._key)
+
+    # Dict-style access
+    def __getitem__(self, key):
+        if key in EVENT_FIELD_SET:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in EVENT_MEMBER_FIELDS:
+            value = to_member_id(value)
+        if key not in EVENT_FIELD_SET:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            self._touch()
+            return
+        previous = getattr(self, key)
+        setattr(self, key, value)
+        if self._store is not None:
+            self._store.field_changed(self._key, key, previous, value)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in EVENT_FIELD_SET else (self.extra or {}).get(key)
+        return default if value is None else value
+
+    # Lazy member resolution
+    def member(self, field: str, guild) -> Optional[discord.Member]:
+        """The guild member stored in a member field, or None if unset or no longer in the guild"""
+        user_id = getattr(self, field)
+        return guild.get_member(user_id) if user_id and guild else None
+
+    def mention(self, field: str) -> str:
+        user_id = getattr(self, field)
+        return f"<@{user_id}>" if user_id else ""
+
+    def __repr__(self):
+        return f"Event({self.id!r}, status={self.status!r}, datetime={self.datetime!r})"
+
+
+EVENT_FIELDS = tuple(f.name for f in dataclasses.fields(Event) if f.name not in ('extra', '_store', '_key'))
+EVENT_FIELD_SET = frozenset(EVENT_FIELDS)
+EVENT_MEMBER_FIELDS = frozenset(('created_by', 'captain1_id', 'captain2_id', 'judge', 'recorder'))
+
+def _make_event_codecs():
+    """Event.to_dict and the record decoder behind Event.from_dict, generated from
+    EVENT_FIELDS the way dataclasses generates __init__: one straight pass over the
+    fields, with only the match time and member IDs converted.
+
+    The decoder fills the slots directly instead of calling __init__, whose keyword
+    parsing over every field costs more than the copy itself."""
+    lines = ["def to_dict(self):", "    data = {}"]
+    for name in EVENT_FIELDS:
+        value = "self.datetime.isoformat()" if name == 'datetime' else f"self.{name}"
+        lines.append(f"    if self.{name} is not None: data[{name!r}] = {value}")
+    lines += ["    if self.extra:", "        data.update(self.extra)", "    return data"]
+    lines += ["def from_record(cls, data):", "    event = new(cls)", "    get = data.get"]
+    for name in EVENT_FIELDS:
+        if name == 'datetime':
+            lines += ["    value = get('datetime')",
+                      "    event.datetime = parse_time(value) if type(value) is str else value"]
+        elif name in EVENT_MEMBER_FIELDS:
+            lines += [f"    value = get({name!r})",
+                      f"    event.{name} = value if value is None or isinstance(value, int) else to_member_id(value)"]
+        else:
+            lines.append(f"    event.{name} = get({name!r})")
+    lines += ["    event.extra = event._store = event._key = None", "    return event"]
+    namespace = {'new': object.__new__, 'parse_time': datetime.datetime.fromisoformat,
+                 'to_member_id': to_member_id}
+    exec("\n".join(lines), namespace)
+    to_dict = namespace['to_dict']
+    to_dict.__qualname__ = "Event.to_dict"
+    to_dict.__doc__ = "JSON/Firestore friendly copy; unset fields are left out"
+    return to_dict, namespace['from_record']
+
+Event.to_dict, _event_from_record = _make_event_codecs()
+
+
+def event_time_key(when: datetime.datetime) -> datetime.datetime:
+    """Naive UTC datetime, so stored naive and aware match times sort together"""
+    if when.tzinfo is not None:
+        return when.astimezone(pytz.UTC).replace(tzinfo=None)
+    return when
+
+
+class EventStore(TrackedStore):
+    """Scheduled events keyed by event ID, with secondary indexes.
+
+    indexes[name][value] holds the IDs of events whose field has that value, in insertion
+    order, so "the event for this channel" or "matches this judge has" are dict lookups.
+    timeline is a sorted list of (match time, event ID) for range queries; events without
+    a match time are kept in undated. unassigned is the same kind of list restricted to
+    open events without a judge (undated ones sort last).
+    """
+    # field -> index it feeds (both captain fields share one index)
+    INDEXED_FIELDS = {
+        'channel_id': 'channel',
+        'schedule_message_id': 'schedule_message',
+        'judge': 'judge',
+        'recorder': 'recorder',
+        'captain1_id': 'captain',
+        'captain2_id': 'captain',
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.indexes = {name: {} for name in self.INDEXED_FIELDS.values()}
+        self.timeline = []
+        self.undated = {}
+        self.unassigned = []
+        self._unassigned_entries = {}  # event ID -> its entry in unassigned
+
+    def _index_add(self, field, value, key):
+        if value is not None:
+            self.indexes[self.INDEXED_FIELDS[field]].setdefault(value, {})[key] = None
+
+    def _index_discard(self, field, value, key):
+        if value is None:
+            return
+        index = self.indexes[self.INDEXED_FIELDS[field]]
+        bucket = index.get(value)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del index[value]
+
+    def _timeline_add(self, key, when):
+        if when is None:
+            self.undated[key] = None
+        else:
+            bisect.insort(self.timeline, (event_time_key(when), key))
+
+    def _timeline_discard(self, key, when):
+        if when is None:
+            self.undated.pop(key, None)
+            return
+        entry = (event_time_key(when), key)
+        position = bisect.bisect_left(self.timeline, entry)
+        if position < len(self.timeline) and self.timeline[position] == entry:
+            del self.timeline[position]
+
+    def _unassigned_discard(self, key):
+        entry = self._unassigned_entries.pop(key, None)
+        if entry is not None:
+            del self.unassigned[bisect.bisect_left(self.unassigned, entry)]
+
+    def _unassigned_refresh(self, key, event):
+        self._unassigned_discard(key)
+        if not event.judge and event.status != 'completed':
+            when = event_time_key(event.datetime) if event.datetime else datetime.datetime.max
+            entry = (when, key)
+            bisect.insort(self.unassigned, entry)
+            self._unassigned_entries[key] = entry
+
+    def _on_insert(self, key, event):
+        for field in self.INDEXED_FIELDS:
+            self._index_add(field, getattr(event, field), key)
+        self._timeline_add(key, event.datetime)
+        self._unassigned_refresh(key, event)
+
+    def _on_remove(self, key, event):
+        for field in self.INDEXED_FIELDS:
+            self._index_discard(field, getattr(event, field), key)
+        self._timeline_discard(key, event.datetime)
+        self._unassigned_discard(key)
+
+    def field_changed(self, key, field, previous, value):
+        """Called by Event.__setitem__ after a field of a stored event changed"""
+        self.mark_modified(key)
+        if field in self.INDEXED_FIELDS and previous != value:
+            index = self.INDEXED_FIELDS[field]
+            event = self[key]
+            # Both captain fields feed one index; keep the entry while the other one still matches
+            if not any(getattr(event, other) == previous for other, name in self.INDEXED_FIELDS.items()
+                       if name == index and other != field):
+                self._index_discard(field, previous, key)
+            self._index_add(field, value, key)
+        elif field == 'datetime' and previous != value:
+            self._timeline_discard(key, previous)
+            self._timeline_add(key, value)
+        if field in ('judge', 'status', 'datetime') and previous != value:
+            self._unassigned_refresh(key, self[key])
+
+    def lookup(self, index: str, value) -> list:
+        """IDs of events with the given value in an index ('channel', 'judge', 'captain', ...)"""
+        return list(self.indexes[index].get(value, ()))
+
+    # Time range queries (bounds may be naive UTC or timezone-aware)
+    def _time_position(self, when) -> int:
+        return bisect.bisect_left(self.timeline, (event_time_key(when),))
+
+    def upcoming(self, after: datetime.datetime, limit: Optional[int] = None) -> list:
+        """IDs of events starting at or after `after`, soonest first"""
+        start = self._time_position(after)
+        end = None if limit is None else start + limit
+        return [key for _, key in self.timeline[start:end]]
+
+    def between(self, start: datetime.datetime, end: datetime.datetime) -> list:
+        """IDs of events starting in [start, end), in time order"""
+        return [key for _, key in self.timeline[self._time_position(start):self._time_position(end)]]
+
+    def expired_before(self, before: datetime.datetime) -> list:
+        """IDs of events that started before `before`, oldest first"""
+        return [key for _, key in self.timeline[:self._time_position(before)]]
+
+    def in_time_order(self) -> list:
+        """All event IDs by match time, undated events last"""
+        return [key for _, key in self.timeline] + list(self.undated)
+
+    def _new_record(self, key, data):
+        if not isinstance(data, Event) or data._store is not None:
+            data = Event.from_dict(data if not isinstance(data, Event) else data.to_dict())
+        data._store = self
+        data._key = key
+        return data
+
+
+class StaffStore(TrackedStore):
+    """Staff statistics keyed by user ID, kept ranked for the leaderboard.
+
+    ranking is a sorted list of (-total matches, user ID), so the top entries are a slice.
+    totals holds the leaderboard footer figures and is adjusted by each record's change
+    instead of being summed over every record.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.ranking = []
+        self._ranked = {}  # user ID -> (ranking entry, judge count, recorder count)
+        self.totals = {'judges': 0, 'recorders': 0, 'judge_matches': 0, 'interactions': 0}
+
+    def _adjust_totals(self, judge_count, recorder_count, sign):
+        self.totals['judges'] += sign * (judge_count > 0)
+        self.totals['recorders'] += sign * (recorder_count > 0)
+        self.totals['judge_matches'] += sign * judge_count
+        self.totals['interactions'] += sign * (judge_count + recorder_count)
+
+    def _unrank(self, key):
+        ranked = self._ranked.pop(key, None)
+        if ranked is None:
+            return
+        entry, judge_count, recorder_count = ranked
+        del self.ranking[bisect.bisect_left(self.ranking, entry)]
+        self._adjust_totals(judge_count, recorder_count, -1)
+
+    def _rank(self, key, record):
+        self._unrank(key)
+        judge_count = record.get('judge_count') or 0
+        recorder_count = record.get('recorder_count') or 0
+        entry = (-(judge_count + recorder_count), key)
+        bisect.insort(self.ranking, entry)
+        self._ranked[key] = (entry, judge_count, recorder_count)
+        self._adjust_totals(judge_count, recorder_count, 1)
+
+    def _on_insert(self, key, record):
+        self._rank(key, record)
+
+    def _on_remove(self, key, record):
+        self._unrank(key)
+
+    def mark_modified(self, key):
+        super().mark_modified(key)
+        if key in self:
+            self._rank(key, self[key])
+
+    def apply(self, key, values: dict):
+        super().apply(key, values)
+        self._rank(key, self[key])
+
+    def top(self, limit: int) -> list:
+        """The best ranked (user ID, record) pairs"""
+        return [(key, self[key]) for _, key in self.ranking[:limit]]
+
+
+def empty_snapshot() -> dict:
+    return {'upserts': {}, 'removed': set(), 'changes': (set(), set(), set())}
+
+def snapshot_changes(store: TrackedStore, serialize) -> Optional[dict]:
+    """Take a store's pending changes as plain dicts. Runs on the event loop thread so the
+    write itself can happen in a worker thread without racing command handlers."""
+    if not store.has_changes():
+        return None
+    created, modified, removed = store.take_changes()
+    upserts = {key: serialize(store[key]) for key in created | modified if key in store}
+    return {'upserts': upserts, 'removed': removed, 'changes': (created, modified, removed)}
+
+
+# ===========================================================================================
+# LOCAL JSON JOURNAL (used when Firebase is not configured)
+# ===========================================================================================
+
+# Journal records appended before the log is folded into a fresh snapshot
+JOURNAL_COMPACT_EVERY = int(os.environ.get("JOURNAL_COMPACT_EVERY", "500"))
+
+class JsonJournal:
+    """A local collection kept as a JSON snapshot plus an append-only change log.
+
+    Saves append one compact line per changed key, so a write costs O(changes) rather
+    than rewriting the whole file. Once the log holds JOURNAL_COMPACT_EVERY records it is
+    folded into a new snapshot written to a temp file and swapped in with os.replace,
+    so a crash leaves either the old or the new snapshot, never half of one.
+    """
+
+    def __init__(self, snapshot_path: str, compact_every: int = JOURNAL_COMPACT_EVERY):
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + '.journal'
+        self.compact_every = compact_every
+        self.records = 0  # journal records since the last compaction
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.journal_path)
+
+    def load(self) -> dict:
+        """Read the snapshot and replay the journal on top of it"""
+        with self._lock:
+            data = self._read()
+            if self.records >= self.compact_every:
+                self._compact(data)
+            return data
+
+    def _read(self) -> dict:
+        data = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        self.records = 0
+        if not os.path.exists(self.journal_path):
+            return data
+        good_bytes = 0
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash mid-append leaves a torn last line; drop it so new records start clean
+                    break
+                if record['op'] == 'put':
+                    data[record['key']] = record['value']
+                elif record['op'] == 'inc':
+                    value = data.setdefault(record['key'], {})
+                    for field, delta in record['inc'].items():
+                        value[field] = value.get(field, 0) + delta
+                    value.update(record['set'])
+                else:
+                    data.pop(record['key'], None)
+                good_bytes += len(line)
+                self.records += 1
+        if good_bytes < os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(good_bytes)
+        return data
+
+    def append(self, upserts: dict, removed=(), increments: Optional[dict] = None):
+        """Append put/del records for the changed keys, then inc records adding to counters"""
+        lines = [json.dumps({'op': 'put', 'key': key, 'value': value}, separators=(',', ':'), ensure_ascii=False)
+                 for key, value in upserts.items()]
+        lines += [json.dumps({'op': 'del', 'key': key}, separators=(',', ':'), ensure_ascii=False) for key in removed]
+        lines += [json.dumps({'op': 'inc', 'key': key, 'inc': update['inc'], 'set': update['set']},
+                             separators=(',', ':'), ensure_ascii=False)
+                  for key, update in (increments or {}).items()]
+        if not lines:
+            return
+        with self._lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.records += len(lines)
+            if self.records >= self.compact_every:
+                self._compact(self._read())
+
+    def clear(self):
+        """Replace the collection with an empty snapshot"""
+        with self._lock:
+            self._compact({})
+
+    def _compact(self, data: dict):
+        temp_path = self.snapshot_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        # Every record is in the snapshot now; replaying them again after a crash here is harmless
+        open(self.journal_path, 'w').close()
+        self.records = 0
+
+
+
+# ===========================================================================================
+# STORAGE BACKENDS
+# ===========================================================================================
+
+# Set STORAGE_BACKEND to sqlite, json or memory to override the default
+# (Firebase when configured, local JSON files otherwise)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "").lower()
+
+# Collections every backend stores, each a mapping of string keys to JSON-compatible dicts
+STORAGE_COLLECTIONS = ("scheduled_events", "staff_stats", "staff_rollups", "tournament_rules")
+
+class StorageBackend:
+    """Where events, staff statistics and rules are persisted.
+
+    load() returns a whole collection as {key: dict} and write() applies upserts plus
+    removed keys. Finished events are moved out of scheduled_events with archive(), so
+    the collection loaded at every boot only holds the current schedule. Backends with
+    indexed queries set `indexed` and implement get_event() and event_ids_where() so
+    lookups can reach records that aren't kept in memory.
+    benchmarks.py holds the conformance checks every backend must pass.
+    """
+    name = "storage"
+    is_database = False
+    indexed = False
+    remote = False  # writes go over the network (and through the outbox)
+
+    def load(self, collection: str) -> dict:
+        raise NotImplementedError
+
+    def load_active_events(self) -> dict:
+        """Events to keep in memory after startup"""
+        return self.load('scheduled_events')
+
+    def write(self, collection: str, upserts: dict, removed=()):
+        raise NotImplementedError
+
+    def clear(self, collection: str):
+        """Delete every record in a collection"""
+        self.write(collection, {}, list(self.load(collection)))
+
+    def increment(self, collection: str, updates: dict):
+        """Atomically add to counter fields. updates maps key -> {'inc': {field: delta},
+        'set': {field: value}}; missing records are created with the counters at 0."""
+        raise NotImplementedError
+
+    def archive(self, events: dict):
+        """Store finished events (event ID -> record) in the archive"""
+        raise NotImplementedError
+
+    def load_archive(self) -> dict:
+        raise NotImplementedError
+
+    def clear_archive(self):
+        """Delete every archived event"""
+        raise NotImplementedError
+
+    def get_event(self, event_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def event_ids_where(self, column: str, value) -> list:
+        raise NotImplementedError
+
+
+class MemoryStorage(StorageBackend):
+    """Collections kept in process memory only; nothing survives a restart"""
+    name = "memory"
+
+    def __init__(self):
+        self.collections = {collection: {} for collection in STORAGE_COLLECTIONS}
+        self.archived = {}
+
+    def load(self, collection: str) -> dict:
+        return json.loads(json.dumps(self.collections[collection]))
+
+    def write(self, collection: str, upserts: dict, removed=()):
+        data = self.collections[collection]
+        for key, value in upserts.items():
+            data[key] = json.loads(json.dumps(value))
+        for key in removed:
+            data.pop(key, None)
+
+    def clear(self, collection: str):
+        self.collections[collection].clear()
+
+    def increment(self, collection: str, updates: dict):
+        data = self.collections[collection]
+        for key, update in updates.items():
+            record = data.setdefault(key, {})
+            for field, delta in update['inc'].items():
+                record[field] = record.get(field, 0) + delta
+            record.update(json.loads(json.dumps(update['set'])))
+
+    def archive(self, events: dict):
+        self.archived.update(json.loads(json.dumps(events)))
+
+    def load_archive(self) -> dict:
+        return json.loads(json.dumps(self.archived))
+
+    def clear_archive(self):
+        self.archived.clear()
+
+
+class JsonStorage(StorageBackend):
+    """Local JSON snapshot + journal files, one pair per collection. Archived events are
+    appended to a gzip-compressed JSON lines file."""
+    name = "file"
+
+    def __init__(self, directory: str = '.'):
+        self.journals = {
+            collection: JsonJournal(os.path.join(directory, f'{collection}.json'))
+            for collection in STORAGE_COLLECTIONS
+        }
+        self.archive_path = os.path.join(directory, 'archived_events.jsonl.gz')
+        self._archive_lock = threading.Lock()
+
+    def load(self, collection: str) -> dict:
+        journal = self.journals[collection]
+        return journal.load() if journal.exists() else {}
+
+    def write(self, collection: str, upserts: dict, removed=()):
+        self.journals[collection].append(upserts, removed)
+
+    def clear(self, collection: str):
+        self.journals[collection].clear()
+
+    def increment(self, collection: str, updates: dict):
+        self.journals[collection].append({}, (), updates)
+
+    def archive(self, events: dict):
+        lines = ''.join(
+            json.dumps({'key': key, 'value': value}, separators=(',', ':'), ensure_ascii=False) + '\n'
+            for key, value in events.items()
+        )
+        with self._archive_lock, open(self.archive_path, 'ab') as raw:
+            # Each save adds one gzip member; readers see the concatenation as one stream
+            with gzip.GzipFile(fileobj=raw, mode='ab') as f:
+                f.write(lines.encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+    def load_archive(self) -> dict:
+        archived = {}
+        if not os.path.exists(self.archive_path):
+            return archived
+        try:
+            with gzip.open(self.archive_path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    archived[record['key']] = record['value']
+        except (EOFError, OSError, ValueError):
+            # A crash mid-append leaves a truncated last member; keep what was readable
+            pass
+        return archived
+
+    def clear_archive(self):
+        with self._archive_lock:
+            if os.path.exists(self.archive_path):
+                os.remove(self.archive_path)
+
+
+class FirestoreStorage(StorageBackend):
+    """Firebase Firestore: one document per key, except rules which share the
+    settings/tournament_rules document"""
+    name = "Firebase"
+    is_database = True
+    remote = True
+
+    def __init__(self, client=None, prefix: str = ""):
+        self._client = client  # None: connect on first use
+        self.prefix = prefix  # lets benchmarks work in throwaway collections
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = connect_firebase()
+            if self._client is None:
+                raise ConnectionError("Firebase is not connected")
+        return self._client
+
+    def _collection(self, collection: str):
+        return self.client.collection(self.prefix + collection)
+
+    def _rules_document(self):
+        return self._collection('settings').document('tournament_rules')
+
+    def load(self, collection: str) -> dict:
+        if collection == 'tournament_rules':
+            doc = self._rules_document().get()
+            return doc.to_dict().get('rules', {}) if doc.exists else {}
+        return {doc.id: doc.to_dict() for doc in self._collection(collection).stream()}
+
+    def write(self, collection: str, upserts: dict, removed=()):
+        if collection == 'tournament_rules':
+            fields = dict(upserts)
+            fields.update({key: firestore.DELETE_FIELD for key in removed})
+            if fields:
+                # Only the changed keys of the rules map are replaced
+                self._rules_document().set({'rules': fields}, merge=[f'rules.{key}' for key in fields])
+            return
+        # Only the touched documents are written, chunked to the batch limit
+        writes = list(upserts.items()) + [(key, None) for key in removed]
+        for start in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+            batch = self.client.batch()
+            for key, data in writes[start:start + FIRESTORE_BATCH_LIMIT]:
+                doc_ref = self._collection(collection).document(key)
+                if data is None:
+                    batch.delete(doc_ref)
+                else:
+                    batch.set(doc_ref, data)
+            batch.commit()
+
+    def clear(self, collection: str):
+        if collection == 'tournament_rules':
+            self._rules_document().set({'rules': {}})
+            return
+        refs = [doc.reference for doc in self._collection(collection).stream()]
+        for start in range(0, len(refs), FIRESTORE_BATCH_LIMIT):
+            batch = self.client.batch()
+            for doc_ref in refs[start:start + FIRESTORE_BATCH_LIMIT]:
+                batch.delete(doc_ref)
+            batch.commit()
+
+    def increment(self, collection: str, updates: dict):
+        items = list(updates.items())
+        for start in range(0, len(items), FIRESTORE_BATCH_LIMIT):
+            batch = self.client.batch()
+            for key, update in items[start:start + FIRESTORE_BATCH_LIMIT]:
+                fields = {field: firestore.Increment(delta) for field, delta in update['inc'].items()}
+                fields.update(update['set'])
+                # Increments are applied server side, so concurrent updates can't overwrite each other
+                batch.set(self._collection(collection).document(key), fields, merge=True)
+            batch.commit()
+
+    def archive(self, events: dict):
+        self.write('archived_events', events)
+
+    def load_archive(self) -> dict:
+        return self.load('archived_events')
+
+    def clear_archive(self):
+        self.clear('archived_events')
+
+
+# ===========================================================================================
+# SQLITE STORAGE (optional local backend with indexed event queries)
+# ===========================================================================================
+
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "tournament.db")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled_events (
+    id TEXT PRIMARY KEY,
+    channel_id INTEGER,
+    status TEXT,
+    datetime TEXT,
+    judge INTEGER,
+    schedule_message_id INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_channel ON scheduled_events(channel_id);
+CREATE INDEX IF NOT EXISTS idx_events_status ON scheduled_events(status);
+CREATE INDEX IF NOT EXISTS idx_events_datetime ON scheduled_events(datetime);
+CREATE INDEX IF NOT EXISTS idx_events_judge ON scheduled_events(judge);
+CREATE INDEX IF NOT EXISTS idx_events_schedule_message ON scheduled_events(schedule_message_id);
+
+CREATE TABLE IF NOT EXISTS staff_stats (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    judge_count INTEGER NOT NULL DEFAULT 0,
+    recorder_count INTEGER NOT NULL DEFAULT 0,
+    last_activity TEXT
+);
+
+CREATE TABLE IF NOT EXISTS staff_rollups (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    judge_count INTEGER NOT NULL DEFAULT 0,
+    recorder_count INTEGER NOT NULL DEFAULT 0,
+    last_activity TEXT
+);
+
+CREATE TABLE IF NOT EXISTS settings (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS archived_events (
+    id TEXT PRIMARY KEY,
+    datetime TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archived_datetime ON archived_events(datetime);
+"""
+
+class SqliteStorage(StorageBackend):
+    """Events, staff statistics and settings in one SQLite file.
+
+    The event fields handlers search on are copied into indexed columns next to the
+    JSON document, so channel/status/time/judge/message lookups are index seeks.
+    Completed events not archived yet aren't loaded at boot but are still found by
+    get_event() and event_ids_where(); archived ones are in archived_events, which only
+    load_archive() reads.
+    """
+    name = "SQLite"
+    is_database = True
+    indexed = True
+
+    TABLES = {'scheduled_events': 'scheduled_events', 'staff_stats': 'staff_stats',
+              'staff_rollups': 'staff_rollups', 'tournament_rules': 'settings'}
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SQLITE_SCHEMA)
+
+    def _query(self, sql: str, params=()) -> list:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def load(self, collection: str) -> dict:
+        if collection == 'scheduled_events':
+            return self.load_events(include_completed=True)
+        if collection in ('staff_stats', 'staff_rollups'):
+            return self.load_staff_stats(self.TABLES[collection])
+        return self.load_settings()
+
+    def load_active_events(self) -> dict:
+        return self.load_events()
+
+    def write(self, collection: str, upserts: dict, removed=()):
+        if collection == 'scheduled_events':
+            self.write_events(upserts, removed)
+        elif collection in ('staff_stats', 'staff_rollups'):
+            self.write_staff_stats(upserts, removed, self.TABLES[collection])
+        else:
+            self.write_settings(upserts, removed)
+
+    def clear(self, collection: str):
+        with self.lock, self.conn:
+            self.conn.execute(f"DELETE FROM {self.TABLES[collection]}")
+
+    def increment(self, collection: str, updates: dict):
+        if collection not in ('staff_stats', 'staff_rollups'):
+            raise ValueError(f"{collection} has no counter columns")
+        table = self.TABLES[collection]
+        rows = [
+            (uid, update['set'].get('name'), update['inc'].get('judge_count', 0),
+             update['inc'].get('recorder_count', 0), update['set'].get('last_activity'))
+            for uid, update in updates.items()
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                "judge_count = judge_count + excluded.judge_count, "
+                "recorder_count = recorder_count + excluded.recorder_count, "
+                "name = COALESCE(excluded.name, name), "
+                "last_activity = COALESCE(excluded.last_activity, last_activity)",
+                rows
+            )
+
+    def archive(self, events: dict):
+        rows = [(ev_id, data.get('datetime'), json.dumps(data, separators=(',', ':'), ensure_ascii=False))
+                for ev_id, data in events.items()]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO archived_events VALUES (?, ?, ?)", rows)
+
+    def load_archive(self) -> dict:
+        return {ev_id: json.loads(data) for ev_id, data in self._query("SELECT id, data FROM archived_events")}
+
+    def clear_archive(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM archived_events")
+
+    # Events
+    def load_events(self, include_completed: bool = False) -> dict:
+        sql = "SELECT id, data FROM scheduled_events"
+        if not include_completed:
+            sql += " WHERE status IS NULL OR status != 'completed'"
+        return {ev_id: json.loads(data) for ev_id, data in self._query(sql)}
+
+    def get_event(self, event_id: str) -> Optional[dict]:
+        rows = self._query("SELECT data FROM scheduled_events WHERE id = ?", (event_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def event_ids_where(self, column: str, value) -> list:
+        """IDs of events whose indexed column equals value, earliest match first"""
+        if column not in ('channel_id', 'status', 'judge', 'schedule_message_id'):
+            raise ValueError(f"{column} is not an indexed event column")
+        rows = self._query(f"SELECT id FROM scheduled_events WHERE {column} = ? ORDER BY datetime", (value,))
+        return [row[0] for row in rows]
+
+    def write_events(self, upserts: dict, removed=()):
+        rows = [
+            (ev_id, data.get('channel_id'), data.get('status'), data.get('datetime'), data.get('judge'),
+             data.get('schedule_message_id'), json.dumps(data, separators=(',', ':'), ensure_ascii=False))
+            for ev_id, data in upserts.items()
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO scheduled_events VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("DELETE FROM scheduled_events WHERE id = ?", [(ev_id,) for ev_id in removed])
+
+    # Staff statistics and rollups (same columns)
+    def load_staff_stats(self, table: str = 'staff_stats') -> dict:
+        rows = self._query(f"SELECT id, name, judge_count, recorder_count, last_activity FROM {table}")
+        return {
+            uid: {"name": name, "judge_count": judge_count, "recorder_count": recorder_count, "last_activity": last_activity}
+            for uid, name, judge_count, recorder_count, last_activity in rows
+        }
+
+    def write_staff_stats(self, upserts: dict, removed=(), table: str = 'staff_stats'):
+        rows = [
+            (uid, stats.get('name'), stats.get('judge_count', 0), stats.get('recorder_count', 0), stats.get('last_activity'))
+            for uid, stats in upserts.items()
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany(f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(uid,) for uid in removed])
+
+    # Settings (tournament rules)
+    def load_settings(self) -> dict:
+        return {key: json.loads(data) for key, data in self._query("SELECT id, data FROM settings")}
+
+    def write_settings(self, upserts: dict, removed=()):
+        rows = [(key, json.dumps(value, ensure_ascii=False)) for key, value in upserts.items()]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO settings VALUES (?, ?)", rows)
+            self.conn.executemany("DELETE FROM settings WHERE id = ?", [(key,) for key in removed])
+
+
+def create_storage_backend() -> StorageBackend:
+    """Pick the storage backend from STORAGE_BACKEND and the Firebase configuration"""
+    if STORAGE_BACKEND == "sqlite":
+        try:
+            backend = SqliteStorage(SQLITE_PATH)
+            print(f"✅ Using SQLite storage ({SQLITE_PATH})")
+            return backend
+        except Exception as e:
+            print(f"❌ SQLite initialization error: {e}")
+    elif STORAGE_BACKEND == "memory":
+        print("⚠️ Using in-memory storage. Data will be lost on restart.")
+        return MemoryStorage()
+    if firebase_configured() and STORAGE_BACKEND != "json":
+        # Connected after login by TournamentBot.start_services
+        return FirestoreStorage()
+    return JsonStorage()
+
+storage = create_storage_backend()
+
+
 # Store scheduled events for reminders
-scheduled_events = {}
+scheduled_events = EventStore()
 
 # Create command groups
 events_group = app_commands.Group(name="events", description="Tournament event management")
@@ -239,64 +1651,112 @@ tree.add_command(events_group)
 
 
 # Load scheduled events from file on startup
-# Load scheduled events from file on startup
-def load_scheduled_events():
-    global scheduled_events
+def read_ahead(data, read, *args):
+    """Data already read in a worker thread, or read it now. A failed read is raised here."""
+    if isinstance(data, Exception):
+        raise data
+    return read(*args) if data is None else data
+
+def load_scheduled_events(events=None):
     try:
-        if db:
-            docs = db.collection('scheduled_events').stream()
-            data = {doc.id: doc.to_dict() for doc in docs}
-            # Convert datetime strings back to datetime objects
-            for event_id, event_data in data.items():
-                if 'datetime' in event_data:
-                    event_data['datetime'] = datetime.datetime.fromisoformat(event_data['datetime'])
-            scheduled_events = data
-            print(f"Loaded {len(scheduled_events)} scheduled events from Firebase")
-        elif os.path.exists('scheduled_events.json'):
-            with open('scheduled_events.json', 'r') as f:
-                data = json.load(f)
-                # Convert datetime strings back to datetime objects
-                for event_id, event_data in data.items():
-                    if 'datetime' in event_data:
-                        event_data['datetime'] = datetime.datetime.fromisoformat(event_data['datetime'])
-                scheduled_events = data
-                print(f"Loaded {len(scheduled_events)} scheduled events from file")
+        scheduled_events.load(read_ahead(events, storage.load_active_events))
+        print(f"Loaded {len(scheduled_events)} scheduled events from {storage.name}")
     except Exception as e:
         print(f"Error loading scheduled events: {e}")
-        scheduled_events = {}
+        scheduled_events.load({})
 
-# Save scheduled events to file
+# Finished events removed from scheduled_events, waiting to be written to the archive
+pending_archive = {}
+
+def archive_event(event_id: str) -> bool:
+    """Move an event out of the live schedule and into the archive on the next save"""
+    event_data = scheduled_events.pop(event_id, None)
+    if event_data is None:
+        return False
+    pending_archive[event_id] = event_data.to_dict()
+    request_save("scheduled_events")
+    return True
+
+def snapshot_scheduled_events():
+    """Take the pending event changes for a background write"""
+    snapshot = snapshot_changes(scheduled_events, Event.to_dict)
+    if pending_archive:
+        if snapshot is None:
+            snapshot = empty_snapshot()
+        snapshot['archived'] = dict(pending_archive)
+        pending_archive.clear()
+    return snapshot
+
+def write_scheduled_events(snapshot):
+    """Blocking write of a snapshot taken by snapshot_scheduled_events()"""
+    # Archive first so a failure between the two writes can't lose a finished event
+    if snapshot.get('archived'):
+        storage.archive(snapshot['archived'])
+        del snapshot['archived']
+    storage.write('scheduled_events', snapshot['upserts'], snapshot['removed'])
+
+def restore_scheduled_events(snapshot):
+    """Re-mark the events of a failed write so the next save retries them"""
+    scheduled_events.restore_changes(*snapshot['changes'])
+    for ev_id, data in snapshot.get('archived', {}).items():
+        pending_archive.setdefault(ev_id, data)
+
+# Save scheduled events that changed since the last save (blocking)
 def save_scheduled_events():
+    snapshot = snapshot_scheduled_events()
+    if snapshot is None:
+        return
     try:
-        # Convert datetime objects to strings for JSON serialization
-        data_to_save = {}
-        for event_id, event_data in scheduled_events.items():
-            event_copy = event_data.copy()
-            if 'datetime' in event_copy:
-                event_copy['datetime'] = event_copy['datetime'].isoformat()
-            
-            # Convert Discord objects to IDs
-            for key in ['team1_captain', 'team2_captain', 'judge', 'recorder', 'created_by', 'result_judge', 'winner', 'loser']:
-                if key in event_copy and hasattr(event_copy[key], 'id'):
-                    event_copy[key] = event_copy[key].id
-                elif key in event_copy and event_copy[key] is None:
-                    event_copy[key] = None
-                
-            data_to_save[event_id] = event_copy
-        
-        if db:
-            # Batch write events to Firebase
-            batch = db.batch()
-            for ev_id, ev_data in data_to_save.items():
-                doc_ref = db.collection('scheduled_events').document(ev_id)
-                batch.set(doc_ref, ev_data)
-            batch.commit()
-        else:
-            with open('scheduled_events.json', 'w') as f:
-                json.dump(data_to_save, f, indent=2)
+        write_scheduled_events(snapshot)
     except Exception as e:
+        restore_scheduled_events(snapshot)
         print(f"Error saving scheduled events: {e}")
 
+# ===========================================================================================
+# EVENT LOOKUPS
+# ===========================================================================================
+
+def get_stored_event(event_id: str):
+    """Return an event from memory, pulling it in from SQLite if it only exists on disk"""
+    if event_id in scheduled_events:
+        return scheduled_events[event_id]
+    if storage.indexed and event_id not in scheduled_events.removed:
+        data = storage.get_event(event_id)
+        if data is not None:
+            return scheduled_events.adopt(event_id, data)
+    return None
+
+def find_channel_event(channel_id: int):
+    """Return (event_id, event_data) for the event belonging to a ticket channel, or (None, None)"""
+    for ev_id in scheduled_events.lookup('channel', channel_id):
+        return ev_id, scheduled_events[ev_id]
+    if storage.indexed:
+        # Completed events not archived yet aren't loaded at boot; archived ones aren't searched
+        for ev_id in storage.event_ids_where('channel_id', channel_id):
+            event_data = get_stored_event(ev_id)
+            if event_data is not None:
+                return ev_id, event_data
+    return None, None
+
+def find_message_event(message_id: int):
+    """Return (event_id, event_data) for the event whose schedule message this is, or (None, None)"""
+    for ev_id in scheduled_events.lookup('schedule_message', message_id):
+        return ev_id, scheduled_events[ev_id]
+    if storage.indexed:
+        for ev_id in storage.event_ids_where('schedule_message_id', message_id):
+            event_data = get_stored_event(ev_id)
+            if event_data is not None:
+                return ev_id, event_data
+    return None, None
+
+def list_user_events(user_id: int) -> dict:
+    """Event IDs a user is involved in, keyed by role ('judge', 'recorder', 'captain')"""
+    return {role: scheduled_events.lookup(role, user_id) for role in ('judge', 'recorder', 'captain')}
+
+def list_unassigned_events() -> list:
+    """Return (event_id, event_data) pairs for open events without a judge, earliest match first"""
+    return [(ev_id, scheduled_events[ev_id]) for _, ev_id in scheduled_events.unassigned]
+
 # Track per-event reminder tasks (for cancellation/update)
 reminder_tasks = {}
 
@@ -304,170 +1764,312 @@ reminder_tasks = {}
 cleanup_tasks = {}
 
 # Store staff statistic for leaderboard
-staff_stats = {}  # {user_id: {"name": str, "judge_count": int, "recorder_count": int, "last_activity": datetime}}
+staff_stats = StaffStore()  # {user_id: {"name": str, "judge_count": int, "recorder_count": int, "last_activity": datetime}}
+
+# Staff activity rollups: the same records counted per day, ISO week and season (UTC).
+# Only the current bucket of each period is kept; ended ones are deleted from storage.
+STAFF_PERIODS = {"day": "Today", "week": "This Week", "season": "This Season"}
+# Season name for the rollups (default: calendar quarter, e.g. 2026-Q4)
+STAFF_SEASON = os.environ.get("STAFF_SEASON", "")
+staff_rollups = {}  # period -> (bucket, StaffStore)
+
+def staff_period_bucket(period: str, when: datetime.datetime) -> str:
+    if period == "day":
+        return when.strftime("%Y-%m-%d")
+    if period == "week":
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    return STAFF_SEASON or f"{when.year}-Q{(when.month - 1) // 3 + 1}"
+
+def rollup_key(period: str, bucket: str, uid: str) -> str:
+    return f"{period}:{bucket}:{uid}"
+
+def current_rollup(period: str, now: datetime.datetime):
+    """(bucket, StaffStore) for the period's bucket containing now, starting a new one on
+    rollover and deleting the ended bucket's records with the next staff save"""
+    bucket = staff_period_bucket(period, now)
+    current = staff_rollups.get(period)
+    if current is None or current[0] != bucket:
+        if current is not None:
+            ended = {rollup_key(period, current[0], uid) for uid in current[1]}
+            for key in ended:
+                rollup_increments.pop(key, None)
+            rollup_removals.update(ended)
+        current = staff_rollups[period] = (bucket, StaffStore())
+    return current
 
 # ===========================================================================================
 # RULE MANAGEMENT SYSTEM
 # ===========================================================================================
 
 # Store tournament rules in memory
-tournament_rules = {}
+tournament_rules = TrackedStore()
 
-def load_rules():
+def load_rules(rules=None):
     """Load rules from persistent storage"""
-    global tournament_rules
     try:
-        if db:
-            doc = db.collection('settings').document('tournament_rules').get()
-            if doc.exists:
-                tournament_rules = doc.to_dict().get('rules', {})
-                print(f"Loaded tournament rules from Firebase")
-            else:
-                tournament_rules = {}
-                print("No existing rules found in Firebase, starting with empty rules")
-        elif os.path.exists('tournament_rules.json'):
-            with open('tournament_rules.json', 'r', encoding='utf-8') as f:
-                tournament_rules = json.load(f)
-                print(f"Loaded tournament rules from file")
+        tournament_rules.load(read_ahead(rules, storage.load, 'tournament_rules'))
+        if tournament_rules:
+            print(f"Loaded tournament rules from {storage.name}")
         else:
-            tournament_rules = {}
-            print("No existing rules file found, starting with empty rules")
+            print("No existing rules found, starting with empty rules")
     except Exception as e:
         print(f"Error loading tournament rules: {e}")
-        tournament_rules = {}
+        tournament_rules.load({})
+
+def snapshot_rules():
+    """Copy the changed rules for a background write"""
+    return snapshot_changes(tournament_rules, lambda value: json.loads(json.dumps(value)))
+
+def write_rules(snapshot):
+    """Blocking write of a rules snapshot"""
+    storage.write('tournament_rules', snapshot['upserts'], snapshot['removed'])
+
+def restore_rules(snapshot):
+    tournament_rules.restore_changes(*snapshot['changes'])
 
 def save_rules():
-    """Save rules to persistent storage"""
+    """Save rules to persistent storage (blocking)"""
+    snapshot = snapshot_rules()
+    if snapshot is None:
+        return True
     try:
-        if db:
-            db.collection('settings').document('tournament_rules').set({'rules': tournament_rules})
-        else:
-            with open('tournament_rules.json', 'w', encoding='utf-8') as f:
-                json.dump(tournament_rules, f, indent=2, ensure_ascii=False)
+        write_rules(snapshot)
         return True
     except Exception as e:
+        restore_rules(snapshot)
         print(f"Error saving tournament rules: {e}")
         return False
 
-def load_staff_stats():
+def parse_staff_record(stats: dict) -> dict:
+    """Convert a stored staff record's datetime string back to a datetime object"""
+    if 'last_activity' in stats and stats['last_activity']:
+        try:
+            stats['last_activity'] = datetime.datetime.fromisoformat(stats['last_activity'])
+        except ValueError:
+            stats['last_activity'] = None
+    return stats
+
+def load_staff_stats(stored_stats=None, stored_rollups=None):
     """Load staff statistics from persistent storage"""
-    global staff_stats
     try:
-        if db:
-            docs = db.collection('staff_stats').stream()
-            data = {doc.id: doc.to_dict() for doc in docs}
-            # Convert datetime strings back to datetime objects
-            for user_id, stats in data.items():
-                if 'last_activity' in stats and stats['last_activity']:
-                    try:
-                        stats['last_activity'] = datetime.datetime.fromisoformat(stats['last_activity'])
-                    except ValueError:
-                         stats['last_activity'] = None
-            staff_stats = data
-            print(f"Loaded staff statistics from Firebase")
-        elif os.path.exists('staff_stats.json'):
-            # Check for legacy judge_stats.json first and migrate if needed
-            if os.path.exists('judge_stats.json') and not os.path.exists('staff_stats.json'):
-                print("Migrating legacy judge stats...")
-                try:
-                    with open('judge_stats.json', 'r', encoding='utf-8') as f:
-                        legacy_data = json.load(f)
-                        for uid, data in legacy_data.items():
-                            staff_stats[uid] = {
-                                "name": data.get("name", "Unknown"),
-                                "judge_count": data.get("matches_judged", 0),
-                                "recorder_count": 0,
-                                "last_activity": datetime.datetime.fromisoformat(data["last_activity"]) if data.get("last_activity") else None
-                            }
-                    print("Migration complete.")
-                except Exception as e:
-                    print(f"Migration failed: {e}")
-
-            if os.path.exists('staff_stats.json'):
-                with open('staff_stats.json', 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Convert datetime strings back to datetime objects
-                    for user_id, stats in data.items():
-                        if 'last_activity' in stats and stats['last_activity']:
-                            try:
-                                stats['last_activity'] = datetime.datetime.fromisoformat(stats['last_activity'])
-                            except ValueError:
-                                 stats['last_activity'] = None
-                    staff_stats = data
-                    print(f"Loaded staff statistics from file")
+        data = read_ahead(stored_stats, storage.load, 'staff_stats')
+        staff_stats.load({uid: parse_staff_record(stats) for uid, stats in data.items()})
+        if staff_stats:
+            print(f"Loaded staff statistics from {storage.name}")
+        # Check for legacy judge_stats.json and migrate if the local files have no staff stats yet
+        elif (isinstance(storage, JsonStorage) and os.path.exists('judge_stats.json')
+              and not storage.journals['staff_stats'].exists()):
+            print("Migrating legacy judge stats...")
+            try:
+                with open('judge_stats.json', 'r', encoding='utf-8') as f:
+                    legacy_data = json.load(f)
+                    for uid, data in legacy_data.items():
+                        staff_stats[uid] = {
+                            "name": data.get("name", "Unknown"),
+                            "judge_count": data.get("matches_judged", 0),
+                            "recorder_count": 0,
+                            "last_activity": datetime.datetime.fromisoformat(data["last_activity"]) if data.get("last_activity") else None
+                        }
+                request_save("staff_stats")
+                print("Migration complete.")
+            except Exception as e:
+                print(f"Migration failed: {e}")
         
         if not staff_stats: # Fallback if neither exists or empty
-            staff_stats = {}
             print("No existing staff stats found, starting with empty stats")
     except Exception as e:
         print(f"Error loading staff statistics: {e}")
-        staff_stats = {}
+        staff_stats.load({})
+    
+    try:
+        now = datetime.datetime.utcnow()
+        current = {period: {} for period in STAFF_PERIODS}
+        # Match on the whole "period:bucket" prefix; a season name may itself contain ":"
+        periods = {rollup_key(period, staff_period_bucket(period, now), ""): period for period in STAFF_PERIODS}
+        for key, stats in read_ahead(stored_rollups, storage.load, 'staff_rollups').items():
+            prefix, uid = key.rsplit(":", 1)
+            period = periods.get(prefix + ":")
+            if period is not None:
+                current[period][uid] = parse_staff_record(stats)
+            else:
+                # Ended while the bot was offline
+                rollup_removals.add(key)
+        for period, records in current.items():
+            current_rollup(period, now)[1].load(records)
+        if rollup_removals:
+            print(f"Deleting {len(rollup_removals)} staff rollup records from ended periods")
+            request_save("staff_stats")
+    except Exception as e:
+        print(f"Error loading staff activity rollups: {e}")
+        staff_rollups.clear()
+
+def serialize_staff_record(stats) -> dict:
+    """Convert one staff record into a JSON/Firestore friendly dict"""
+    stats_copy = dict(stats)
+    if 'last_activity' in stats_copy and stats_copy['last_activity']:
+        stats_copy['last_activity'] = stats_copy['last_activity'].isoformat()
+    return stats_copy
+
+# Counter updates not written yet: {user_id: {'inc': {field: delta}, 'set': {field: value}}}
+staff_increments = {}
+# The same for rollup records, keyed by rollup_key()
+rollup_increments = {}
+# Stored rollup records of ended buckets, to delete
+rollup_removals = set()
+# Set by a reset until the stored rollups have been deleted
+rollups_reset_pending = False
+
+def snapshot_staff_stats():
+    """Take the changed staff records and pending counter updates for a background write"""
+    global rollups_reset_pending
+    snapshot = snapshot_changes(staff_stats, serialize_staff_record)
+    if staff_increments or rollup_increments or rollup_removals or rollups_reset_pending:
+        if snapshot is None:
+            snapshot = empty_snapshot()
+        # A record being rewritten whole already includes its pending increments
+        snapshot['increments'] = {uid: update for uid, update in staff_increments.items()
+                                  if uid not in snapshot['upserts']}
+        snapshot['rollup_increments'] = dict(rollup_increments)
+        snapshot['rollup_removed'] = sorted(rollup_removals)
+        snapshot['clear_rollups'] = rollups_reset_pending
+        staff_increments.clear()
+        rollup_increments.clear()
+        rollup_removals.clear()
+        rollups_reset_pending = False
+    return snapshot
+
+def write_staff_stats(snapshot):
+    """Blocking write of a staff statistics snapshot. Finished steps are dropped from the
+    snapshot, so retrying it after a failure never applies an increment twice."""
+    if snapshot['upserts'] or snapshot['removed']:
+        storage.write('staff_stats', snapshot['upserts'], snapshot['removed'])
+        snapshot['upserts'], snapshot['removed'] = {}, []
+    if snapshot.get('increments'):
+        storage.increment('staff_stats', snapshot['increments'])
+        del snapshot['increments']
+    if snapshot.get('clear_rollups'):
+        storage.clear('staff_rollups')
+        del snapshot['clear_rollups']
+    if snapshot.get('rollup_increments'):
+        storage.increment('staff_rollups', snapshot['rollup_increments'])
+        del snapshot['rollup_increments']
+    if snapshot.get('rollup_removed'):
+        storage.write('staff_rollups', {}, snapshot['rollup_removed'])
+        del snapshot['rollup_removed']
+
+def queue_increment(pending: dict, key: str, inc: dict, fields: dict):
+    """Merge a counter update into the pending ones for that record"""
+    update = pending.setdefault(key, {'inc': {}, 'set': {}})
+    for field, delta in inc.items():
+        update['inc'][field] = update['inc'].get(field, 0) + delta
+    update['set'].update(fields)
+
+def requeue_increments(pending: dict, increments: dict):
+    """Put back increments from a failed save. Deltas queued since still add up;
+    their newer names/times win."""
+    for key, update in increments.items():
+        newer = pending.pop(key, None)
+        queue_increment(pending, key, update['inc'], update['set'])
+        if newer:
+            queue_increment(pending, key, newer['inc'], newer['set'])
+
+def restore_staff_stats(snapshot):
+    global rollups_reset_pending
+    staff_stats.restore_changes(*snapshot['changes'])
+    increments = dict(snapshot.get('increments', {}))
+    for uid in snapshot['removed']:
+        # A reset that never reached storage: rewrite the whole record from the mirror instead
+        increments.pop(uid, None)
+        staff_increments.pop(uid, None)
+        if uid in staff_stats:
+            staff_stats.created.add(uid)
+    requeue_increments(staff_increments, increments)
+    if snapshot.get('clear_rollups'):
+        rollups_reset_pending = True
+    requeue_increments(rollup_increments, snapshot.get('rollup_increments', {}))
+    rollup_removals.update(snapshot.get('rollup_removed', ()))
 
 def save_staff_stats():
-    """Save staff statistics to persistent storage"""
+    """Save staff statistics to persistent storage (blocking)"""
+    snapshot = snapshot_staff_stats()
+    if snapshot is None:
+        return True
     try:
-        # Convert datetime objects to strings for JSON serialization
-        data_to_save = {}
-        for user_id, stats in staff_stats.items():
-            stats_copy = stats.copy()
-            if 'last_activity' in stats_copy and stats_copy['last_activity']:
-                stats_copy['last_activity'] = stats_copy['last_activity'].isoformat()
-            data_to_save[str(user_id)] = stats_copy
-        
-        if db:
-            batch = db.batch()
-            for uid, stats in data_to_save.items():
-                doc_ref = db.collection('staff_stats').document(uid)
-                batch.set(doc_ref, stats)
-            batch.commit()
-        else:
-            with open('staff_stats.json', 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, indent=2, ensure_ascii=False)
+        write_staff_stats(snapshot)
         return True
     except Exception as e:
+        restore_staff_stats(snapshot)
         print(f"Error saving staff statistics: {e}")
         return False
 
+def counted_staff_record(store: StaffStore, uid: str, counter: Optional[str], user_name: str, now) -> dict:
+    """A staff member's record in store after one more match in the counter's role"""
+    current = store.get(uid, {})
+    record = {
+        "name": user_name,
+        "judge_count": current.get("judge_count", 0),
+        "recorder_count": current.get("recorder_count", 0),
+        "last_activity": now
+    }
+    if counter:
+        record[counter] += 1
+    return record
+
 def update_staff_stats(user_id: int, user_name: str, role: str):
-    """Update staff statistics when they complete a match"""
-    global staff_stats
+    """Update staff statistics when they complete a match.
+
+    Persisted as atomic counter increments for this one staff member (lifetime totals plus
+    the current day/week/season rollups); staff_stats and staff_rollups are in-memory
+    mirrors and can be rebuilt from storage with load_staff_stats().
+    """
     uid = str(user_id)
+    counter = {"judge": "judge_count", "recorder": "recorder_count"}.get(role.lower())
+    now = datetime.datetime.utcnow()
+    # Zero deltas make sure a first-time record gets both counters
+    inc = {"judge_count": 0, "recorder_count": 0}
+    if counter:
+        inc[counter] = 1
+    # Update name in case it changed
+    fields = {"name": user_name, "last_activity": now.isoformat()}
+    
+    mirror = counted_staff_record(staff_stats, uid, counter, user_name, now)
+    if uid in staff_stats.created or uid in staff_stats.modified:
+        # The whole record is being rewritten anyway (migration or reset retry)
+        staff_stats[uid] = mirror
+    else:
+        queue_increment(staff_increments, uid, inc, fields)
+        staff_stats.apply(uid, mirror)
     
-    if uid not in staff_stats:
-        staff_stats[uid] = {
-            "name": user_name,
-            "judge_count": 0,
-            "recorder_count": 0,
-            "last_activity": None
-        }
-    
-    if role.lower() == "judge":
-        staff_stats[uid]["judge_count"] += 1
-    elif role.lower() == "recorder":
-        staff_stats[uid]["recorder_count"] += 1
-        
-    staff_stats[uid]["last_activity"] = datetime.datetime.utcnow()
-    staff_stats[uid]["name"] = user_name  # Update name in case it changed
+    for period in STAFF_PERIODS:
+        bucket, rollup = current_rollup(period, now)
+        queue_increment(rollup_increments, rollup_key(period, bucket, uid), inc, fields)
+        rollup.apply(uid, counted_staff_record(rollup, uid, counter, user_name, now))
     
-    save_staff_stats()
+    request_save("staff_stats")
 
 def reset_staff_stats():
     """Reset all staff statistics (Head Organizer only)"""
-    global staff_stats
-    staff_stats = {}
-    save_staff_stats()
+    global rollups_reset_pending
+    staff_increments.clear()
+    staff_stats.clear()
+    rollup_increments.clear()
+    rollup_removals.clear()
+    staff_rollups.clear()
+    rollups_reset_pending = True
+    request_save("staff_stats")
     return True
 
-def get_staff_leaderboard(limit: int = 20) -> list:
-    """Get top staff sorted by total activity"""
+def staff_leaderboard_store(period: str = "all") -> StaffStore:
+    """Lifetime staff statistics, or the current rollup for a period in STAFF_PERIODS"""
+    if period in STAFF_PERIODS:
+        return current_rollup(period, datetime.datetime.utcnow())[1]
+    return staff_stats
+
+def get_staff_leaderboard(limit: int = 20, period: str = "all") -> list:
+    """Get top staff sorted by total activity (judge + recorder)"""
     try:
-        # Sort by total count (judge + recorder)
-        sorted_staff = sorted(
-            staff_stats.items(),
-            key=lambda x: x[1].get("judge_count", 0) + x[1].get("recorder_count", 0),
-            reverse=True
-        )
-        return sorted_staff[:limit]
+        return staff_leaderboard_store(period).top(limit)
     except Exception as e:
         print(f"Error getting staff leaderboard: {e}")
         return []
@@ -495,7 +2097,420 @@ def set_rules_content(content, user_id, username):
         'version': tournament_rules.get('rules', {}).get('version', 0) + 1
     }
     
-    return save_rules()
+    request_save("tournament_rules")
+    return True
+
+# ===========================================================================================
+# WRITE-BEHIND PERSISTENCE (saves coalesced and run off the event loop)
+# ===========================================================================================
+
+# How long to wait for more save requests before flushing them together
+PERSIST_COALESCE_SECONDS = float(os.environ.get("PERSIST_COALESCE_SECONDS", "0.5"))
+
+def snapshot_sheets():
+    """Take the queued Google Sheet operations for a background send"""
+    if not sheet_manager.pending:
+        return None
+    return sheet_manager.take_pending()
+
+def write_sheets(operations):
+    # Entries left in the outbox can be retried before startup has connected
+    sheet_manager.connect()
+    sheet_manager.send(operations)
+
+def expected_sheet_rows(events, guild) -> tuple:
+    """The Event Details and Mark Attendance rows the sheet should hold for these events.
+    Cells that can't be worked out locally (staff who left the server) are None."""
+    def staff_name(member_id):
+        if not member_id:
+            return "Unassigned"
+        member = guild.get_member(member_id) if guild else None
+        return member.name if member else None
+
+    event_rows, attendance_rows = [], []
+    for event in events:
+        result = event.get('sheet_result')
+        if result is None:
+            # Results posted before they were recorded locally: leave those cells as they are
+            result = {} if not event.get('result_added') else {'winner': None, 'score': None, 'remarks': None}
+        event_rows.append([
+            event.get('id'),
+            event.get('tournament'),
+            event.get('mode', 'MW'),
+            event.get('round'),
+            event.get('team1_name'),
+            event.get('team2_name'),
+            event.get('date_str'),
+            event.get('time_str'),
+            staff_name(event.get('judge')),
+            staff_name(event.get('recorder')),
+            result.get('winner', "Pending"),
+            result.get('score', "Pending"),
+            result.get('remarks', ""),
+        ])
+        attendance_rows.extend(result.get('attendance', []))
+    return event_rows, attendance_rows
+
+# kind -> (snapshot on the loop thread, blocking write, restore after a failed write).
+# Writes drop the parts they have finished from the snapshot, so a retry resumes after them.
+PERSISTERS = {
+    "scheduled_events": (snapshot_scheduled_events, write_scheduled_events, restore_scheduled_events),
+    "staff_stats": (snapshot_staff_stats, write_staff_stats, restore_staff_stats),
+    "tournament_rules": (snapshot_rules, write_rules, restore_rules),
+    "sheets": (snapshot_sheets, write_sheets, sheet_manager.requeue),
+}
+
+# ===========================================================================================
+# OUTBOX (durable queue for Google Sheets and Firestore writes)
+# ===========================================================================================
+
+OUTBOX_PATH = os.environ.get("OUTBOX_PATH", "outbox.json")
+# Google Sheets allows 60 write requests per minute per user
+SHEETS_WRITES_PER_MINUTE = int(os.environ.get("SHEETS_WRITES_PER_MINUTE", "60"))
+FIRESTORE_WRITES_PER_SECOND = int(os.environ.get("FIRESTORE_WRITES_PER_SECOND", "500"))
+# Failed deliveries are retried after 1, 2, 4 ... seconds, capped here
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.environ.get("OUTBOX_MAX_BACKOFF_SECONDS", "300"))
+# An entry failing this many times in a row is parked instead of blocking its kind
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "10"))
+
+class TokenBucket:
+    """Rate limiter: holds up to `capacity` tokens, refilled at capacity per `period` seconds"""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, count: int = 1) -> float:
+        """Take count tokens and return 0, or return the seconds until they'll be available"""
+        count = min(count, self.capacity)
+        with self._lock:
+            now = monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= count:
+                self.tokens -= count
+                return 0.0
+            return (count - self.tokens) / self.rate
+
+
+def uses_outbox(kind: str) -> bool:
+    """Sheet rows always go through the outbox, saves only when storage is remote"""
+    return kind == "sheets" or storage.remote
+
+def is_permanent_error(error: Exception) -> bool:
+    """Whether retrying can't help: a 4xx answer other than timeout or rate limiting
+    (gspread's APIError and google.api_core errors both carry the HTTP status)"""
+    status = getattr(error, 'code', None)
+    if not isinstance(status, int):
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+def write_cost(kind: str, payload) -> int:
+    """Roughly how many API writes delivering an outbox entry takes"""
+    if kind == "sheets":
+        appended = {op['sheet'] for op in payload if op['op'] == 'append'}
+        updates = any(op['op'] == 'update' for op in payload)
+        return len(appended) + (2 if updates else 0)
+    return sum(len(part) for part in payload.values() if isinstance(part, (dict, list))) or 1
+
+
+class Outbox:
+    """Writes to Google Sheets and Firestore that haven't been confirmed yet.
+
+    Every snapshot for an outboxed kind is appended to a local journal before it is sent
+    and removed once the service accepts it, so rate limits, outages and restarts delay
+    writes instead of losing them. Entries are delivered oldest first per kind; a failure
+    backs that kind off exponentially, and token buckets keep us under the API quotas.
+    An entry the service rejects outright, or that fails max_attempts times, is parked
+    in a second journal next to the outbox so the entries behind it can go out.
+    """
+
+    def __init__(self, path: str, base_delay: float = 1.0, max_delay: float = OUTBOX_MAX_BACKOFF_SECONDS,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        self.journal = JsonJournal(path)
+        self.parked_journal = JsonJournal(os.path.splitext(path)[0] + '.parked.json')
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.entries = {}  # zero padded sequence number -> {'kind', 'payload', 'attempts'}
+        self.parked = 0
+        try:
+            if self.journal.exists():
+                self.entries = self.journal.load()
+            if self.parked_journal.exists():
+                self.parked = len(self.parked_journal.load())
+        except Exception as e:
+            print(f"Error reading outbox: {e}")
+        self.sequence = max((int(key) for key in self.entries), default=0)
+        self.failures = {}  # kind -> consecutive failed deliveries
+        self.retry_at = {}  # kind -> monotonic() time before which not to try again
+        self.limiters = {
+            "sheets": TokenBucket(SHEETS_WRITES_PER_MINUTE, 60),
+            "storage": TokenBucket(FIRESTORE_WRITES_PER_SECOND, 1),
+        }
+        self._lock = threading.Lock()
+        if self.entries:
+            print(f"📮 Outbox: {len(self.entries)} writes waiting from the last run")
+        if self.parked:
+            print(f"📮 Outbox: {self.parked} rejected writes parked in {self.parked_journal.snapshot_path}")
+
+    # Copies of entries.values() because the worker thread removes delivered entries
+    def has(self, kind: str) -> bool:
+        return any(entry['kind'] == kind for entry in list(self.entries.values()))
+
+    def depth(self) -> dict:
+        """Pending entries per kind"""
+        counts = {}
+        for entry in list(self.entries.values()):
+            counts[entry['kind']] = counts.get(entry['kind'], 0) + 1
+        return counts
+
+    def add(self, kind: str, snapshot):
+        """Blocking: durably queue a snapshot. Restore data is dropped, sets become lists."""
+        if isinstance(snapshot, dict):
+            snapshot = {part: value for part, value in snapshot.items() if part != 'changes'}
+        entry = {'kind': kind, 'payload': json.loads(json.dumps(snapshot, default=list))}
+        with self._lock:
+            self.sequence += 1
+            key = f"{self.sequence:012d}"
+            self.journal.append({key: entry})
+            self.entries[key] = entry
+
+    def discard(self, *kinds):
+        """Blocking: drop every queued entry of the given kinds"""
+        with self._lock:
+            keys = [key for key, entry in self.entries.items() if entry['kind'] in kinds]
+            for key in keys:
+                del self.entries[key]
+            self.journal.append({}, keys)
+        for kind in kinds:
+            self.failures.pop(kind, None)
+            self.retry_at.pop(kind, None)
+
+    def next_retry(self) -> Optional[float]:
+        """Seconds until a backed-off kind with pending entries may be retried"""
+        now = monotonic()
+        waits = [max(0.0, self.retry_at.get(kind, now) - now) for kind in self.depth()]
+        return min(waits) if waits else None
+
+    def deliver(self, kind: str, write_fn):
+        """Blocking: send a kind's entries in order until one fails or the quota runs out"""
+        limiter = self.limiters["sheets" if kind == "sheets" else "storage"]
+        for key in sorted(key for key, entry in self.entries.items() if entry['kind'] == kind):
+            if monotonic() < self.retry_at.get(kind, 0):
+                return
+            payload = self.entries[key]['payload']
+            wait = limiter.take(write_cost(kind, payload))
+            if wait:
+                self.retry_at[kind] = monotonic() + wait
+                return
+            try:
+                write_fn(payload)
+            except Exception as e:
+                attempts = self.entries[key]['attempts'] = self.entries[key].get('attempts', 0) + 1
+                if is_permanent_error(e) or attempts >= self.max_attempts:
+                    self._park(key, e)
+                    continue
+                failures = self.failures[kind] = self.failures.get(kind, 0) + 1
+                delay = min(self.max_delay, self.base_delay * 2 ** (failures - 1)) * random.uniform(0.8, 1.2)
+                self.retry_at[kind] = monotonic() + delay
+                print(f"⚠️ Delivering {kind} failed ({e}); retrying in {delay:.0f}s, "
+                      f"{self.depth().get(kind, 0)} queued")
+                try:
+                    # Keep only what's left to send (writes drop the parts they finished)
+                    self.journal.append({key: self.entries[key]})
+                except Exception as journal_error:
+                    print(f"Error updating outbox: {journal_error}")
+                return
+            self.failures.pop(kind, None)
+            with self._lock:
+                del self.entries[key]
+            try:
+                self.journal.append({}, [key])
+            except Exception as e:
+                # Harmless unless we restart before the next journal write: then it's sent again
+                print(f"Error updating outbox: {e}")
+
+    def _park(self, key: str, error: Exception):
+        """Move an entry that can't be delivered out of the way of the ones behind it"""
+        entry = self.entries[key]
+        kind = entry['kind']
+        print(f"❌ Giving up on a {kind} write after {entry['attempts']} attempt(s) ({error}); "
+              f"parked in {self.parked_journal.snapshot_path}"
+              + (", run /sheet-reconcile to repair the sheet" if kind == "sheets" else ""))
+        try:
+            self.parked_journal.append({key: {**entry, 'error': str(error),
+                                              'parked_at': datetime.datetime.utcnow().isoformat()}})
+        except Exception as e:
+            print(f"Error parking outbox entry: {e}")
+        with self._lock:
+            del self.entries[key]
+            self.parked += 1
+        self.failures.pop(kind, None)
+        self.retry_at.pop(kind, None)
+        try:
+            self.journal.append({}, [key])
+        except Exception as e:
+            print(f"Error updating outbox: {e}")
+
+
+outbox = Outbox(OUTBOX_PATH)
+
+
+class PersistenceQueue:
+    """Background worker that saves data on behalf of command handlers.
+
+    Handlers call request_save() and return immediately. Requests arriving within
+    PERSIST_COALESCE_SECONDS are merged into one flush, snapshots are taken on the
+    event loop and the Firestore/file I/O runs in a worker thread. Sheet rows and
+    remote storage writes go through the outbox, which the worker retries on its own.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.pending = set()
+        self.flush_count = 0
+        self._wakeup = None
+        self._flush_lock = None
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the worker on the running event loop"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        if self.pending or outbox.entries:
+            self._wakeup.set()
+
+    def request(self, *kinds):
+        self.pending.update(kinds)
+        if self.running:
+            self._wakeup.set()
+        else:
+            # No event loop yet (startup, scripts): save straight away
+            self.flush_sync()
+
+    async def _run(self):
+        while True:
+            try:
+                # Wake up by ourselves when a backed-off outbox kind may be retried
+                await asyncio.wait_for(self._wakeup.wait(), outbox.next_retry())
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.sleep(self.delay)
+            self._wakeup.clear()
+            # Shielded so stop() never cancels a write halfway; its own flush waits on the lock
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        """Write everything requested so far without blocking the event loop"""
+        async with self._flush_lock:
+            kinds, self.pending = self.pending, set()
+            for kind in PERSISTERS:
+                if kind not in kinds and not outbox.has(kind):
+                    continue
+                snapshot_fn, write_fn, restore_fn = PERSISTERS[kind]
+                snapshot = snapshot_fn() if kind in kinds else None
+                # Entries queued before a fallback to local storage are delivered there, in order
+                if uses_outbox(kind) or outbox.has(kind):
+                    await self._deliver(kind, snapshot, write_fn, restore_fn)
+                    continue
+                if snapshot is None:
+                    continue
+                try:
+                    await asyncio.to_thread(write_fn, snapshot)
+                except Exception as e:
+                    restore_fn(snapshot)
+                    print(f"Error saving {kind}: {e}")
+            self.flush_count += 1
+
+    async def run_exclusive(self, fn, *args):
+        """Run a blocking function in a thread while no flush is in progress"""
+        if not self.running:
+            return await asyncio.to_thread(fn, *args)
+        async with self._flush_lock:
+            return await asyncio.to_thread(fn, *args)
+
+    async def _deliver(self, kind, snapshot, write_fn, restore_fn):
+        try:
+            if snapshot is not None:
+                await asyncio.to_thread(outbox.add, kind, snapshot)
+        except Exception as e:
+            # The outbox itself can't be written: keep the changes in memory instead
+            restore_fn(snapshot)
+            print(f"Error saving {kind}: {e}")
+            return
+        await asyncio.to_thread(outbox.deliver, kind, write_fn)
+
+    def flush_sync(self):
+        """Blocking flush, used when no event loop is running"""
+        kinds, self.pending = self.pending, set()
+        for kind in PERSISTERS:
+            if kind not in kinds and not outbox.has(kind):
+                continue
+            snapshot_fn, write_fn, restore_fn = PERSISTERS[kind]
+            snapshot = snapshot_fn() if kind in kinds else None
+            if uses_outbox(kind) or outbox.has(kind):
+                try:
+                    if snapshot is not None:
+                        outbox.add(kind, snapshot)
+                except Exception as e:
+                    restore_fn(snapshot)
+                    print(f"Error saving {kind}: {e}")
+                    continue
+                outbox.deliver(kind, write_fn)
+                continue
+            if snapshot is None:
+                continue
+            try:
+                write_fn(snapshot)
+            except Exception as e:
+                restore_fn(snapshot)
+                print(f"Error saving {kind}: {e}")
+
+    async def stop(self):
+        """Stop the worker and flush whatever is still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.flush()
+
+
+persistence_queue = PersistenceQueue(PERSIST_COALESCE_SECONDS)
+
+def request_save(*kinds):
+    """Queue a save of 'scheduled_events', 'staff_stats', 'tournament_rules' and/or 'sheets'"""
+    persistence_queue.request(*kinds)
+
+def clear_pending_saves():
+    """Forget event and staff changes not written yet (the stores are reloaded by the caller)"""
+    global rollups_reset_pending
+    pending_archive.clear()
+    staff_increments.clear()
+    rollup_increments.clear()
+    rollup_removals.clear()
+    rollups_reset_pending = False
+
+def wipe_storage():
+    """Blocking: delete every stored collection, the archive and the writes still queued
+    for them, so nothing from the previous tournament is delivered or reconciled later"""
+    outbox.discard(*PERSISTERS)
+    for collection in STORAGE_COLLECTIONS:
+        storage.clear(collection)
+    storage.clear_archive()
 
 # Enhanced command data structure for help system
 COMMAND_DATA = {
@@ -552,15 +2567,29 @@ COMMAND_DATA = {
             {
                 "name": "/staff-leaderboard",
                 "description": "Display staff leaderboard showing active judges and recorders",
-                "usage": "/staff-leaderboard",
+                "usage": "/staff-leaderboard [period]",
                 "permissions": "everyone",
                 "example": "Use `/staff-leaderboard` to see the most active staff members",
-                "parameters": [],
+                "parameters": [
+                    {
+                        "name": "period",
+                        "type": "choice",
+                        "required": False,
+                        "description": "Time period to rank",
+                        "constraints": "All Time (default), Today, This Week or This Season (UTC)",
+                        "examples": ["Today", "This Week"]
+                    }
+                ],
                 "usage_examples": [
                     {
                         "scenario": "Viewing staff statistics",
                         "command": "/staff-leaderboard",
                         "explanation": "Shows top staff, ranked by total matches handled"
+                    },
+                    {
+                        "scenario": "Checking this week's most active staff",
+                        "command": "/staff-leaderboard period:This Week",
+                        "explanation": "Ranks staff by matches handled since Monday"
                     }
                 ],
                 "tips_and_warnings": [
@@ -1268,6 +3297,23 @@ COMMAND_DATA = {
                 "tips_and_warnings": [],
                 "related_commands": [],
                 "common_errors": []
+            },
+            {
+                "name": "/sheet-reconcile",
+                "description": "Repair the Event Details and Mark Attendance sheets from the bot's records",
+                "usage": "/sheet-reconcile",
+                "permissions": "owner / head_organizer",
+                "example": "Run this after a Google Sheets outage or if rows look wrong",
+                "parameters": [],
+                "usage_examples": [],
+                "tips_and_warnings": [
+                    {
+                        "type": "tip",
+                        "content": "Only missing rows and wrong cells are written; rows the bot doesn't know about are left alone"
+                    }
+                ],
+                "related_commands": ["/info"],
+                "common_errors": []
             }
         ]
     },
@@ -2144,7 +4190,7 @@ class TakeScheduleButton(View):
                     scheduled_events[self.event_id]['judge'] = self.judge
                 else:
                     scheduled_events[self.event_id]['recorder'] = self.recorder
-                save_scheduled_events()
+                request_save("scheduled_events")
 
             # Notify and Add to channel
             await self.send_assignment_notification(interaction.user, role_type)
@@ -2461,14 +4507,6 @@ async def schedule_event_cleanup(event_id: str, delay_hours: int = 2):
                 except Exception as e:
                     print(f"Guild/channel fetch error during cleanup for {event_id}: {e}")
 
-                # Clean up poster file if any
-                try:
-                    poster_path = data.get('poster_path')
-                    if poster_path and os.path.exists(poster_path):
-                        os.remove(poster_path)
-                except Exception as e:
-                    print(f"Poster cleanup error for {event_id}: {e}")
-
                 # Remove any reminder task
                 try:
                     if event_id in reminder_tasks:
@@ -2477,11 +4515,14 @@ async def schedule_event_cleanup(event_id: str, delay_hours: int = 2):
                 except Exception:
                     pass
 
-                # Finally remove from scheduled events and persist
+                # Finally move the event out of the live schedule and persist
                 try:
-                    if event_id in scheduled_events:
+                    if scheduled_events.get(event_id, {}).get('status') == 'completed':
+                        archive_event(event_id)
+                        print(f"Event {event_id} cleaned up and archived")
+                    elif event_id in scheduled_events:
                         del scheduled_events[event_id]
-                        save_scheduled_events()
+                        request_save("scheduled_events")
                         print(f"Event {event_id} cleaned up from memory and file")
                 except Exception as e:
                     print(f"Error removing event {event_id} in cleanup: {e}")
@@ -2504,8 +4545,21 @@ async def schedule_event_cleanup(event_id: str, delay_hours: int = 2):
 
 
 # Google Fonts API Integration
+# Downloaded fonts are kept in FONT_CACHE_DIR across restarts, and loaded fonts in an LRU
+# keyed by (family, style, size), so a poster normally touches neither disk nor network.
+FONT_CACHE_DIR = os.environ.get("FONT_CACHE_DIR", "font_cache")
+FONT_CACHE_SIZE = int(os.environ.get("FONT_CACHE_SIZE", "32"))
+
+font_paths = {}    # (family, style) -> font file path, or None for Pillow's default font
+loaded_fonts = {}  # (family, style, size) -> FreeTypeFont, least recently used first
+_font_lock = threading.Lock()
+
 def download_google_font(font_family: str, font_style: str = "regular", font_weight: str = "400") -> str:
-    """Download a font from Google Fonts API and return the local file path"""
+    """Return the local path of a Google Font, downloading it into FONT_CACHE_DIR the first time"""
+    file_name = re.sub(r'[^A-Za-z0-9]+', '_', f"{font_family}-{font_style}-{font_weight}") + ".woff2"
+    cached_path = os.path.join(FONT_CACHE_DIR, file_name)
+    if os.path.exists(cached_path):
+        return cached_path
     try:
         # Google Fonts API URL
         api_url = f"https://fonts.googleapis.com/css2?family={font_family.replace(' ', '+')}:wght@{font_weight}"
@@ -2534,22 +4588,22 @@ def download_google_font(font_family: str, font_style: str = "regular", font_wei
         font_response = requests.get(font_url, timeout=15)
         font_response.raise_for_status()
         
-        # Create temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.woff2')
-        temp_file.write(font_response.content)
-        temp_file.close()
+        # Write to a temporary name first so an interrupted download is never picked up
+        os.makedirs(FONT_CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=FONT_CACHE_DIR, suffix='.part', delete=False) as temp_file:
+            temp_file.write(font_response.content)
+        os.replace(temp_file.name, cached_path)
         
-        print(f"Downloaded Google Font: {font_family} -> {temp_file.name}")
-        return temp_file.name
+        print(f"Downloaded Google Font: {font_family} -> {cached_path}")
+        return cached_path
         
     except Exception as e:
         print(f"Error downloading Google Font {font_family}: {e}")
         return None
 
-def get_font_with_fallbacks(font_name: str, size: int, font_style: str = "regular") -> ImageFont.FreeTypeFont:
-    """Get a font using your local fonts first, then Google Fonts as fallback"""
-    font_candidates = []
-    
+def resolve_font_path(font_name: str, font_style: str = "regular") -> str:
+    """Pick the font file for a family: your local fonts first, then Google Fonts, then
+    system fonts. Returns None when only Pillow's default font is left."""
     # 1. Try your local fonts FIRST (from Fonts/ folder)
     if font_name == "DS-Digital":
         # Prioritize DS-Digital fonts when specifically requested
@@ -2568,43 +4622,69 @@ def get_font_with_fallbacks(font_name: str, size: int, font_style: str = "regula
             str(Path("Fonts") / "ds_digital" / "DS-DIGI.TTF"),
             str(Path("Fonts") / "ds_digital" / "DS-DIGIT.TTF"),
         ]
-    font_candidates.extend(local_fonts)
     
-    # 2. Try Google Fonts as fallback (only if local fonts fail)
-    try:
-        google_font_path = download_google_font(font_name, font_style)
-        if google_font_path:
-            font_candidates.append(google_font_path)
-    except Exception as e:
-        print(f"Google Fonts failed for {font_name}: {e}")
-    
-    # 3. Try system fonts
-    system_fonts = [
-        "C:/Windows/Fonts/arial.ttf",
-        "C:/Windows/Fonts/arialbd.ttf", 
-        "C:/Windows/Fonts/impact.ttf",
-        "C:/Windows/Fonts/consola.ttf",
-        "C:/Windows/Fonts/trebucbd.ttf",
-    ]
-    font_candidates.extend(system_fonts)
+    def first_loadable(candidates):
+        for font_path in candidates:
+            try:
+                if font_path and os.path.exists(font_path):
+                    ImageFont.truetype(font_path, 10)
+                    return font_path
+            except Exception as e:
+                print(f"Failed to load font {font_path}: {e}")
+        return None
     
-    # Try each font candidate
-    for font_path in font_candidates:
+    font_path = first_loadable(local_fonts)
+    if not font_path:
+        # 2. Try Google Fonts as fallback (only if local fonts fail)
         try:
-            if os.path.exists(font_path):
-                font = ImageFont.truetype(font_path, size)
-                print(f"Successfully loaded font: {font_path}")
-                return font
+            font_path = first_loadable([download_google_font(font_name, font_style)])
         except Exception as e:
-            print(f"Failed to load font {font_path}: {e}")
-            continue
-    
-    # Final fallback to default font
-    print(f"All fonts failed, using default font for size {size}")
-    try:
-        return ImageFont.load_default().font_variant(size=size)
-    except:
-        return ImageFont.load_default()
+            print(f"Google Fonts failed for {font_name}: {e}")
+    if not font_path:
+        # 3. Try system fonts
+        system_fonts = [
+            "C:/Windows/Fonts/arial.ttf",
+            "C:/Windows/Fonts/arialbd.ttf", 
+            "C:/Windows/Fonts/impact.ttf",
+            "C:/Windows/Fonts/consola.ttf",
+            "C:/Windows/Fonts/trebucbd.ttf",
+        ]
+        font_path = first_loadable(system_fonts)
+    return font_path
+
+def get_font_with_fallbacks(font_name: str, size: int, font_style: str = "regular") -> ImageFont.FreeTypeFont:
+    """Get a font using your local fonts first, then Google Fonts as fallback.
+    Fonts are resolved once per family and loaded once per size."""
+    key = (font_name, font_style, size)
+    with _font_lock:
+        font = loaded_fonts.pop(key, None)
+        if font is not None:
+            loaded_fonts[key] = font  # most recently used goes last
+            return font
+        
+        if (font_name, font_style) not in font_paths:
+            font_paths[font_name, font_style] = resolve_font_path(font_name, font_style)
+            print(f"Resolved font {font_name} ({font_style}): {font_paths[font_name, font_style] or 'default'}")
+        font_path = font_paths[font_name, font_style]
+        
+        font = None
+        if font_path:
+            try:
+                font = ImageFont.truetype(font_path, size)
+            except Exception as e:
+                print(f"Failed to load font {font_path}: {e}")
+        if font is None:
+            # Final fallback to default font
+            print(f"All fonts failed, using default font for size {size}")
+            try:
+                font = ImageFont.load_default().font_variant(size=size)
+            except:
+                font = ImageFont.load_default()
+        
+        loaded_fonts[key] = font
+        while len(loaded_fonts) > FONT_CACHE_SIZE:
+            del loaded_fonts[next(iter(loaded_fonts))]
+        return font
 
 def sanitize_username_for_poster(username: str) -> str:
     """Convert Discord display names to poster-friendly ASCII by stripping emojis and fancy Unicode.
@@ -2626,33 +4706,244 @@ def sanitize_username_for_poster(username: str) -> str:
     except Exception:
         return str(username) if username else "Player"
 
+# Templates are 1920x1080 PNG/JPG files; posters are at most this size (Discord size limits)
+POSTER_MAX_SIZE = (800, 600)
+TEMPLATE_CACHE_MB = int(os.environ.get("TEMPLATE_CACHE_MB", "64"))
+
+def load_poster_template(template_path: str) -> Image.Image:
+    """Blocking: decode a template, convert it to RGBA and scale it down to poster size"""
+    with Image.open(template_path) as img:
+        print(f"Opened template image: {img.size}, mode: {img.mode}")
+        
+        # Convert to RGBA if needed
+        img = img.convert('RGBA') if img.mode != 'RGBA' else img.copy()
+    
+    # Resize image to be smaller (max 800x600 to avoid Discord size limits)
+    max_width, max_height = POSTER_MAX_SIZE
+    width, height = img.size
+    
+    # Calculate new dimensions while maintaining aspect ratio
+    if width > max_width or height > max_height:
+        ratio = min(max_width / width, max_height / height)
+        new_width = int(width * ratio)
+        new_height = int(height * ratio)
+        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        print(f"Resized image to: {new_width}x{new_height}")
+    return img
+
+class TemplateCache:
+    """Poster templates kept decoded and scaled down, so a poster starts from a ready RGBA image.
+
+    Entries are checked against the file's mtime and size on every get, so an edited or
+    replaced template is loaded again. Past max_bytes the least recently used are dropped.
+    Images handed out are shared: copy them before drawing.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = {}  # path -> ((mtime_ns, size), image), least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def _drop(self, path: str):
+        _, image = self.entries.pop(path)
+        self.bytes -= self._size(image)
+
+    def get(self, template_path: str) -> Image.Image:
+        stat = os.stat(template_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self.entries.get(template_path)
+            if entry and entry[0] == stamp:
+                self.hits += 1
+                # Most recently used goes last
+                self.entries[template_path] = self.entries.pop(template_path)
+                return entry[1]
+        
+        image = load_poster_template(template_path)
+        with self._lock:
+            self.misses += 1
+            if template_path in self.entries:
+                self._drop(template_path)
+            self.entries[template_path] = (stamp, image)
+            self.bytes += self._size(image)
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                self._drop(next(iter(self.entries)))
+        return image
+
+    def warm(self, template_paths):
+        """Blocking: load templates ahead of the first poster, as far as max_bytes allows"""
+        for template_path in template_paths:
+            if self.bytes >= self.max_bytes:
+                break
+            try:
+                self.get(template_path)
+            except Exception as e:
+                print(f"Error preloading template {template_path}: {e}")
+
+template_cache = TemplateCache(TEMPLATE_CACHE_MB * 1024 * 1024)
+
+TEMPLATE_FOLDERS = {"MW": Path("MW Templates"), "MWT": Path("MWT Templates")}
+TEMPLATE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif'}
+
+class TemplateRegistry:
+    """Template files per mode, listed once and listed again when the folder's mtime changes
+    (files added, removed or renamed; edits in place are picked up by template_cache).
+
+    pick() deals from a shuffled deck per mode: every template is used once before any
+    repeats, and a new deck never starts with the template that ended the last one.
+    """
+
+    def __init__(self, folders: dict):
+        self.folders = folders
+        self.templates = {}  # mode -> (folder mtime_ns, [paths])
+        self.decks = {}      # mode -> templates not dealt yet
+        self.last = {}       # mode -> template dealt last
+        self._lock = threading.Lock()
+
+    def _paths(self, mode: str) -> list:
+        folder = self.folders[mode]
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return []
+        listed = self.templates.get(mode)
+        if not listed or listed[0] != mtime:
+            paths = sorted(str(folder / name) for name in os.listdir(folder)
+                           if os.path.splitext(name)[1].lower() in TEMPLATE_EXTENSIONS)
+            self.templates[mode] = listed = (mtime, paths)
+            self.decks.pop(mode, None)
+        return listed[1]
+
+    def all_paths(self) -> list:
+        with self._lock:
+            return [path for mode in self.folders for path in self._paths(mode)]
+
+    def pick(self, mode: str) -> Optional[str]:
+        with self._lock:
+            paths = self._paths(mode)
+            if not paths:
+                return None
+            deck = self.decks.get(mode)
+            if not deck:
+                deck = self.decks[mode] = random.sample(paths, len(paths))
+                # Templates are dealt from the end
+                if len(deck) > 1 and deck[-1] == self.last.get(mode):
+                    deck[0], deck[-1] = deck[-1], deck[0]
+            self.last[mode] = deck.pop()
+            return self.last[mode]
+
+template_registry = TemplateRegistry(TEMPLATE_FOLDERS)
+
 def get_random_template(mode="MW"):
-    """Get a random template image based on mode (MW or MWT)"""
-    # Define folder paths
-    mw_path = Path("MW Templates")
-    mwt_path = Path("MWT Templates")
-    
+    """Get a random template image based on mode (MW or MWT), without repeating one
+    until the mode's other templates have been used"""
     # Select folder based on mode
-    target_path = mwt_path if mode == "MWT" else mw_path
-    
-    if target_path.exists():
-        # Get all image files
-        image_extensions = ['*.jpg', '*.jpeg', '*.png', '*.gif']
-        image_files = []
-        for ext in image_extensions:
-            # Using glob directly on the path object's glob method if strict path object, 
-            # but current code uses glob module with string path
-            image_files.extend(glob.glob(str(target_path / ext)))
-            image_files.extend(glob.glob(str(target_path / ext.upper())))
-        
-        if image_files:
-            return random.choice(image_files)
+    mode = "MWT" if mode == "MWT" else "MW"
+    template_path = template_registry.pick(mode)
+    if template_path:
+        return template_path
             
-    print(f"⚠️ Template folder not found or empty: {target_path}")
+    print(f"⚠️ Template folder not found or empty: {TEMPLATE_FOLDERS[mode]}")
     return None
 
-def create_event_poster(template_path: str, round_label: str, team1_captain: str, team2_captain: str, utc_time: str, date_str: str = None, server_name: str = "Winterfell Arena Esports") -> str:
-    """Create event poster with text overlays using Google Fonts and improved error handling"""
+def draw_outlined_text(image: Image.Image, draw: ImageDraw.ImageDraw, position: tuple, text: str, font,
+                       fill: tuple, outline_fill: tuple, outline_width: int = 4):
+    """Draw text with a square outline outline_width pixels thick.
+
+    Drawing the text at every offset of a (2 * outline_width + 1) square grid leaves each
+    pixel with 1 - product(1 - coverage) of outline. Here the text is rasterized once,
+    that product is taken over shifted copies of its mask one axis at a time, and the
+    outline and then the text are pasted through the masks: the same pixels (within a few
+    levels of rounding) for two glyph renderings instead of 81.
+    """
+    x, y = int(position[0]), int(position[1])
+    try:
+        left, top, right, bottom = draw.textbbox((x, y), text, font=font)
+        # The margin keeps shifted copies from wrapping text around the edges
+        box = (left - outline_width, top - outline_width, right + outline_width, bottom + outline_width)
+        mask = Image.new("L", (box[2] - box[0], box[3] - box[1]), 0)
+        ImageDraw.Draw(mask).text((x - box[0], y - box[1]), text, font=font, fill=255)
+        uncovered = ImageChops.invert(mask)
+        rows = uncovered
+        for offset in range(1, outline_width + 1):
+            rows = ImageChops.multiply(rows, ImageChops.offset(uncovered, offset, 0))
+            rows = ImageChops.multiply(rows, ImageChops.offset(uncovered, -offset, 0))
+        square = rows
+        for offset in range(1, outline_width + 1):
+            square = ImageChops.multiply(square, ImageChops.offset(rows, 0, offset))
+            square = ImageChops.multiply(square, ImageChops.offset(rows, 0, -offset))
+        image.paste(outline_fill, box, ImageChops.invert(square))
+        # Main text on top, from the same rasterization
+        image.paste(fill, box, mask)
+    except Exception as e:
+        print(f"Error drawing outlined text: {e}")
+        try:
+            draw.text((x, y), text, font=font, fill=fill)
+        except Exception as e:
+            print(f"Error drawing main text: {e}")
+
+# Posters are encoded in the first of POSTER_FORMATS, at the highest quality step, that
+# fits in POSTER_BYTE_BUDGET_KB; uploads are the slow part on our hosting's egress
+POSTER_BYTE_BUDGET = int(os.environ.get("POSTER_BYTE_BUDGET_KB", "256")) * 1024
+POSTER_QUALITY_STEPS = {
+    "jpeg": (90, 80, 70),  # JPEG quality
+    "webp": (90, 80, 70),  # WebP quality
+    "png": (256, 128, 64),  # palette size of a quantized PNG
+}
+POSTER_FORMATS = [name for name in os.environ.get("POSTER_FORMATS", "jpeg,webp,png").replace(" ", "").lower().split(",")
+                  if name in POSTER_QUALITY_STEPS] or ["png"]
+POSTER_EXTENSIONS = {"jpeg": "jpg", "webp": "webp", "png": "png"}
+
+@dataclasses.dataclass
+class EncodedPoster:
+    """A poster encoded for upload, with how it was encoded"""
+    data: bytes
+    format: str
+    quality: int
+    encode_ms: float
+
+    @property
+    def filename(self) -> str:
+        return f"event_poster.{POSTER_EXTENSIONS[self.format]}"
+
+    def summary(self) -> dict:
+        return {'format': self.format, 'quality': self.quality, 'bytes': len(self.data),
+                'encode_ms': round(self.encode_ms, 1)}
+
+def encode_image(image: Image.Image, image_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "jpeg":
+        image.convert("RGB").save(buffer, "JPEG", quality=quality, optimize=True)
+    elif image_format == "webp":
+        image.save(buffer, "WEBP", quality=quality, method=4)
+    else:
+        image.quantize(quality, method=Image.Quantize.FASTOCTREE).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def encode_poster(image: Image.Image, budget: int = POSTER_BYTE_BUDGET, formats=None) -> EncodedPoster:
+    """Encode in the first format and quality step, in order of preference, that fits in
+    budget bytes; if none does, the smallest encoding tried"""
+    started = monotonic()
+    smallest = None
+    for image_format in formats or POSTER_FORMATS:
+        for quality in POSTER_QUALITY_STEPS[image_format]:
+            data = encode_image(image, image_format, quality)
+            if smallest is None or len(data) < len(smallest[0]):
+                smallest = (data, image_format, quality)
+            if len(data) <= budget:
+                return EncodedPoster(data, image_format, quality, (monotonic() - started) * 1000)
+    print(f"⚠️ No poster encoding fits in {budget} bytes, using the smallest ({len(smallest[0])} bytes)")
+    return EncodedPoster(*smallest, (monotonic() - started) * 1000)
+
+def create_event_poster(template_path: str, round_label: str, team1_captain: str, team2_captain: str, utc_time: str, date_str: str = None, server_name: str = "Winterfell Arena Esports") -> Optional[EncodedPoster]:
+    """Create event poster with text overlays and return it encoded in memory"""
     print(f"Creating poster with template: {template_path}")
     
     try:
@@ -2661,181 +4952,382 @@ def create_event_poster(template_path: str, round_label: str, team1_captain: str
             print(f"Template file not found: {template_path}")
             return None
             
-        # Open the template image
-        with Image.open(template_path) as img:
-            print(f"Opened template image: {img.size}, mode: {img.mode}")
-            
-            # Convert to RGBA if needed
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-            
-            # Resize image to be smaller (max 800x600 to avoid Discord size limits)
-            max_width, max_height = 800, 600
-            width, height = img.size
-            
-            # Calculate new dimensions while maintaining aspect ratio
-            if width > max_width or height > max_height:
-                ratio = min(max_width / width, max_height / height)
-                new_width = int(width * ratio)
-                new_height = int(height * ratio)
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                print(f"Resized image to: {new_width}x{new_height}")
-            
-            # Create a copy to work with
-            poster = img.copy()
-            draw = ImageDraw.Draw(poster)
-            
-            # Get final image dimensions
-            width, height = poster.size
-            
-            # Load fonts using the new system with Google Fonts integration
-            print("Loading fonts...")
-            
-            # Define font sizes based on image height (reduced for better fit)
-            title_size = int(height * 0.10)
-            round_size = int(height * 0.14)
-            vs_size = int(height * 0.09)
-            time_size = int(height * 0.07)
-            tiny_size = int(height * 0.05)
-            
-            # Load fonts with Google Fonts fallback
-            try:
-                # Use Square One font for server name, DS-Digital for round, date, and time
-                font_title = get_font_with_fallbacks("Square One", title_size, "bold")  # Server name
-                font_round = get_font_with_fallbacks("DS-Digital", round_size, "bold")  # Round text
-                # Use a unique bundled font for player names so styling is consistent regardless of Discord nickname styling
-                font_vs = get_font_with_fallbacks("Capture it", vs_size, "bold")       # Unique display font from Fonts/capture_it
-                font_time = get_font_with_fallbacks("DS-Digital", time_size, "bold")  # Date and time
-                font_tiny = get_font_with_fallbacks("Roboto", tiny_size)              # Small text
-                
-                print("Fonts loaded successfully")
-                
-            except Exception as font_error:
-                print(f"Font loading error: {font_error}")
-                # Ultimate fallback to default fonts
-                font_title = ImageFont.load_default()
-                font_round = ImageFont.load_default()
-                font_vs = ImageFont.load_default()
-                font_time = ImageFont.load_default()
-                font_tiny = ImageFont.load_default()
-            
-            # Define colors for clean visibility
-            text_color = (255, 255, 255)  # Bright white
-            outline_color = (0, 0, 0)     # Pure black
-            yellow_color = (255, 255, 0)  # Bright yellow for important text
-            
-            # Helper function to draw text with outline
-            def draw_text_with_outline(text, x, y, font, text_color=text_color, use_yellow=False):
-                x, y = int(x), int(y)
-                final_text_color = yellow_color if use_yellow else text_color
-                
-                # Draw thick black outline for visibility
-                outline_width = 4
-                for dx in range(-outline_width, outline_width + 1):
-                    for dy in range(-outline_width, outline_width + 1):
-                        if dx != 0 or dy != 0:
-                            try:
-                                draw.text((x + dx, y + dy), text, font=font, fill=outline_color)
-                            except Exception as e:
-                                print(f"Error drawing outline: {e}")
-                
-                # Draw main text on top
-                try:
-                    draw.text((x, y), text, font=font, fill=final_text_color)
-                except Exception as e:
-                    print(f"Error drawing main text: {e}")
+        # Decoded, converted to RGBA and scaled down once per template file
+        img = template_cache.get(template_path)
+        
+        # Create a copy to work with
+        poster = img.copy()
+        draw = ImageDraw.Draw(poster)
+        
+        # Get final image dimensions
+        width, height = poster.size
+        
+        # Load fonts using the new system with Google Fonts integration
+        print("Loading fonts...")
+        
+        # Define font sizes based on image height (reduced for better fit)
+        title_size = int(height * 0.10)
+        round_size = int(height * 0.14)
+        vs_size = int(height * 0.09)
+        time_size = int(height * 0.07)
+        tiny_size = int(height * 0.05)
+        
+        # Load fonts with Google Fonts fallback
+        try:
+            # Use Square One font for server name, DS-Digital for round, date, and time
+            font_title = get_font_with_fallbacks("Square One", title_size, "bold")  # Server name
+            font_round = get_font_with_fallbacks("DS-Digital", round_size, "bold")  # Round text
+            # Use a unique bundled font for player names so styling is consistent regardless of Discord nickname styling
+            font_vs = get_font_with_fallbacks("Capture it", vs_size, "bold")       # Unique display font from Fonts/capture_it
+            font_time = get_font_with_fallbacks("DS-Digital", time_size, "bold")  # Date and time
+            font_tiny = get_font_with_fallbacks("Roboto", tiny_size)              # Small text
             
-            # Add server name text (top center)
-            try:
-                server_text = server_name
-                server_bbox = draw.textbbox((0, 0), server_text, font=font_title)
-                server_width = server_bbox[2] - server_bbox[0]
-                server_x = (width - server_width) // 2
-                server_y = int(height * 0.08)
-                draw_text_with_outline(server_text, server_x, server_y, font_title)
-                print(f"Added server name: {server_text}")
-            except Exception as e:
-                print(f"Error adding server name: {e}")
+            print("Fonts loaded successfully")
             
-            # Add Round text (center) - use yellow for emphasis
-            try:
-                round_text = f"ROUND {round_label}"
-                round_bbox = draw.textbbox((0, 0), round_text, font=font_round)
-                round_width = round_bbox[2] - round_bbox[0]
-                round_x = (width - round_width) // 2
-                round_y = int(height * 0.35)
-                draw_text_with_outline(round_text, round_x, round_y, font_round, use_yellow=True)
-                print(f"Added round text: {round_text}")
-            except Exception as e:
-                print(f"Error adding round text: {e}")
+        except Exception as font_error:
+            print(f"Font loading error: {font_error}")
+            # Ultimate fallback to default fonts
+            font_title = ImageFont.load_default()
+            font_round = ImageFont.load_default()
+            font_vs = ImageFont.load_default()
+            font_time = ImageFont.load_default()
+            font_tiny = ImageFont.load_default()
+        
+        # Define colors for clean visibility
+        text_color = (255, 255, 255)  # Bright white
+        outline_color = (0, 0, 0)     # Pure black
+        yellow_color = (255, 255, 0)  # Bright yellow for important text
+        
+        # Helper function to draw text with outline
+        def draw_text_with_outline(text, x, y, font, text_color=text_color, use_yellow=False):
+            final_text_color = yellow_color if use_yellow else text_color
+            # Thick black outline for visibility
+            draw_outlined_text(poster, draw, (x, y), text, font, final_text_color, outline_color, outline_width=4)
+        
+        # Add server name text (top center)
+        try:
+            server_text = server_name
+            server_bbox = draw.textbbox((0, 0), server_text, font=font_title)
+            server_width = server_bbox[2] - server_bbox[0]
+            server_x = (width - server_width) // 2
+            server_y = int(height * 0.08)
+            draw_text_with_outline(server_text, server_x, server_y, font_title)
+            print(f"Added server name: {server_text}")
+        except Exception as e:
+            print(f"Error adding server name: {e}")
+        
+        # Add Round text (center) - use yellow for emphasis
+        try:
+            round_text = f"ROUND {round_label}"
+            round_bbox = draw.textbbox((0, 0), round_text, font=font_round)
+            round_width = round_bbox[2] - round_bbox[0]
+            round_x = (width - round_width) // 2
+            round_y = int(height * 0.35)
+            draw_text_with_outline(round_text, round_x, round_y, font_round, use_yellow=True)
+            print(f"Added round text: {round_text}")
+        except Exception as e:
+            print(f"Error adding round text: {e}")
+        
+        # Add Captain vs Captain text (center)
+        try:
+            left_name_text = sanitize_username_for_poster(team1_captain)
+            vs_core = " VS "
+            right_name_text = sanitize_username_for_poster(team2_captain)
+
+            # Measure text components to center the whole line
+            left_box = draw.textbbox((0, 0), left_name_text, font=font_vs)
+            vs_box = draw.textbbox((0, 0), vs_core, font=font_vs)
+            right_box = draw.textbbox((0, 0), right_name_text, font=font_vs)
             
-            # Add Captain vs Captain text (center)
-            try:
-                left_name_text = sanitize_username_for_poster(team1_captain)
-                vs_core = " VS "
-                right_name_text = sanitize_username_for_poster(team2_captain)
-
-                # Measure text components to center the whole line
-                left_box = draw.textbbox((0, 0), left_name_text, font=font_vs)
-                vs_box = draw.textbbox((0, 0), vs_core, font=font_vs)
-                right_box = draw.textbbox((0, 0), right_name_text, font=font_vs)
-                
-                total_width = (left_box[2] - left_box[0]) + (vs_box[2] - vs_box[0]) + (right_box[2] - right_box[0])
-                current_x = (width - total_width) // 2
-                vs_y = int(height * 0.55)
+            total_width = (left_box[2] - left_box[0]) + (vs_box[2] - vs_box[0]) + (right_box[2] - right_box[0])
+            current_x = (width - total_width) // 2
+            vs_y = int(height * 0.55)
 
-                # Draw left name
-                draw_text_with_outline(left_name_text, current_x, vs_y, font_vs)
-                current_x += (left_box[2] - left_box[0])
-                
-                # Draw VS
-                draw_text_with_outline(vs_core, current_x, vs_y, font_vs, use_yellow=False)
-                current_x += (vs_box[2] - vs_box[0])
-                
-                # Draw right name
-                draw_text_with_outline(right_name_text, current_x, vs_y, font_vs)
-                
-                print(f"Added VS text: {left_name_text} VS {right_name_text}")
-            except Exception as e:
-                print(f"Error adding VS text: {e}")
+            # Draw left name
+            draw_text_with_outline(left_name_text, current_x, vs_y, font_vs)
+            current_x += (left_box[2] - left_box[0])
             
-            # Add date (if provided)
-            if date_str:
-                try:
-                    date_text = f"DATE:  {date_str}"
-                    date_bbox = draw.textbbox((0, 0), date_text, font=font_time)
-                    date_width = date_bbox[2] - date_bbox[0]
-                    date_x = (width - date_width) // 2
-                    date_y = int(height * 0.72)
-                    draw_text_with_outline(date_text, date_x, date_y, font_time)
-                    print(f"Added date: {date_text}")
-                except Exception as e:
-                    print(f"Error adding date: {e}")
+            # Draw VS
+            draw_text_with_outline(vs_core, current_x, vs_y, font_vs, use_yellow=False)
+            current_x += (vs_box[2] - vs_box[0])
+            
+            # Draw right name
+            draw_text_with_outline(right_name_text, current_x, vs_y, font_vs)
             
-            # Add UTC time
+            print(f"Added VS text: {left_name_text} VS {right_name_text}")
+        except Exception as e:
+            print(f"Error adding VS text: {e}")
+        
+        # Add date (if provided)
+        if date_str:
             try:
-                time_text = f"TIME:  {utc_time}"
-                time_bbox = draw.textbbox((0, 0), time_text, font=font_time)
-                time_width = time_bbox[2] - time_bbox[0]
-                time_x = (width - time_width) // 2
-                time_y = int(height * 0.82) if date_str else int(height * 0.75)
-                draw_text_with_outline(time_text, time_x, time_y, font_time)
-                print(f"Added time: {time_text}")
+                date_text = f"DATE:  {date_str}"
+                date_bbox = draw.textbbox((0, 0), date_text, font=font_time)
+                date_width = date_bbox[2] - date_bbox[0]
+                date_x = (width - date_width) // 2
+                date_y = int(height * 0.72)
+                draw_text_with_outline(date_text, date_x, date_y, font_time)
+                print(f"Added date: {date_text}")
             except Exception as e:
-                print(f"Error adding time: {e}")
-            
-            # Save the modified image
-            output_path = f"temp_poster_{int(datetime.datetime.now().timestamp())}.png"
-            poster.save(output_path, "PNG")
-            print(f"Poster saved successfully: {output_path}")
-            return output_path
-            
+                print(f"Error adding date: {e}")
+        
+        # Add UTC time
+        try:
+            time_text = f"TIME:  {utc_time}"
+            time_bbox = draw.textbbox((0, 0), time_text, font=font_time)
+            time_width = time_bbox[2] - time_bbox[0]
+            time_x = (width - time_width) // 2
+            time_y = int(height * 0.82) if date_str else int(height * 0.75)
+            draw_text_with_outline(time_text, time_x, time_y, font_time)
+            print(f"Added time: {time_text}")
+        except Exception as e:
+            print(f"Error adding time: {e}")
+        
+        # Encode once, in memory, within the upload budget; the caller uploads these bytes
+        encoded = encode_poster(poster)
+        print(f"Poster rendered successfully: {encoded.format} q{encoded.quality}, "
+              f"{len(encoded.data)} bytes, encoded in {encoded.encode_ms:.0f} ms")
+        return encoded
+        
     except Exception as e:
         print(f"Critical error creating poster: {e}")
         import traceback
         traceback.print_exc()
         return None
 
+def remove_stale_posters():
+    """Delete temp_poster_*.png files left behind by versions that wrote posters to disk"""
+    for poster_path in glob.glob("temp_poster_*.png"):
+        try:
+            os.remove(poster_path)
+        except Exception as e:
+            print(f"Error deleting poster file {poster_path}: {e}")
+
+def uploaded_poster_url(message: discord.Message) -> Optional[str]:
+    """CDN URL of the poster a message uploaded, so later posts can link to it instead of
+    sending the bytes again"""
+    for embed in message.embeds:
+        if embed.image and embed.image.url:
+            return embed.image.url
+    return message.attachments[0].url if message.attachments else None
+
+# Posters render in worker threads: PIL work never blocks the event loop, at most
+# POSTER_RENDER_WORKERS run at once and up to POSTER_QUEUE_LIMIT more wait their turn.
+POSTER_RENDER_WORKERS = int(os.environ.get("POSTER_RENDER_WORKERS", "2"))
+POSTER_QUEUE_LIMIT = int(os.environ.get("POSTER_QUEUE_LIMIT", "10"))
+
+class PosterQueueFull(Exception):
+    """More posters are waiting to render than the queue allows"""
+
+class PosterRenderer:
+    """Runs poster rendering in a thread pool with a concurrency limit and a bounded,
+    first-come first-served waiting line.
+
+    A render that can't start straight away gets a ticket; when a running render finishes
+    it hands its slot to the oldest ticket. render() raises PosterQueueFull when the line
+    is already full, so a burst of /event-create calls is turned away instead of piling up.
+    """
+
+    def __init__(self, workers: int, limit: int):
+        self.workers = workers
+        self.limit = limit
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="poster")
+        self.active = 0
+        self.waiting = []  # tickets (futures) of queued renders, oldest first
+
+    async def render(self, fn, *args, on_queued=None):
+        """Run fn(*args) in the pool and return its result. on_queued(position) is awaited
+        when the render has to wait, with its 1-based place in line."""
+        if self.active < self.workers and not self.waiting:
+            self.active += 1
+        else:
+            if len(self.waiting) >= self.limit:
+                raise PosterQueueFull(f"{len(self.waiting)} posters are already waiting")
+            ticket = asyncio.get_running_loop().create_future()
+            self.waiting.append(ticket)
+            try:
+                if on_queued:
+                    try:
+                        await on_queued(len(self.waiting))
+                    except Exception as e:
+                        print(f"Error reporting poster queue position: {e}")
+                await ticket  # resolved once a slot has been handed over
+            except asyncio.CancelledError:
+                if ticket.done() and not ticket.cancelled():
+                    self._release()  # the slot was already ours
+                elif ticket in self.waiting:
+                    self.waiting.remove(ticket)
+                raise
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self._release()
+
+    def _release(self):
+        while self.waiting:
+            ticket = self.waiting.pop(0)
+            if not ticket.done():
+                ticket.set_result(None)  # the slot passes straight on
+                return
+        self.active -= 1
+
+poster_renderer = PosterRenderer(POSTER_RENDER_WORKERS, POSTER_QUEUE_LIMIT)
+
+# Bump when create_event_poster draws differently, so cached posters aren't reused
+POSTER_RENDERER_VERSION = 1
+POSTER_CACHE_MB = int(os.environ.get("POSTER_CACHE_MB", "32"))
+POSTER_CACHE_DIR = os.environ.get("POSTER_CACHE_DIR", "")  # empty: memory only
+POSTER_CACHE_DISK_MB = int(os.environ.get("POSTER_CACHE_DISK_MB", "256"))
+
+class PosterCache:
+    """Encoded posters by a hash of the mode and everything drawn on them, so the same
+    poster asked for again is a lookup and keeps the template it was first drawn on.
+
+    The in-memory layer holds up to max_bytes of posters, least recently used dropped
+    first. With a directory, posters are also written there (one file: a JSON header line,
+    then the bytes) and survive restarts; the oldest files go past max_disk_bytes. A cached
+    poster is dropped once its template file changes or disappears.
+    get() and put() touch files, so the event loop calls them in a worker thread.
+    """
+
+    def __init__(self, max_bytes: int, directory: str = "", max_disk_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = {}  # key -> (EncodedPoster, template stamp), least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(mode: str, round_label: str, team1_captain: str, team2_captain: str, utc_time: str,
+            date_str: str = None, server_name: str = "Winterfell Arena Esports") -> str:
+        """Content address of a poster: the template mode, the text drawn on it, the
+        renderer version and the encoding settings. The template picked is not part of it."""
+        fields = [POSTER_RENDERER_VERSION, mode, round_label,
+                  sanitize_username_for_poster(team1_captain), sanitize_username_for_poster(team2_captain),
+                  utc_time, date_str, server_name, POSTER_BYTE_BUDGET, POSTER_FORMATS]
+        return hashlib.sha256(json.dumps(fields).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def template_stamp(template_path: str) -> list:
+        stat = os.stat(template_path)
+        return [template_path, stat.st_size, stat.st_mtime_ns]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.poster")
+
+    def get(self, key: str) -> Optional[EncodedPoster]:
+        """Blocking: the cached poster, if its template hasn't changed since it was drawn"""
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is None and self.directory:
+                entry = self._read(key)
+                if entry is not None:
+                    self.bytes += len(entry[0].data)
+            if entry is not None:
+                try:
+                    current = self.template_stamp(entry[1][0]) == entry[1]
+                except OSError:
+                    current = False
+                if not current:
+                    self.bytes -= len(entry[0].data)
+                    entry = None
+                    if self.directory:
+                        self._remove(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries[key] = entry  # most recently used goes last
+            self._evict()
+            return entry[0]
+
+    def put(self, key: str, poster: EncodedPoster, template_path: str):
+        """Blocking: remember a poster drawn on template_path"""
+        try:
+            stamp = self.template_stamp(template_path)
+        except OSError:
+            return
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous[0].data)
+            self.entries[key] = (poster, stamp)
+            self.bytes += len(poster.data)
+            self._evict()
+            if self.directory:
+                self._write(key, poster, stamp)
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self.entries:
+            self.bytes -= len(self.entries.pop(next(iter(self.entries)))[0].data)
+
+    def _read(self, key: str) -> Optional[tuple]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                header = json.loads(f.readline())
+                data = f.read()
+            os.utime(self._path(key))  # recently used files are evicted last
+            poster = EncodedPoster(data, header['format'], header['quality'], header['encode_ms'])
+            return poster, header['template']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading cached poster {key}: {e}")
+            return None
+
+    def _remove(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error removing cached poster {key}: {e}")
+
+    def _write(self, key: str, poster: EncodedPoster, stamp: list):
+        try:
+            header = json.dumps({'format': poster.format, 'quality': poster.quality,
+                                 'encode_ms': poster.encode_ms, 'template': stamp})
+            with tempfile.NamedTemporaryFile(dir=self.directory, suffix='.part', delete=False) as f:
+                f.write(header.encode('utf-8') + b"\n" + poster.data)
+            os.replace(f.name, self._path(key))
+            files = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.poster')]
+            total = sum(entry.stat().st_size for entry in files)
+            for entry in sorted(files, key=lambda entry: entry.stat().st_mtime_ns):
+                if total <= self.max_disk_bytes:
+                    break
+                total -= entry.stat().st_size
+                os.remove(entry.path)
+        except Exception as e:
+            print(f"Error caching poster {key}: {e}")
+
+poster_cache = PosterCache(POSTER_CACHE_MB * 1024 * 1024, POSTER_CACHE_DIR, POSTER_CACHE_DISK_MB * 1024 * 1024)
+
+async def get_event_poster(mode: str, round_label: str, team1_captain: str, team2_captain: str,
+                           utc_time: str, date_str: str = None, on_queued=None) -> Optional[EncodedPoster]:
+    """The poster for these fields: from poster_cache if it was drawn before (on the same
+    template), otherwise drawn on a template from get_random_template in the render pool
+    (see PosterRenderer.render, which may raise PosterQueueFull)"""
+    key = poster_cache.key(mode, round_label, team1_captain, team2_captain, utc_time, date_str)
+    poster = await asyncio.to_thread(poster_cache.get, key)
+    if poster is not None:
+        print(f"♻️ Reusing cached poster {key[:12]}")
+        return poster
+    template_path = get_random_template(mode)
+    if not template_path:
+        return None
+    poster = await poster_renderer.render(
+        create_event_poster, template_path, round_label, team1_captain, team2_captain, utc_time, date_str,
+        on_queued=on_queued
+    )
+    if poster is not None:
+        await asyncio.to_thread(poster_cache.put, key, poster, template_path)
+    return poster
+
 def calculate_time_difference(event_datetime: datetime.datetime, user_timezone: str = None) -> dict:
     """Calculate time difference and format for different timezones"""
     current_time = datetime.datetime.now(pytz.UTC).replace(tzinfo=None)
@@ -3012,54 +5504,65 @@ async def on_message(message):
     # Process other bot commands (important for command processing)
     await bot.process_commands(message)
 
+@bot.event
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    """Forget a schedule message deleted by hand, so cleanup, /event-delete and the
+    unassigned list don't fetch or link to it any more"""
+    event_id, event_data = find_message_event(payload.message_id)
+    if event_data is None:
+        return
+    event_data['schedule_message_id'] = None
+    event_data['schedule_channel_id'] = None
+    request_save("scheduled_events")
+    print(f"Schedule message for {event_id} was deleted")
+
 @bot.event
 async def on_ready():
     print(f"✅ Bot is online as {bot.user}")
     print(f"🆔 Bot ID: {bot.user.id}")
     print(f"📊 Connected to {len(bot.guilds)} guild(s)")
     
-    # Load scheduled events from file
-    load_scheduled_events()
-    
-    # Load tournament rules from file
-    load_rules()
+    # Data is loaded by start_services while the gateway connects; in-memory state stays
+    # authoritative across reconnects, so it isn't read back here
+    await bot.data_ready.wait()
     
-    # Reschedule cleanups for any events already marked finished_on if needed (optional)
+    # Clean up events older than 7 days and reschedule reminders for upcoming ones.
+    # Only the matching slices of the time index are visited, not every event.
     try:
-        for ev_id, data in list(scheduled_events.items()):
-            # If previously scheduled cleanup exists, skip (it won't persist); we don't know result time here
-            # Optionally: clean up events older than 7 days to avoid clutter
-            try:
-                dt = data.get('datetime')
-                if isinstance(dt, datetime.datetime):
-                    age_days = (datetime.datetime.now() - dt).days
-                    if age_days >= 7:
-                        # Hard cleanup very old events
-                        if ev_id in reminder_tasks:
-                            try:
-                                reminder_tasks[ev_id].cancel()
-                                del reminder_tasks[ev_id]
-                            except Exception:
-                                pass
-                        del scheduled_events[ev_id]
-                    elif data.get('status') == 'scheduled' or not data.get('status'):
-                        try:
-                            ch_id = data.get('channel_id')
-                            if ch_id:
-                                ch = bot.get_channel(int(ch_id))
-                                if ch:
-                                    bot.loop.create_task(schedule_event_reminder_v2(
-                                        ev_id, 
-                                        data.get('team1_captain'), 
-                                        data.get('team2_captain'), 
-                                        data.get('judge'), 
-                                        ch
-                                    ))
-                        except Exception as e:
-                            print(f"Failed to reschedule reminder {ev_id}: {e}")
-            except Exception:
-                pass
-        save_scheduled_events()
+        week_ago = datetime.datetime.now() - datetime.timedelta(days=7)
+        for ev_id in scheduled_events.expired_before(week_ago):
+            # Hard cleanup very old events; finished ones are kept in the archive
+            if ev_id in reminder_tasks:
+                try:
+                    reminder_tasks[ev_id].cancel()
+                    del reminder_tasks[ev_id]
+                except Exception:
+                    pass
+            if scheduled_events[ev_id].get('status') == 'completed':
+                archive_event(ev_id)
+            else:
+                del scheduled_events[ev_id]
+
+        # Reminders go out 10 minutes before the match, so earlier matches have nothing to reschedule
+        reminder_cutoff = datetime.datetime.now(pytz.UTC) + datetime.timedelta(minutes=10)
+        for ev_id in scheduled_events.upcoming(reminder_cutoff):
+            data = scheduled_events[ev_id]
+            if data.get('status') == 'scheduled' or not data.get('status'):
+                try:
+                    ch_id = data.get('channel_id')
+                    if ch_id:
+                        ch = bot.get_channel(int(ch_id))
+                        if ch:
+                            bot.loop.create_task(schedule_event_reminder_v2(
+                                ev_id, 
+                                data.get('team1_captain'), 
+                                data.get('team2_captain'), 
+                                data.get('judge'), 
+                                ch
+                            ))
+                except Exception as e:
+                    print(f"Failed to reschedule reminder {ev_id}: {e}")
+        request_save("scheduled_events")
     except Exception as e:
         print(f"Startup cleanup sweep error: {e}")
     
@@ -3106,27 +5609,32 @@ async def help_command(interaction: discord.Interaction):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 @tree.command(name="staff-leaderboard", description="Display staff leaderboard showing most active judges and recorders")
-async def staff_leaderboard(interaction: discord.Interaction):
+@app_commands.describe(period="Time period to rank (default: all time)")
+@app_commands.choices(
+    period=[
+        app_commands.Choice(name="All Time", value="all"),
+        app_commands.Choice(name="Today", value="day"),
+        app_commands.Choice(name="This Week", value="week"),
+        app_commands.Choice(name="This Season", value="season")
+    ]
+)
+async def staff_leaderboard(interaction: discord.Interaction, period: app_commands.Choice[str] = None):
     """Display staff leaderboard with match counts in table format"""
     try:
-        # Get top staff
-        top_staff = get_staff_leaderboard(limit=15)
+        period_value = period.value if period else "all"
+        store = staff_leaderboard_store(period_value)
 
-        # Determine totals for footer
-        total_judges = 0
-        total_recorders = 0
-        total_matches = 0
+        # Get top staff
+        top_staff = store.top(15)
 
-        # Calculate distinct counts if possible, or just sums
-        # For simplicity, we count active roles
-        try:
-            total_judges = sum(1 for _, s in staff_stats.items() if s.get('judge_count', 0) > 0)
-            total_recorders = sum(1 for _, s in staff_stats.items() if s.get('recorder_count', 0) > 0)
-            total_matches = sum(s.get('judge_count', 0) for _, s in staff_stats.items())
-        except:
-            pass
+        # Totals for footer, kept up to date by the store
+        totals = store.totals
+        total_judges = totals['judges']
+        total_recorders = totals['recorders']
 
         header = "📊 STAFF LEADERBOARD"
+        if period_value in STAFF_PERIODS:
+            header += f" - {STAFF_PERIODS[period_value].upper()} ({staff_rollups[period_value][0]} UTC)"
         separator = "=" * 70
         sub_sep = "-" * 70
 
@@ -3143,6 +5651,7 @@ async def staff_leaderboard(interaction: discord.Interaction):
              message += "No staff statistics available yet.\n"
         else:
             medals = ["🥇", "🥈", "🥉"]
+            now = datetime.datetime.utcnow()
             for i, (uid, stats) in enumerate(top_staff):
                 position = i + 1
                 medal = medals[i] if i < 3 else f"{position}."
@@ -3152,24 +5661,21 @@ async def staff_leaderboard(interaction: discord.Interaction):
                 r_count = stats.get("recorder_count", 0)
                 t_count = j_count + r_count
 
+                # Stored as a datetime (parse_staff_record converts it on load)
                 last_activity = stats.get("last_activity")
                 activity_text = "Unknown"
-                if last_activity:
-                    try:
-                        if isinstance(last_activity, str):
-                            last_activity = datetime.datetime.fromisoformat(last_activity)
-                        days_ago = (datetime.datetime.utcnow() - last_activity).days
-                        if days_ago == 0: activity_text = "Today"
-                        elif days_ago == 1: activity_text = "Yesterday"
-                        else: activity_text = f"{days_ago}d ago"
-                    except: pass
+                if isinstance(last_activity, datetime.datetime):
+                    days_ago = (now - last_activity).days
+                    if days_ago == 0: activity_text = "Today"
+                    elif days_ago == 1: activity_text = "Yesterday"
+                    else: activity_text = f"{days_ago}d ago"
 
                 # Rank | Name | Judge | Recorder | Total | Last Active
                 message += f"{medal:<6}{name:<20}{j_count:<8}{r_count:<10}{t_count:<8}{activity_text:<15}\n"
 
         message += f"{sub_sep}\n"
         message += f"Total Judges involved: {total_judges} | Total Recorders involved: {total_recorders}\n"
-        message += f"Total Interactions: {sum(s.get('judge_count', 0) + s.get('recorder_count', 0) for _, s in staff_stats.items())}\n"
+        message += f"Total Interactions: {totals['interactions']}\n"
         message += "```"
 
         # Check if user is head organizer for reset button
@@ -3264,7 +5770,7 @@ async def staff_update(
     staff_stats[uid][role_key] = new_count
     staff_stats[uid]["last_activity"] = datetime.datetime.utcnow()
     
-    save_staff_stats()
+    request_save("staff_stats")
     
     await interaction.response.send_message(f"✅ Successfully updated **{staff_member.display_name}**'s {role.name} count from {current_count} to **{new_count}**.", ephemeral=False)
 
@@ -3312,6 +5818,17 @@ async def info_command(interaction: discord.Interaction):
                 inline=True
             )
         
+        # Writes waiting for Google Sheets / Firestore
+        backlog = outbox.depth()
+        pending_lines = [f"**{kind.replace('_', ' ').title()}:** {count}" for kind, count in backlog.items()]
+        if outbox.parked:
+            pending_lines.append(f"**Parked (rejected):** {outbox.parked}")
+        embed.add_field(
+            name="📮 Pending Writes",
+            value="\n".join(pending_lines) or "All delivered",
+            inline=True
+        )
+        
         # Commands Information
         total_commands = len(bot.tree.get_commands())
         embed.add_field(
@@ -3555,45 +6072,56 @@ async def create(
         time_info = calculate_time_difference(event_datetime)
         
         # Team formatting matching request: team strings + captain mentions
-        # Generate event poster
-        poster_image = None
-        template = get_random_template(mode.value)
-        if template:
-            poster_image = create_event_poster(
-                template, 
+        # Generate event poster in the render pool, off the event loop
+        async def poster_queued(position):
+            await interaction.followup.send(
+                f"⏳ Posters are being rendered for other matches; yours is #{position} in line.",
+                ephemeral=True
+            )
+        
+        try:
+            poster = await get_event_poster(
+                mode.value, 
                 round.value, 
                 t1_display, 
                 t2_display, 
                 time_info['utc_time_simple'],
-                f"{date:02d}/{month:02d}"
+                f"{date:02d}/{month:02d}",
+                on_queued=poster_queued
             )
+        except PosterQueueFull:
+            await interaction.followup.send(
+                "❌ Too many posters are being rendered right now. Please try again in a minute.",
+                ephemeral=True
+            )
+            return
         
         # Create event data
         event_id = f"EVT-{int(datetime.datetime.now().timestamp())}"
         round_label = round.value
         group_label = group.value if group else None
         
-        event_data = {
-            'id': event_id,
-            'team1_captain': t1_full,
-            'team2_captain': t2_full,
-            'team1_name': team1,
-            'team2_name': team2,
-            'datetime': event_datetime,
-            'time_str': time_info['utc_time'],
-            'date_str': f"{date:02d}/{month:02d}",
-            'round': round_label,
-            'tournament': tournament,
-            'mode': mode.value,
-            'group': group_label,
-            'channel_id': interaction.channel.id,
-            'created_at': datetime.datetime.now().isoformat(),
-            'created_by': interaction.user.id,
-            'status': 'scheduled',
-            'poster_path': poster_image,
-            'captain1_id': captain1.id if captain1 else None,
-            'captain2_id': captain2.id if captain2 else None
-        }
+        event_data = Event(
+            id=event_id,
+            team1_captain=t1_full,
+            team2_captain=t2_full,
+            team1_name=team1,
+            team2_name=team2,
+            datetime=event_datetime,
+            time_str=time_info['utc_time'],
+            date_str=f"{date:02d}/{month:02d}",
+            round=round_label,
+            tournament=tournament,
+            mode=mode.value,
+            group=group_label,
+            channel_id=interaction.channel.id,
+            created_at=datetime.datetime.now().isoformat(),
+            created_by=interaction.user.id,
+            status='scheduled',
+            poster_encoding=poster.summary() if poster else None,
+            captain1_id=captain1,
+            captain2_id=captain2
+        )
         
         sheet_manager.log_event_creation(event_data)
         
@@ -3603,7 +6131,7 @@ async def create(
         scheduled_events[event_id] = event_data
         
         # Save events to file
-        save_scheduled_events()
+        request_save("scheduled_events")
         print(f"💾 Event {event_id} saved to file")
         
         # Create event embed with new format
@@ -3644,13 +6172,12 @@ async def create(
         embed.add_field(name="\u200b", value="\u200b", inline=False)
         embed.add_field(name="👤 Created By", value=interaction.user.mention, inline=False)
         
-        if poster_image:
-            try:
-                with open(poster_image, 'rb') as f:
-                    file = discord.File(f, filename="event_poster.png")
-                    embed.set_image(url="attachment://event_poster.png")
-            except Exception as e:
-                print(f"Error loading poster image: {e}")
+        # The poster is uploaded with the first post only; later posts link to that upload
+        def poster_file():
+            return discord.File(io.BytesIO(poster.data), filename=poster.filename)
+        
+        if poster:
+            embed.set_image(url=f"attachment://{poster.filename}")
         
         embed.set_footer(text=f"Powered by • {ORGANIZATION_NAME}")
         
@@ -3663,22 +6190,24 @@ async def create(
         schedule_channel = interaction.guild.get_channel(CHANNEL_IDS["take_schedule"])
         if schedule_channel:
             judge_ping = " ".join([f"<@&{rid}>" for rid in ROLE_IDS['judge']])
-            if poster_image:
-                with open(poster_image, 'rb') as f:
-                    file = discord.File(f, filename="event_poster.png")
-                    schedule_message = await schedule_channel.send(content=judge_ping, embed=embed, file=file, view=take_schedule_view)
+            if poster:
+                schedule_message = await schedule_channel.send(content=judge_ping, embed=embed, file=poster_file(), view=take_schedule_view)
+                event_data['poster_url'] = uploaded_poster_url(schedule_message)
             else:
                 schedule_message = await schedule_channel.send(content=judge_ping, embed=embed, view=take_schedule_view)
             
             event_data['schedule_message_id'] = schedule_message.id
             event_data['schedule_channel_id'] = schedule_channel.id
-            save_scheduled_events()
+            request_save("scheduled_events")
             
         # Post in the current channel
-        if poster_image:
-            with open(poster_image, 'rb') as f:
-                file = discord.File(f, filename="event_poster.png")
-                await interaction.channel.send(embed=embed, file=file)
+        if poster and event_data.get('poster_url'):
+            embed.set_image(url=event_data['poster_url'])
+            await interaction.channel.send(embed=embed)
+        elif poster:
+            channel_message = await interaction.channel.send(embed=embed, file=poster_file())
+            event_data['poster_url'] = uploaded_poster_url(channel_message)
+            request_save("scheduled_events")
         else:
             await interaction.channel.send(embed=embed)
  
@@ -3742,17 +6271,10 @@ async def event_result(
         await interaction.followup.send("❌ You need **Head Organizer** or **Judge** role to post event results.", ephemeral=True)
         return
 
-    # Find event logic
-    current_channel_id = interaction.channel.id
-    event_id_found = None
-    event_data = {}
-    
-    # Fallback to current channel
-    for ev_id, data in scheduled_events.items():
-        if data.get('channel_id') == current_channel_id:
-            event_id_found = ev_id
-            event_data = data
-            break
+    # Find the event for the current channel
+    event_id_found, event_data = find_channel_event(interaction.channel.id)
+    if event_data is None:
+        event_data = {}
             
     # Extract info from event data where possible
     tournament = event_data.get('tournament', 'N/A')
@@ -3804,23 +6326,16 @@ async def event_result(
     embed.add_field(name="\u200b", value="\u200b", inline=False)
     
     staff_text = f"👨‍⚖️ **Staffs**\n▪ Judge: {interaction.user.mention}\n"
-    current_recorder = event_data.get('recorder')
-    if current_recorder:
-        if isinstance(current_recorder, int):
-            staff_text += f"▪ Recorder: <@{current_recorder}>"
-        elif hasattr(current_recorder, 'mention'):
-            staff_text += f"▪ Recorder: {current_recorder.mention}"
-        else:
-            staff_text += f"▪ Recorder: {current_recorder}"
-    else:
-        staff_text += "▪ Recorder: None"
+    rec_id = event_data.get('recorder')
+    staff_text += f"▪ Recorder: <@{rec_id}>" if rec_id else "▪ Recorder: None"
         
     embed.add_field(name="Staffs", value=staff_text, inline=False)
     embed.add_field(name="📝 Remarks", value=remarks, inline=False)
 
     # Log Result to Sheet
+    score_combined = f"{team_1} ({team_1_score}) - {team_2} ({team_2_score})"
+    sheet_result = {'winner': winner_name, 'score': score_combined, 'remarks': remarks, 'attendance': []}
     if event_id_found:
-        score_combined = f"{team_1} ({team_1_score}) - {team_2} ({team_2_score})"
         sheet_manager.log_event_result(event_id_found, winner_name, score_combined, remarks)
 
     # Handle screenshots safely by caching the bytes
@@ -3872,7 +6387,6 @@ async def event_result(
             if group_label: att_text += f"**Group:** {group_label}\n"
             att_text += f"\n🏆 {winner} ({winner_score}) Vs ({loser_score}) {loser} 💀\n\n"
             att_text += f"**Staffs**\n• Judge: {interaction.user.mention}\n"
-            rec_id = event_data.get('recorder')
             att_text += f"• Recorder: <@{rec_id}>" if rec_id else "• Recorder: None"
             await staff_attendance_channel.send(att_text)
             
@@ -3881,31 +6395,27 @@ async def event_result(
             date_s = dt_now.strftime("%Y-%m-%d")
             time_s = dt_now.strftime("%H:%M:%S")
             
-            sheet_manager.log_attendance(
+            sheet_result['attendance'].append(sheet_manager.log_attendance(
                 date_str=date_s, 
                 time_str=time_s, 
                 event_name=f"{team_1} vs {team_2} ({round_label})", 
                 role="Judge", 
                 staff_name=interaction.user.name, 
                 marked_by=interaction.user.name
-            )
+            ))
             
             if rec_id:
-                rec_name = "Unknown"
-                if isinstance(rec_id, int):
-                    m = interaction.guild.get_member(rec_id)
-                    if m: rec_name = m.name
-                elif hasattr(rec_id, 'name'):
-                    rec_name = rec_id.name
+                m = interaction.guild.get_member(rec_id)
+                rec_name = m.name if m else "Unknown"
                 
-                sheet_manager.log_attendance(
+                sheet_result['attendance'].append(sheet_manager.log_attendance(
                     date_str=date_s, 
                     time_str=time_s, 
                     event_name=f"{team_1} vs {team_2} ({round_label})", 
                     role="Recorder", 
                     staff_name=rec_name, 
                     marked_by=interaction.user.name
-                )
+                ))
     except Exception as e:
         print(f"Error with staff attendance: {e}")
 
@@ -3916,8 +6426,9 @@ async def event_result(
         event_data['team2_score'] = team_2_score
         event_data['number_of_matches'] = number_of_matches
         event_data['winner'] = winner
+        event_data['sheet_result'] = sheet_result
         event_data['status'] = 'completed'
-        save_scheduled_events()
+        request_save("scheduled_events")
     
     # Auto cleanup
     if event_id_found:
@@ -3925,13 +6436,9 @@ async def event_result(
     
     # Update stats
     update_staff_stats(interaction.user.id, interaction.user.display_name, "Judge")
-    rec_val = event_data.get('recorder')
-    if rec_val:
-        if isinstance(rec_val, int):
-            m = interaction.guild.get_member(rec_val)
-            if m: update_staff_stats(m.id, m.display_name, "Recorder")
-        elif hasattr(rec_val, 'id'):
-            update_staff_stats(rec_val.id, rec_val.display_name, "Recorder")
+    if rec_id:
+        m = interaction.guild.get_member(rec_id)
+        if m: update_staff_stats(m.id, m.display_name, "Recorder")
 
     await interaction.followup.send("✅ Results processed and cleanup scheduled (2h).", ephemeral=True)
         
@@ -3993,22 +6500,13 @@ async def unassigned_events(interaction: discord.Interaction):
             return
 
         # Build list of unassigned events
-        unassigned = []
-        for event_id, data in scheduled_events.items():
-            if not data.get('judge'):
-                unassigned.append((event_id, data))
+        unassigned = list_unassigned_events()
 
         # If none, inform
         if not unassigned:
             await interaction.response.send_message("✅ All events currently have a judge assigned.", ephemeral=True)
             return
 
-        # Sort by datetime if present
-        try:
-            unassigned.sort(key=lambda x: x[1].get('datetime') or datetime.datetime.max)
-        except Exception:
-            pass
-
         # Create embed summary
         embed = discord.Embed(
             title="📝 Unassigned Events",
@@ -4025,10 +6523,8 @@ async def unassigned_events(interaction: discord.Interaction):
             time_str = data.get('time_str', 'N/A')
             ch_id = data.get('schedule_channel_id') or data.get('channel_id')
             msg_id = data.get('schedule_message_id')
-            team1 = data.get('team1_captain')
-            team2 = data.get('team2_captain')
-            team1_name = getattr(team1, 'display_name', 'Unknown') if team1 else 'Unknown'
-            team2_name = getattr(team2, 'display_name', 'Unknown') if team2 else 'Unknown'
+            team1_name = data.get('team1_name', 'Unknown')
+            team2_name = data.get('team2_name', 'Unknown')
 
             link = None
             try:
@@ -4115,20 +6611,11 @@ async def delete(interaction: discord.Interaction):
                     except Exception as e:
                         print(f"Error deleting schedule message: {e}")
                 
-                # Clean up any temporary poster files
-                if 'poster_path' in event_data:
-                    try:
-                        import os
-                        if os.path.exists(event_data['poster_path']):
-                            os.remove(event_data['poster_path'])
-                    except Exception as e:
-                        print(f"Error deleting poster file: {e}")
-                
                 # Remove from scheduled events
                 del scheduled_events[selected_event_id]
                 
                 # Save events to file
-                save_scheduled_events()
+                request_save("scheduled_events")
                 
                 # Create confirmation embed
                 embed = discord.Embed(
@@ -4153,9 +6640,6 @@ async def delete(interaction: discord.Interaction):
                 if deleted_message:
                     actions_completed.append("• Original schedule message deleted")
                 
-                if 'poster_path' in event_data:
-                    actions_completed.append("• Temporary poster file cleaned up")
-                
                 embed.add_field(
                     name="✅ Actions Completed",
                     value="\n".join(actions_completed),
@@ -4273,12 +6757,7 @@ async def edit(
         title = None
     else:
         # Priority 2: Fallback to finding event in current channel
-        current_channel_id = interaction.channel.id
-        for ev_id, event_data in scheduled_events.items():
-            if event_data.get('channel_id') == current_channel_id:
-                event_to_edit = event_data
-                event_id = ev_id
-                break
+        event_id, event_to_edit = find_channel_event(interaction.channel.id)
     
     if not event_to_edit:
         await interaction.followup.send("❌ No event found in this ticket channel. Use `/events create` to create an event first.", ephemeral=True)
@@ -4407,7 +6886,7 @@ async def edit(
             event_to_edit['group'] = group.value
         
         # Save updated events
-        save_scheduled_events()
+        request_save("scheduled_events")
         
         # Schedule the 10-minute reminder with updated event data
         try:
@@ -4467,13 +6946,9 @@ async def edit(
         await interaction.channel.send(embed=embed)
         
         # Notify Judge and both Captains about the update
-        judge = event_to_edit.get('judge')
         notification_text = f"🔔 {team1_captain} {team2_captain}"
-        if judge:
-            if hasattr(judge, 'mention'):
-                notification_text += f" {judge.mention}"
-            else:
-                notification_text += f" <@{judge}>"
+        if event_to_edit.get('judge'):
+            notification_text += f" {event_to_edit.mention('judge')}"
         
         # Clean names for notify embed
         def get_name(val):
@@ -4858,6 +7333,66 @@ async def maps(interaction: discord.Interaction, count: int):
     await interaction.response.send_message(embed=embed)
 
 
+@tree.command(name="sheet-reconcile", description="Repair the Google Sheet from the bot's event records (Organizer only)")
+async def sheet_reconcile(interaction: discord.Interaction):
+    """Diff the sheets against local events and push the minimal fix"""
+    if not has_organizer_permission(interaction):
+        await interaction.response.send_message(
+            "❌ You need to be **Bot Owner** or **Head Organizer** to use this command.",
+            ephemeral=True
+        )
+        return
+    if not sheet_manager.spreadsheet or not sheet_manager.event_sheet:
+        await interaction.response.send_message("❌ Google Sheets is not connected.", ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    
+    # Rows still waiting in the outbox would be appended twice
+    if persistence_queue.running:
+        await persistence_queue.flush()
+    backlog = outbox.depth().get("sheets", 0)
+    if backlog:
+        await interaction.followup.send(
+            f"⏳ {backlog} sheet writes are still queued for delivery. Try again once they've gone out (see `/info`).",
+            ephemeral=True
+        )
+        return
+    
+    try:
+        archived = await asyncio.to_thread(storage.load_archive)
+        events = {ev_id: Event.from_dict(data) for ev_id, data in archived.items()}
+        events.update(scheduled_events)
+        event_rows, attendance_rows = expected_sheet_rows(events.values(), interaction.guild)
+        report = await persistence_queue.run_exclusive(sheet_manager.reconcile, event_rows, attendance_rows)
+    except Exception as e:
+        print(f"Error reconciling sheets: {e}")
+        await interaction.followup.send(f"❌ Reconciliation failed: {e}", ephemeral=True)
+        return
+    
+    fixed = report['rows_updated'] + report['events_appended'] + report['attendance_appended']
+    embed = discord.Embed(
+        title="🧾 Sheet Reconciliation",
+        description=f"Checked **{report['checked']}** events against the sheet.",
+        color=discord.Color.green() if not fixed else discord.Color.orange(),
+        timestamp=discord.utils.utcnow()
+    )
+    embed.add_field(
+        name="Event Details",
+        value=f"**Rows corrected:** {report['rows_updated']} ({report['cells_updated']} cells)\n"
+              f"**Rows added:** {report['events_appended']}",
+        inline=True
+    )
+    embed.add_field(
+        name="Mark Attendance",
+        value=f"**Rows added:** {report['attendance_appended']}",
+        inline=True
+    )
+    embed.add_field(name="API Calls Used", value=str(report['api_calls']), inline=False)
+    embed.set_footer(text=f"{ORGANIZATION_NAME}")
+    await interaction.followup.send(embed=embed, ephemeral=True)
+    print(f"Sheet reconcile by {interaction.user.display_name}: {report}")
+
 @tree.command(name="test_channels", description="Test if bot can access configured channels (Organizer only)")
 async def test_channels(interaction: discord.Interaction):
     """Test channel access for debugging"""
@@ -4979,59 +7514,46 @@ async def choose(interaction: discord.Interaction, options: str):
 async def exchange(interaction: discord.Interaction, role: app_commands.Choice[str], new_user: discord.Member):
     """Exchanges a staff member for events in the current channel."""
     
-    current_channel_id = interaction.channel.id
-    event_found = False
-    
-    for ev_id, data in scheduled_events.items():
-        if data.get('channel_id') == current_channel_id:
-            event_found = True
-            
-            # Update memory
-            if role.value == "judge":
-                scheduled_events[ev_id]['judge'] = new_user
-                try:
-                    sheet_manager.update_event_staff(ev_id, judge_name=new_user.name)
-                except Exception as e:
-                    print(f"Error updating sheet: {e}")
-            else:
-                scheduled_events[ev_id]['recorder'] = new_user
-                try:
-                    sheet_manager.update_event_staff(ev_id, recorder_name=new_user.name)
-                except Exception as e:
-                    print(f"Error updating sheet: {e}")
-            
-            save_scheduled_events()
-            
-            # Announce
-            await interaction.response.send_message(f"✅ {new_user.mention} is now the **{role.name}** for this event.", ephemeral=False)
-            
-            # Additional Notification for all parties
-            team1 = data.get('team1_captain')
-            team2 = data.get('team2_captain')
-            current_judge = data.get('judge')
-            
-            pings = ""
-            if team1: pings += f"{team1.mention} "
-            if team2: pings += f"{team2.mention} "
-            if current_judge: pings += f"{current_judge.mention} "
-            
-            notify_embed = discord.Embed(
-                title="🔄 Staff Exchange Notification",
-                description=f"Staff assignment for this match has been updated.\n\n"
-                            f"**Role:** {role.name}\n"
-                            f"**New Staff:** {new_user.mention}\n"
-                            f"**Updated by:** {interaction.user.mention}",
-                color=discord.Color.blue(),
-                timestamp=discord.utils.utcnow()
-            )
-            notify_embed.set_footer(text=f"{ORGANIZATION_NAME} • Match Update")
-            
-            if pings:
-                await interaction.channel.send(content=f"🔔 {pings}", embed=notify_embed)
-            break
-            
-    if not event_found:
+    ev_id, data = find_channel_event(interaction.channel.id)
+    if data is None:
         await interaction.response.send_message("❌ No scheduled event found in this channel.", ephemeral=True)
+        return
+            
+    # Update memory
+    if role.value == "judge":
+        data['judge'] = new_user
+        try:
+            sheet_manager.update_event_staff(ev_id, judge_name=new_user.name)
+        except Exception as e:
+            print(f"Error updating sheet: {e}")
+    else:
+        data['recorder'] = new_user
+        try:
+            sheet_manager.update_event_staff(ev_id, recorder_name=new_user.name)
+        except Exception as e:
+            print(f"Error updating sheet: {e}")
+    
+    request_save("scheduled_events")
+    
+    # Announce
+    await interaction.response.send_message(f"✅ {new_user.mention} is now the **{role.name}** for this event.", ephemeral=False)
+    
+    # Additional Notification for all parties
+    pings = " ".join(filter(None, (data.mention('captain1_id'), data.mention('captain2_id'), data.mention('judge'))))
+    
+    notify_embed = discord.Embed(
+        title="🔄 Staff Exchange Notification",
+        description=f"Staff assignment for this match has been updated.\n\n"
+                    f"**Role:** {role.name}\n"
+                    f"**New Staff:** {new_user.mention}\n"
+                    f"**Updated by:** {interaction.user.mention}",
+        color=discord.Color.blue(),
+        timestamp=discord.utils.utcnow()
+    )
+    notify_embed.set_footer(text=f"{ORGANIZATION_NAME} • Match Update")
+    
+    if pings:
+        await interaction.channel.send(content=f"🔔 {pings}", embed=notify_embed)
 
 @tree.command(name="tournament-setup", description="Wipe all old data and set up for a new tournament (Bot Owner Only)")
 async def tournament_setup(interaction: discord.Interaction):
@@ -5045,10 +7567,10 @@ async def tournament_setup(interaction: discord.Interaction):
     status = []
     
     # 1. Connection check
-    if db and sheet_manager.client:
-        status.append("✅ **Connections:** Firebase and Google Sheets are Connected.")
-    elif db:
-        status.append("⚠️ **Connections:** Firebase Connected, but Google Sheets disconnected.")
+    if storage.is_database and sheet_manager.client:
+        status.append(f"✅ **Connections:** {storage.name} and Google Sheets are Connected.")
+    elif storage.is_database:
+        status.append(f"⚠️ **Connections:** {storage.name} Connected, but Google Sheets disconnected.")
     elif sheet_manager.client:
         status.append("⚠️ **Connections:** Google Sheets Connected, but Firebase disconnected.")
     else:
@@ -5056,6 +7578,10 @@ async def tournament_setup(interaction: discord.Interaction):
         await interaction.followup.send("\n".join(status))
         return
         
+    # Queued saves and sheet rows go out first so they can't land after the wipe
+    if persistence_queue.running:
+        await persistence_queue.flush()
+
     # 2. Sheet Cleaned
     try:
         sheet_manager.erase_sheets()
@@ -5064,41 +7590,22 @@ async def tournament_setup(interaction: discord.Interaction):
         status.append(f"❌ **Spreadsheets:** Failed to clear sheets - {e}")
 
     # 3. Clean local collections
-    global scheduled_events, staff_stats, tournament_rules
-    scheduled_events.clear()
-    staff_stats.clear()
-    tournament_rules.clear()
+    scheduled_events.load({})
+    staff_stats.load({})
+    staff_rollups.clear()
+    tournament_rules.load({})
+    clear_pending_saves()
     
-    # 4. Clean Firebase Collections
+    # 4. Clean stored collections, archived events and queued writes
     try:
-        if db:
-            batch = db.batch()
-            
-            # Events
-            docs = db.collection('scheduled_events').stream()
-            for doc in docs:
-                batch.delete(doc.reference)
-                
-            # Staff Stats
-            docs = db.collection('staff_stats').stream()
-            for doc in docs:
-                batch.delete(doc.reference)
-                
-            # Settings
-            db.collection('settings').document('tournament_rules').set({'rules': {}})
-                
-            batch.commit()
+        await persistence_queue.run_exclusive(wipe_storage)
+        if storage.is_database:
             status.append("✅ **Database:** All previous matches & staff stats permanently deleted from server.")
     except Exception as e:
-        status.append(f"❌ **Database:** Failed to wipe Firebase - {e}")
+        status.append(f"❌ **Database:** Failed to wipe {storage.name} - {e}")
         
     status.append("✅ **Staff Leaderboard:** Cleaned and reset to zero.")
     
-    # Overwrite JSON (Fail safes)
-    save_scheduled_events()
-    save_staff_stats()
-    save_rules()
-    
     embed = discord.Embed(
         title="🛠️ Tournament Reset & Setup Complete",
         description="\n".join(status),
@@ -5118,10 +7625,7 @@ async def tournament_setup(interaction: discord.Interaction):
 
 
 if __name__ == "__main__":
-    # Load persistent data on startup
-    load_scheduled_events()
-    load_rules()
-    load_staff_stats()
+    # Connections and data loading happen after login, in TournamentBot.start_services
     
     # Get Discord token from environment
     token = os.environ.get("DISCORD_TOKEN")
@@ -5165,3 +7669,6 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"❌ Error starting bot: {e}")
         exit(1)
+    finally:
+        # Anything requested after the worker stopped still reaches storage
+        persistence_queue.flush_sync()
@@ -0,0 +1,1396 @@
+"""Offline benchmarks for the bot's hot paths.
+
+Usage: python benchmarks.py [name ...]   (no names = run everything)
+
+Nothing here talks to Discord or Google Sheets. Firestore and the worksheets are replaced
+by in-memory fakes that count the calls they are asked to make, and file based benchmarks
+run inside a temporary directory so real data files are never touched. The storage benchmark also
+covers the real Firestore when it is configured, using throwaway "benchmark_" collections.
+"""
+import sys
+import os
+import time
+import json
+import random
+import datetime
+import glob
+import tempfile
+import threading
+import asyncio
+import contextlib
+import io
+import operator
+import tracemalloc
+
+from PIL import ImageChops
+
+import app
+
+# The worksheets below are fakes; never let a send connect the real ones
+app.sheet_manager.ready.set()
+
+
+class CountingFirestore:
+    """Just enough of the Firestore client API to count batched writes"""
+
+    def __init__(self):
+        self.writes = 0
+        self.commits = 0
+
+    def collection(self, name):
+        return self
+
+    def document(self, doc_id):
+        return doc_id
+
+    def batch(self):
+        return self
+
+    def set(self, doc_ref, data, merge=False):
+        self.writes += 1
+
+    def delete(self, doc_ref):
+        self.writes += 1
+
+    def commit(self):
+        self.commits += 1
+
+
+class FakeWorksheet:
+    """In-memory stand-in for a gspread Worksheet that counts API calls and the cells they
+    download, and can sleep for a simulated round-trip on each call"""
+
+    def __init__(self, latency: float = 0.0, title: str = "Sheet"):
+        self.title = title
+        self.rows = [["Event ID"]]
+        self.calls = 0
+        self.cells_read = 0
+        self.latency = latency
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def append_row(self, row):
+        self._call()
+        self.rows.append(list(row))
+
+    def append_rows(self, rows):
+        self._call()
+        first = len(self.rows) + 1
+        self.rows.extend(list(row) for row in rows)
+        return {'updates': {'updatedRange': f"'Sheet'!A{first}:M{len(self.rows)}"}}
+
+    def find(self, query):
+        self._call()
+        # The API sends the whole sheet for find() to search locally
+        self.cells_read += sum(len(row) for row in self.rows)
+        for number, row in enumerate(self.rows, start=1):
+            if query in row:
+                return type("Cell", (), {"row": number, "col": row.index(query) + 1})()
+        return None
+
+    def col_values(self, column):
+        self._call()
+        self.cells_read += len(self.rows)
+        return [row[column - 1] if len(row) >= column else "" for row in self.rows]
+
+    def batch_get(self, ranges):
+        self._call()
+        values = []
+        for cell in ranges:
+            row, column = app.gspread.utils.a1_to_rowcol(cell)
+            cells = self.rows[row - 1] if row <= len(self.rows) else []
+            self.cells_read += 1
+            values.append([[cells[column - 1]]] if len(cells) >= column and cells[column - 1] else [])
+        return values
+
+    def _set(self, row, column, value):
+        cells = self.rows[row - 1]
+        cells.extend([""] * (column - len(cells)))
+        cells[column - 1] = value
+
+    def update_cell(self, row, column, value):
+        self._call()
+        self._set(row, column, value)
+
+    def batch_update(self, data):
+        self._call()
+        for update in data:
+            row, column = app.gspread.utils.a1_to_rowcol(update['range'])
+            self._set(row, column, update['values'][0][0])
+
+
+class FakeSpreadsheet:
+    """values_batch_get over FakeWorksheets, as one counted call"""
+
+    def __init__(self, *worksheets):
+        self.worksheets = {sheet.title: sheet for sheet in worksheets}
+        self.calls = 0
+
+    def values_batch_get(self, ranges):
+        self.calls += 1
+        value_ranges = []
+        for sheet_range in ranges:
+            sheet = self.worksheets[sheet_range.split("!")[0].strip("'")]
+            sheet.cells_read += sum(len(row) for row in sheet.rows)
+            value_ranges.append({'range': sheet_range, 'values': [list(row) for row in sheet.rows]})
+        return {'valueRanges': value_ranges}
+
+
+@contextlib.contextmanager
+def temp_workdir():
+    """Run a benchmark inside a throwaway working directory"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(previous)
+
+
+def make_event(i: int) -> dict:
+    return {
+        'id': f"EVT-{i}",
+        'team1_captain': f"Team {i} (<@{100000 + i}>)",
+        'team2_captain': f"Team {i + 1} (<@{200000 + i}>)",
+        'team1_name': f"Team {i}",
+        'team2_name': f"Team {i + 1}",
+        'datetime': datetime.datetime(2026, 1, 1) + datetime.timedelta(minutes=30 * i),
+        'time_str': "12:00 utc, 01/01",
+        'date_str': "01/01",
+        'round': "R1",
+        'tournament': "Benchmark Cup",
+        'mode': "MW",
+        'group': None,
+        'channel_id': 900000 + i,
+        'created_at': datetime.datetime(2026, 1, 1).isoformat(),
+        'created_by': 1,
+        'status': 'scheduled',
+        'captain1_id': 100000 + i,
+        'captain2_id': 200000 + i,
+    }
+
+
+def fill_events(count: int):
+    app.scheduled_events.load({f"EVT-{i}": make_event(i) for i in range(count)})
+
+
+def bench_event_saves(sizes=(50, 200, 1000, 5000), rounds=20):
+    """Write count and latency of one judge click: incremental save vs rewriting everything"""
+    print("== event saves: one modified event per save ==")
+    print(f"{'events':>8} {'backend':>10} {'mode':>12} {'docs/save':>12} {'ms/save':>10}")
+    original_storage = app.storage
+    try:
+        for size in sizes:
+            for backend in ("firestore", "json"):
+                for mode in ("full", "incremental"):
+                    with temp_workdir():
+                        fill_events(size)
+                        client = CountingFirestore()
+                        json_storage = app.JsonStorage()
+                        app.storage = app.FirestoreStorage(client) if backend == "firestore" else json_storage
+                        # Keep every journal record countable for the whole run
+                        journal = json_storage.journals['scheduled_events']
+                        journal.compact_every = sys.maxsize
+                        elapsed = 0.0
+                        for r in range(rounds):
+                            app.scheduled_events[f"EVT-{r % size}"]['judge'] = 42
+                            if mode == "full":
+                                # What every save used to do: treat all events as changed
+                                app.scheduled_events.modified.update(app.scheduled_events.keys())
+                            start = time.perf_counter()
+                            app.save_scheduled_events()
+                            elapsed += time.perf_counter() - start
+                        writes = (client.writes if backend == "firestore" else journal.records) / rounds
+                        print(f"{size:>8} {backend:>10} {mode:>12} {writes:>12.1f} {elapsed / rounds * 1000:>10.3f}")
+    finally:
+        app.storage = original_storage
+        app.scheduled_events.load({})
+
+
+def bench_journal(sizes=(100, 1000, 5000), rounds=50):
+    """Local JSON backend: journal append per change, compaction and startup replay"""
+    print("== local journal: append vs full rewrite, and load time ==")
+    print(f"{'events':>8} {'append ms':>10} {'rewrite ms':>11} {'compact ms':>11} {'load ms':>9}")
+    original_storage = app.storage
+    try:
+        for size in sizes:
+            with temp_workdir():
+                app.storage = app.JsonStorage()
+                journal = app.storage.journals['scheduled_events']
+                fill_events(size)
+                app.scheduled_events.modified.update(app.scheduled_events.keys())
+                app.save_scheduled_events()
+                elapsed = 0.0
+                for r in range(rounds):
+                    app.scheduled_events[f"EVT-{r % size}"]['judge'] = r
+                    start = time.perf_counter()
+                    app.save_scheduled_events()
+                    elapsed += time.perf_counter() - start
+
+                # What every click used to cost: the whole file rewritten with indent=2
+                start = time.perf_counter()
+                with open('rewrite.json', 'w') as f:
+                    json.dump({ev_id: ev.to_dict() for ev_id, ev in app.scheduled_events.items()}, f, indent=2)
+                rewrite = time.perf_counter() - start
+
+                start = time.perf_counter()
+                with journal._lock:
+                    journal._compact(journal._read())
+                compact = time.perf_counter() - start
+
+                start = time.perf_counter()
+                app.load_scheduled_events()
+                load = time.perf_counter() - start
+                print(f"{size:>8} {elapsed / rounds * 1000:>10.3f} {rewrite * 1000:>11.3f} {compact * 1000:>11.3f} {load * 1000:>9.3f}")
+    finally:
+        app.storage = original_storage
+        app.scheduled_events.load({})
+
+
+def legacy_serialize(event_data) -> dict:
+    """How events were serialized while they were plain dicts: copy, then probe each member key"""
+    event_copy = dict(event_data)
+    if 'datetime' in event_copy:
+        event_copy['datetime'] = event_copy['datetime'].isoformat()
+    for key in ['team1_captain', 'team2_captain', 'judge', 'recorder', 'created_by', 'result_judge', 'winner', 'loser']:
+        if key in event_copy and hasattr(event_copy[key], 'id'):
+            event_copy[key] = event_copy[key].id
+    return event_copy
+
+
+def legacy_event_to_dict(event) -> dict:
+    """Event.to_dict before it was generated: attrgetter over every field, then a comprehension"""
+    data = {name: value for name, value in zip(app.EVENT_FIELDS, _legacy_event_values(event)) if value is not None}
+    if event.datetime is not None:
+        data['datetime'] = event.datetime.isoformat()
+    if event.extra:
+        data.update(event.extra)
+    return data
+
+
+def legacy_event_from_dict(data) -> app.Event:
+    """Event.from_dict before it was generated: __init__, and again without the extras on a TypeError"""
+    try:
+        return app.Event(**data)
+    except TypeError:
+        known = {key: value for key, value in data.items() if key in app.EVENT_FIELD_SET}
+        extra = {key: value for key, value in data.items() if key not in app.EVENT_FIELD_SET}
+        return app.Event(**known, extra=extra)
+
+
+_legacy_event_values = operator.attrgetter(*app.EVENT_FIELDS)
+
+
+def bench_event_records(count=10000, runs=7):
+    """Memory per stored event and codec cost: Event records vs the old dict records, and the
+    generated Event codec vs the one it replaced"""
+    print(f"== event records: {count} events ==")
+    print(f"{'record':>8} {'bytes/event':>12} {'to_dict us':>11} {'from_dict us':>13}")
+    stored = [app.Event.from_dict(make_event(i)).to_dict() for i in range(count)]
+    # Older records carry keys that aren't fields any more, so from_dict splits them off
+    stored += [dict(data, legacy_note="moved") for data in stored[:count // 10]]
+
+    def legacy_decode(data):
+        record = app.TrackedRecord(data, None, data['id'])
+        record['datetime'] = datetime.datetime.fromisoformat(record['datetime'])
+        return record
+
+    codecs = (("dict", legacy_decode, legacy_serialize),
+              ("Event v1", legacy_event_from_dict, legacy_event_to_dict),
+              ("Event", app.Event.from_dict, app.Event.to_dict))
+    records = {}
+    for label, decode, encode in codecs:
+        tracemalloc.start()
+        records[label] = [decode(dict(data)) for data in stored]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        records[label + " size"] = size
+
+    # Runs are interleaved and the fastest kept, so a busy machine slows every codec alike
+    timings = {label: [float('inf'), float('inf')] for label, _, _ in codecs}
+    for _ in range(runs):
+        for label, decode, encode in codecs:
+            start = time.perf_counter()
+            for record in records[label]:
+                encode(record)
+            timings[label][0] = min(timings[label][0], time.perf_counter() - start)
+            start = time.perf_counter()
+            for data in stored:
+                decode(dict(data))
+            timings[label][1] = min(timings[label][1], time.perf_counter() - start)
+
+    for label, _, _ in codecs:
+        encode_time, decode_time = timings[label]
+        print(f"{label:>8} {records[label + ' size'] / len(stored):>12.0f} "
+              f"{encode_time / len(stored) * 1e6:>11.2f} {decode_time / len(stored) * 1e6:>13.2f}")
+
+    if [event.to_dict() for event in records["Event"]] != [legacy_event_to_dict(event) for event in records["Event v1"]]:
+        print("FAILED: the generated Event codec doesn't round-trip records like the one it replaced")
+        sys.exit(1)
+    if timings["Event"][0] > timings["Event v1"][0] or timings["Event"][1] > timings["Event v1"][1]:
+        print("FAILED: the generated Event codec is slower than the one it replaced")
+        sys.exit(1)
+
+
+def bench_event_lookups(sizes=(100, 1000, 10000), rounds=2000):
+    """Finding the event for a ticket channel: index lookup vs scanning every event"""
+    print("== event lookups: event for a channel ==")
+    print(f"{'events':>8} {'scan us':>10} {'index us':>10}")
+    try:
+        for size in sizes:
+            fill_events(size)
+            channels = [900000 + (i * 7919) % size for i in range(rounds)]
+
+            start = time.perf_counter()
+            for channel_id in channels:
+                next((ev_id for ev_id, data in app.scheduled_events.items() if data.get('channel_id') == channel_id), None)
+            scan = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for channel_id in channels:
+                app.find_channel_event(channel_id)
+            indexed = time.perf_counter() - start
+            print(f"{size:>8} {scan / rounds * 1e6:>10.2f} {indexed / rounds * 1e6:>10.2f}")
+    finally:
+        app.scheduled_events.load({})
+
+
+def bench_event_timeline(sizes=(1000, 10000), rounds=50):
+    """Startup sweep and unassigned listing: time index slices vs scanning and sorting everything"""
+    print("== event timeline: sweep for week-old events, unassigned listing ==")
+    print(f"{'events':>8} {'sweep scan us':>14} {'sweep index us':>15} {'list sort us':>13} {'list index us':>14}")
+    try:
+        for size in sizes:
+            fill_events(size)
+            # Events are 30 minutes apart from 2026-01-01; one day's worth counts as week-old.
+            # Every tenth event still needs a judge.
+            week_ago = datetime.datetime(2026, 1, 2)
+            for i, ev_id in enumerate(app.scheduled_events.in_time_order()):
+                if i % 10:
+                    app.scheduled_events[ev_id]['judge'] = 42
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                [ev_id for ev_id, data in app.scheduled_events.items() if data.get('datetime') < week_ago]
+            sweep_scan = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                app.scheduled_events.expired_before(week_ago)
+            sweep_index = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                unassigned = [(ev_id, data) for ev_id, data in app.scheduled_events.items() if not data.get('judge')]
+                unassigned.sort(key=lambda x: x[1].get('datetime') or datetime.datetime.max)
+            list_sort = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                app.list_unassigned_events()
+            list_index = time.perf_counter() - start
+            print(f"{size:>8} {sweep_scan / rounds * 1e6:>14.1f} {sweep_index / rounds * 1e6:>15.1f} "
+                  f"{list_sort / rounds * 1e6:>13.1f} {list_index / rounds * 1e6:>14.1f}")
+    finally:
+        app.scheduled_events.load({})
+
+
+def legacy_leaderboard(limit: int):
+    """What /staff-leaderboard used to do: sort everything, then sum totals in three passes"""
+    stats = app.staff_stats
+    top = sorted(stats.items(), key=lambda x: x[1].get("judge_count", 0) + x[1].get("recorder_count", 0),
+                 reverse=True)[:limit]
+    totals = {
+        'judges': sum(1 for _, s in stats.items() if s.get('judge_count', 0) > 0),
+        'recorders': sum(1 for _, s in stats.items() if s.get('recorder_count', 0) > 0),
+        'judge_matches': sum(s.get('judge_count', 0) for _, s in stats.items()),
+        'interactions': sum(s.get('judge_count', 0) + s.get('recorder_count', 0) for _, s in stats.items()),
+    }
+    return top, totals
+
+
+def bench_staff_leaderboard(sizes=(1000, 10000), rounds=200):
+    """Top 15 plus footer totals: ranked store vs sorting every staff record"""
+    print("== staff leaderboard: top 15 and totals ==")
+    print(f"{'staff':>8} {'sort us':>10} {'ranked us':>10} {'update us':>10}")
+    original_storage = app.storage
+    try:
+        app.storage = app.MemoryStorage()
+        for size in sizes:
+            app.staff_stats.load({str(i): {"name": f"Staff {i}", "judge_count": (i * 7919) % 97,
+                                           "recorder_count": i % 5, "last_activity": None}
+                                  for i in range(size)})
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                legacy_leaderboard(15)
+            sort = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                app.get_staff_leaderboard(15), dict(app.staff_stats.totals)
+            ranked = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for i in range(rounds):
+                app.update_staff_stats((i * 31) % size, f"Staff {i}", "judge" if i % 2 else "recorder")
+            update = time.perf_counter() - start
+
+            expected_top, expected_totals = legacy_leaderboard(size)
+            totals = {uid: stats["judge_count"] + stats["recorder_count"] for uid, stats in expected_top}
+            assert [totals[uid] for uid, _ in app.get_staff_leaderboard(size)] == [totals[uid] for uid, _ in expected_top]
+            assert app.staff_stats.totals == expected_totals, "ranked totals drifted from a full recount"
+            print(f"{size:>8} {sort / rounds * 1e6:>10.1f} {ranked / rounds * 1e6:>10.1f} {update / rounds * 1e6:>10.1f}")
+
+        # Ended buckets are deleted on rollover, and at boot if they ended while offline
+        stored = len(app.storage.load('staff_rollups'))
+        app.storage.write('staff_rollups', {app.rollup_key("day", "2020-01-01", "1"): {"judge_count": 1}})
+        with contextlib.redirect_stdout(io.StringIO()):
+            app.load_staff_stats()
+        assert len(app.storage.load('staff_rollups')) == stored, "a rollup from an ended day was loaded or kept"
+        later = datetime.datetime.utcnow() + datetime.timedelta(days=120)
+        for period in app.STAFF_PERIODS:
+            app.current_rollup(period, later)
+        app.save_staff_stats()
+        assert app.storage.load('staff_rollups') == {}, "ended rollup buckets were not deleted"
+        print(f"  rollover to new buckets deleted {stored} stored rollup records")
+    finally:
+        app.storage = original_storage
+        app.staff_stats.load({})
+        app.staff_increments.clear()
+        app.staff_rollups.clear()
+        app.rollup_increments.clear()
+        app.rollup_removals.clear()
+
+
+def legacy_sheet_result(sheets, event_id):
+    """How a result used to be logged: find + update_cell per column, one append_row per attendance row"""
+    cell = sheets.event_sheet.find(event_id)
+    sheets.event_sheet.update_cell(cell.row, 11, "Team 1")
+    sheets.event_sheet.update_cell(cell.row, 12, "2-1")
+    sheets.event_sheet.update_cell(cell.row, 13, "GG")
+    sheets.attendance_sheet.append_row(["2026-01-01", "12:00:00", event_id, "judge", "", "judge"])
+    sheets.attendance_sheet.append_row(["2026-01-01", "12:00:00", event_id, "", "recorder", "judge"])
+
+
+def queued_sheet_result(sheets, event_id):
+    sheets.log_event_result(event_id, "Team 1", "2-1", "GG")
+    sheets.log_attendance("2026-01-01", "12:00:00", event_id, "Judge", "judge", "judge")
+    sheets.log_attendance("2026-01-01", "12:00:00", event_id, "Recorder", "recorder", "judge")
+
+
+def bench_sheet_writes(results=(1, 10, 50), latency=0.02):
+    """API calls and time spent in the command handler per match result logged to the sheet"""
+    print(f"== sheet writes: match results, {latency * 1000:.0f} ms simulated per API call ==")
+    print(f"{'results':>8} {'mode':>8} {'calls/result':>13} {'handler ms':>11} {'flush ms':>9}")
+    sheets = app.sheet_manager
+    original = (sheets.event_sheet, sheets.attendance_sheet, sheets.pending, sheets.row_index)
+    original_request = app.request_save
+    # Queue only; the flush is timed separately, as the persistence worker would run it
+    app.request_save = lambda *kinds: None
+    try:
+        for count in results:
+            for mode, log in (("direct", legacy_sheet_result), ("batched", queued_sheet_result)):
+                sheets.event_sheet, sheets.attendance_sheet = FakeWorksheet(), FakeWorksheet()
+                # Rows written by someone else: the first update rebuilds the row index
+                sheets.pending, sheets.row_index = [], {}
+                for i in range(count):
+                    sheets.event_sheet.append_row([f"EVT-{i}"])
+                sheets.event_sheet.calls = 0
+                sheets.event_sheet.latency = sheets.attendance_sheet.latency = latency
+
+                start = time.perf_counter()
+                for i in range(count):
+                    log(sheets, f"EVT-{i}")
+                handler = time.perf_counter() - start
+                start = time.perf_counter()
+                if sheets.pending:
+                    app.write_sheets(sheets.take_pending())
+                flush = time.perf_counter() - start
+                calls = sheets.event_sheet.calls + sheets.attendance_sheet.calls
+                assert all(row[10:13] == ["Team 1", "2-1", "GG"] for row in sheets.event_sheet.rows[1:])
+                assert len(sheets.attendance_sheet.rows) == 1 + 2 * count
+                print(f"{count:>8} {mode:>8} {calls / count:>13.2f} {handler / count * 1000:>11.2f} {flush * 1000:>9.1f}")
+    finally:
+        sheets.event_sheet, sheets.attendance_sheet, sheets.pending, sheets.row_index = original
+        app.request_save = original_request
+
+
+def bench_sheet_lookups(sizes=(100, 1000, 10000), results=20):
+    """Cells downloaded to locate an event's row: find() per update vs the row index"""
+    print(f"== sheet lookups: {results} staff updates into sheets of growing size ==")
+    print(f"{'rows':>8} {'find calls':>11} {'find cells':>11} {'index calls':>12} {'index cells':>12}")
+    sheets = app.sheet_manager
+    original = (sheets.event_sheet, sheets.pending, sheets.row_index)
+    original_request = app.request_save
+    app.request_save = lambda *kinds: None
+    try:
+        for size in sizes:
+            row = ["x"] * 13
+            sheets.event_sheet = legacy = FakeWorksheet()
+            legacy.rows += [[f"EVT-{i}"] + row[1:] for i in range(size)]
+            for i in range(results):
+                cell = legacy.find(f"EVT-{size - 1 - i}")
+                legacy.update_cell(cell.row, 9, "judge")
+
+            # Index mode: events created through the manager, updates flushed one at a time
+            sheets.event_sheet = indexed = FakeWorksheet()
+            sheets.pending, sheets.row_index = [], {}
+            for i in range(size):
+                sheets.log_event_creation({'id': f"EVT-{i}", 'tournament': "T", 'round': "R1", 'team1_name': "A",
+                                           'team2_name': "B", 'date_str': "2026-01-01", 'time_str': "12:00"})
+            app.write_sheets(sheets.take_pending())
+            indexed.calls = indexed.cells_read = 0
+            for i in range(results):
+                sheets.update_event_staff(f"EVT-{size - 1 - i}", judge_name="judge")
+                app.write_sheets(sheets.take_pending())
+            assert all(r[8] == "judge" for r in indexed.rows[-results:])
+            calls, cells_read = indexed.calls, indexed.cells_read
+
+            # Sorted by hand: the cached row numbers now point at other events
+            indexed.rows[1:] = indexed.rows[:0:-1]
+            with contextlib.redirect_stdout(io.StringIO()):
+                sheets.update_event_staff("EVT-0", judge_name="after sort")
+                app.write_sheets(sheets.take_pending())
+            assert [r[0] for r in indexed.rows if r[8:9] == ["after sort"]] == ["EVT-0"], "update landed in the wrong row"
+            indexed.calls, indexed.cells_read = calls, cells_read
+            print(f"{size:>8} {legacy.calls / results:>11.1f} {legacy.cells_read / results:>11.0f} "
+                  f"{indexed.calls / results:>12.1f} {indexed.cells_read / results:>12.0f}")
+    finally:
+        sheets.event_sheet, sheets.pending, sheets.row_index = original
+        app.request_save = original_request
+
+
+class RateLimitedWorksheet(FakeWorksheet):
+    """FakeWorksheet that rejects every nth call the way the API answers 429"""
+
+    def __init__(self, fail_every: int):
+        super().__init__()
+        self.fail_every = fail_every
+        self.rejected = 0
+
+    def _call(self):
+        super()._call()
+        if self.calls % self.fail_every == 0:
+            self.rejected += 1
+            raise RuntimeError("APIError: [429] Quota exceeded")
+
+
+def bench_outbox(results=300, speedup=100.0, fail_every=7):
+    """A busy results hour through the outbox: quota, 429s and a restart, compressed in time"""
+    print(f"== outbox: {results} match results, time sped up {speedup:.0f}x, every {fail_every}th API call rejected ==")
+    sheets = app.sheet_manager
+    original = (sheets.event_sheet, sheets.attendance_sheet, sheets.pending, sheets.row_index)
+    original_request = app.request_save
+    # This benchmark drives its own outbox instead of the persistence worker's
+    app.request_save = lambda *kinds: None
+    try:
+        with temp_workdir():
+            sheets.event_sheet, sheets.attendance_sheet = RateLimitedWorksheet(fail_every), RateLimitedWorksheet(fail_every)
+            sheets.event_sheet.rows += [[f"EVT-{i}"] for i in range(results)]
+            sheets.pending, sheets.row_index = [], {}
+
+            def open_outbox():
+                box = app.Outbox("outbox.json", base_delay=1.0 / speedup, max_delay=300 / speedup)
+                box.limiters["sheets"] = app.TokenBucket(app.SHEETS_WRITES_PER_MINUTE, 60 / speedup)
+                return box
+
+            box = open_outbox()
+            start = time.perf_counter()
+            max_depth = 0
+            for i in range(results):
+                # A flush per result is the worst case; real flushes coalesce several
+                queued_sheet_result(sheets, f"EVT-{i}")
+                box.add("sheets", sheets.take_pending())
+                box.deliver("sheets", app.write_sheets)
+                max_depth = max(max_depth, box.depth().get("sheets", 0))
+                if i == results // 2:
+                    box = open_outbox()  # restart: pending writes are read back from disk
+            while box.entries:
+                time.sleep(box.next_retry() or 0)
+                box.deliver("sheets", app.write_sheets)
+            elapsed = (time.perf_counter() - start) * speedup
+
+            calls = sheets.event_sheet.calls + sheets.attendance_sheet.calls
+            rejected = sheets.event_sheet.rejected + sheets.attendance_sheet.rejected
+            rows = len(sheets.attendance_sheet.rows) - 1
+            results_written = sum(row[10:13] == ["Team 1", "2-1", "GG"] for row in sheets.event_sheet.rows[1:])
+            assert rows == 2 * results, f"attendance rows lost or duplicated: {rows}"
+            assert results_written == results, f"results missing: {results_written}"
+            print(f"  API calls {calls} ({rejected} rejected), peak backlog {max_depth} entries, "
+                  f"simulated time {elapsed / 60:.1f} min, calls/min {calls / (elapsed / 60):.1f}")
+            print(f"  attendance rows {rows}/{2 * results}, results written {results_written}/{results}")
+
+            # A write the API rejects outright must not hold up the ones queued behind it
+            class BadRequest(Exception):
+                code = 400
+
+            delivered = []
+
+            def write_rules(snapshot):
+                if "bad" in snapshot['upserts']:
+                    raise BadRequest("[400] Invalid value")
+                delivered.append(snapshot)
+
+            box = open_outbox()
+            box.add("tournament_rules", {'upserts': {"bad": 1}, 'removed': []})
+            for i in range(5):
+                box.add("tournament_rules", {'upserts': {f"rule {i}": i}, 'removed': []})
+            with contextlib.redirect_stdout(io.StringIO()):
+                box.deliver("tournament_rules", write_rules)
+            assert len(delivered) == 5 and box.parked == 1 and not box.entries, "rejected write blocked the outbox"
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert open_outbox().parked == 1, "parked writes must survive a restart"
+            print(f"  rejected write parked, {len(delivered)}/5 writes behind it delivered")
+    finally:
+        sheets.event_sheet, sheets.attendance_sheet, sheets.pending, sheets.row_index = original
+        app.request_save = original_request
+
+
+def bench_sheet_reconcile(sizes=(100, 1000), drift=0.05):
+    """Repairing a drifted sheet: API calls and rows fixed by one reconcile, then a clean re-run"""
+    print(f"== sheet reconcile: {drift:.0%} of event rows missing, {drift:.0%} with wrong cells, "
+          f"{drift:.0%} of attendance rows missing ==")
+    print(f"{'events':>8} {'fixed':>7} {'calls':>6} {'cells read':>11} {'recheck calls':>14}")
+    sheets = app.sheet_manager
+    original = (sheets.spreadsheet, sheets.event_sheet, sheets.attendance_sheet, sheets.row_index)
+
+    class Guild:
+        def get_member(self, member_id):
+            return type("Member", (), {"name": f"staff{member_id}"})()
+
+    try:
+        for size in sizes:
+            events = []
+            for i in range(size):
+                event = app.Event.from_dict(make_event(i))
+                event['judge'] = 1000 + i % 7
+                if i % 2:
+                    event['result_added'] = True
+                    event['sheet_result'] = {'winner': "Team 1", 'score': "Team 1 (2) - Team 2 (1)", 'remarks': "ggwp",
+                                             'attendance': [["2026-01-01", "12:00:00", f"match {i}", f"staff{1000 + i % 7}", "", "x"]]}
+                events.append(event)
+            event_rows, attendance_rows = app.expected_sheet_rows(events, Guild())
+
+            sheets.event_sheet = FakeWorksheet(title="Event Details")
+            sheets.attendance_sheet = FakeWorksheet(title="Mark Attendance")
+            sheets.spreadsheet = FakeSpreadsheet(sheets.event_sheet, sheets.attendance_sheet)
+            step = int(1 / drift)
+            sheets.event_sheet.rows += [list(row) for i, row in enumerate(event_rows) if i % step != 0]
+            for row in sheets.event_sheet.rows[1::step]:
+                row[8] = "someone else"
+            sheets.attendance_sheet.rows += [list(row) for i, row in enumerate(attendance_rows) if i % step != 1]
+
+            report = sheets.reconcile(event_rows, attendance_rows)
+            read = sheets.event_sheet.cells_read + sheets.attendance_sheet.cells_read
+            fixed = report['rows_updated'] + report['events_appended'] + report['attendance_appended']
+            recheck = sheets.reconcile(event_rows, attendance_rows)
+            assert recheck['api_calls'] == 1 and recheck['rows_updated'] == recheck['events_appended'] == 0
+            assert recheck['attendance_appended'] == 0
+            print(f"{size:>8} {fixed:>7} {report['api_calls']:>6} {read:>11} {recheck['api_calls']:>14}")
+    finally:
+        sheets.spreadsheet, sheets.event_sheet, sheets.attendance_sheet, sheets.row_index = original
+
+
+# The five fonts create_event_poster loads for an 800x450 poster
+POSTER_FONTS = [("Square One", 45, "bold"), ("DS-Digital", 63, "bold"), ("Capture it", 40, "bold"),
+                ("DS-Digital", 31, "bold"), ("Roboto", 22, "regular")]
+
+
+def legacy_poster_fonts(network_calls: list):
+    """Font loading before the cache: two Google Fonts requests for every font (and a
+    temp file, skipped here), then the first loadable candidate opened from disk"""
+    fonts = []
+    for name, size, style in POSTER_FONTS:
+        network_calls += [f"css:{name}", f"font:{name}"]  # both requests, as when online
+        local = (["Fonts/ds_digital/DS-DIGIB.TTF"] if name == "DS-Digital"
+                 else ["Fonts/capture_it/Capture it.ttf"])
+        fonts.append(app.ImageFont.truetype(local[0], size))
+    return fonts
+
+
+def bench_poster_fonts(posters=200):
+    """Loading a poster's fonts: network requests and time, before the cache, cold and warm"""
+    print(f"== poster fonts: {len(POSTER_FONTS)} fonts per poster, {posters} posters ==")
+    network_calls = []
+    original_get = app.requests.get
+
+    def offline_get(*args, **kwargs):
+        network_calls.append(args[0])
+        raise ConnectionError("benchmarks run offline")
+
+    app.requests.get = offline_get
+    try:
+        with contextlib.chdir(os.path.dirname(os.path.abspath(__file__))), \
+                contextlib.redirect_stdout(io.StringIO()):
+            results = []
+            start = time.perf_counter()
+            for _ in range(posters):
+                legacy_poster_fonts(network_calls)
+            results.append(("before", time.perf_counter() - start, len(network_calls)))
+
+            for label, clear in (("cold cache", True), ("warm cache", False)):
+                network_calls.clear()
+                start = time.perf_counter()
+                for _ in range(posters):
+                    if clear:
+                        app.font_paths.clear()
+                        app.loaded_fonts.clear()
+                    for name, size, style in POSTER_FONTS:
+                        app.get_font_with_fallbacks(name, size, style)
+                results.append((label, time.perf_counter() - start, len(network_calls)))
+        print(f"{'fonts':<12} {'ms/poster':>10} {'requests/poster':>16}")
+        for label, elapsed, calls in results:
+            print(f"{label:<12} {elapsed / posters * 1000:>10.3f} {calls / posters:>16.1f}")
+    finally:
+        app.requests.get = original_get
+
+
+def bench_poster_templates(rounds=5):
+    """Getting a poster's starting image: decode + RGBA + resize per poster vs the template cache"""
+    with contextlib.chdir(os.path.dirname(os.path.abspath(__file__))), \
+            contextlib.redirect_stdout(io.StringIO()):
+        paths = sorted(glob.glob("MW Templates/*") + glob.glob("MWT Templates/*"))
+        cache = app.TemplateCache(app.TEMPLATE_CACHE_MB * 1024 * 1024)
+        results = []
+        for label, load, repeat in (("decode per poster", app.load_poster_template, rounds),
+                                    ("cache, first use", cache.get, 1), ("cache, hit", cache.get, rounds)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for path in paths:
+                    load(path)
+            results.append((label, (time.perf_counter() - start) / (repeat * len(paths))))
+    print(f"== poster templates: {len(paths)} templates, {rounds} posters each ==")
+    print(f"{'templates':<18} {'ms/poster':>10}")
+    for label, elapsed in results:
+        print(f"{label:<18} {elapsed * 1000:>10.3f}")
+    print(f"cache: {cache.misses} loads, {cache.hits} hits, {cache.bytes / 1024 / 1024:.1f} MB held")
+
+
+def legacy_random_template(mode="MW"):
+    """Template pick before the registry: eight globs per call, then random.choice"""
+    target_path = app.Path("MWT Templates" if mode == "MWT" else "MW Templates")
+    image_files = []
+    for ext in ['*.jpg', '*.jpeg', '*.png', '*.gif']:
+        image_files.extend(glob.glob(str(target_path / ext)))
+        image_files.extend(glob.glob(str(target_path / ext.upper())))
+    return random.choice(image_files) if image_files else None
+
+
+def bench_template_picks(picks=2000):
+    """Choosing a template per match: per-call globbing vs the registry, and back-to-back repeats"""
+    print(f"== template picks: {picks} matches per mode ==")
+    print(f"{'picker':<10} {'mode':<5} {'us/pick':>8} {'repeats':>8} {'max uses':>9} {'min uses':>9}")
+    with contextlib.chdir(os.path.dirname(os.path.abspath(__file__))):
+        for label, pick in (("glob", legacy_random_template), ("registry", app.TemplateRegistry(app.TEMPLATE_FOLDERS).pick)):
+            for mode in ("MW", "MWT"):
+                start = time.perf_counter()
+                chosen = [pick(mode) for _ in range(picks)]
+                elapsed = time.perf_counter() - start
+                repeats = sum(a == b for a, b in zip(chosen, chosen[1:]))
+                uses = [chosen.count(path) for path in set(chosen)]
+                print(f"{label:<10} {mode:<5} {elapsed / picks * 1e6:>8.1f} {repeats:>8} {max(uses):>9} {min(uses):>9}")
+
+
+def legacy_outlined_text(image, draw, position, text, font, fill, outline_fill, outline_width=4):
+    """The outline before: the text drawn at every offset of a 9x9 grid, then on top"""
+    x, y = int(position[0]), int(position[1])
+    for dx in range(-outline_width, outline_width + 1):
+        for dy in range(-outline_width, outline_width + 1):
+            if dx != 0 or dy != 0:
+                draw.text((x + dx, y + dy), text, font=font, fill=outline_fill)
+    draw.text((x, y), text, font=font, fill=fill)
+
+
+def stroke_outlined_text(image, draw, position, text, font, fill, outline_fill, outline_width=4):
+    """Pillow's built-in stroke, for comparison: one call, but a round outline"""
+    draw.text((int(position[0]), int(position[1])), text, font=font, fill=fill,
+              stroke_width=outline_width, stroke_fill=outline_fill)
+
+
+def poster_lines(height: int) -> list:
+    """(text, y, font, fill) for the five outlined lines of a poster, as create_event_poster lays them out"""
+    white, yellow = (255, 255, 255), (255, 255, 0)
+    font = app.get_font_with_fallbacks
+    return [
+        ("Winterfell Arena Esports", height * 0.08, font("Square One", int(height * 0.10), "bold"), white),
+        ("ROUND Semi Final", height * 0.35, font("DS-Digital", int(height * 0.14), "bold"), yellow),
+        ("CaptainAlpha VS CaptainBravo", height * 0.55, font("Capture it", int(height * 0.09), "bold"), white),
+        ("DATE:  17/10", height * 0.72, font("DS-Digital", int(height * 0.07), "bold"), white),
+        ("TIME:  18:30 UTC", height * 0.82, font("DS-Digital", int(height * 0.07), "bold"), white),
+    ]
+
+
+def bench_poster_outline(rounds=1):
+    """Outlined poster text: pixel difference from the 9x9 grid of draws, and time per poster"""
+    with contextlib.chdir(os.path.dirname(os.path.abspath(__file__))), \
+            contextlib.redirect_stdout(io.StringIO()):
+        paths = sorted(glob.glob("MW Templates/*") + glob.glob("MWT Templates/*"))
+        templates = [app.load_poster_template(path) for path in paths]
+
+        def render(outline, template):
+            poster = template.copy()
+            draw = app.ImageDraw.Draw(poster)
+            for text, y, font, fill in poster_lines(poster.height):
+                box = draw.textbbox((0, 0), text, font=font)
+                outline(poster, draw, ((poster.width - (box[2] - box[0])) // 2, y), text, font, fill, (0, 0, 0), 4)
+            return poster
+
+        results = []
+        for label, outline in (("9x9 grid", legacy_outlined_text), ("one pass", app.draw_outlined_text),
+                               ("stroke_width", stroke_outlined_text)):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                posters = [render(outline, template) for template in templates]
+            results.append((label, outline, (time.perf_counter() - start) / (rounds * len(templates)), posters))
+
+    print(f"== poster outline: 5 outlined lines on each of {len(templates)} templates ==")
+    print(f"{'outline':<13} {'ms/poster':>10} {'max diff':>9} {'mean diff':>10} {'pixels > 16':>12}")
+    reference = results[0][3]
+    failed = None
+    for label, outline, elapsed, posters in results:
+        worst, total, differing, pixels = 0, 0.0, 0, 0
+        for before, after in zip(reference, posters):
+            difference = ImageChops.difference(before.convert("RGB"), after.convert("RGB")).convert("L")
+            histogram = difference.histogram()
+            worst = max(worst, max(value for value, count in enumerate(histogram) if count))
+            total += sum(value * count for value, count in enumerate(histogram))
+            differing += sum(histogram[17:])
+            pixels += difference.width * difference.height
+        print(f"{label:<13} {elapsed * 1000:>10.1f} {worst:>9} {total / pixels:>10.4f} {differing / pixels:>11.3%}")
+        if outline is app.draw_outlined_text and (worst > 4 or differing):
+            failed = f"{label}: max diff {worst}, {differing} pixels over 16"
+    if failed:
+        # The one-pass outline must stay within rounding of the 9x9 grid it replaced
+        print(f"FAILED: {failed}")
+        sys.exit(1)
+
+
+def bench_poster_render(requests=6, workers=2, limit=3):
+    """A burst of /event-create calls: event loop stalls with posters rendered inline vs in the pool"""
+    print(f"== poster render: {requests} posters requested at once, pool of {workers} with {limit} waiting ==")
+    template = "MW Templates/ph25_093_1920x1080.jpg"
+
+    def render(i):
+        return app.create_event_poster(template, "R1", f"Alpha{i}", f"Bravo{i}", "18:30", "17/10")
+
+    async def burst(pooled: bool) -> dict:
+        renderer = app.PosterRenderer(workers, limit)
+        stats = {'stall': 0.0, 'positions': [], 'rejected': 0}
+        done = asyncio.Event()
+
+        async def heartbeat():
+            # Stands in for gateway heartbeats and button clicks
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                stats['stall'] = max(stats['stall'], now - last - 0.005)
+                last = now
+
+        async def queued(position):
+            stats['positions'].append(position)
+
+        async def create(i):
+            if not pooled:
+                return render(i)
+            try:
+                return await renderer.render(render, i, on_queued=queued)
+            except app.PosterQueueFull:
+                stats['rejected'] += 1
+
+        ticker = asyncio.create_task(heartbeat())
+        await asyncio.sleep(0.02)
+        start = time.perf_counter()
+        await asyncio.gather(*(create(i) for i in range(requests)))
+        stats['elapsed'] = time.perf_counter() - start
+        done.set()
+        await ticker
+        renderer.executor.shutdown()
+        return stats
+
+    print(f"{'render':<8} {'total s':>8} {'max stall ms':>13} {'rejected':>9}  queue positions")
+    with contextlib.chdir(os.path.dirname(os.path.abspath(__file__))):
+        with contextlib.redirect_stdout(io.StringIO()):
+            render(-1)  # fonts and template cached, as after startup
+            results = [(label, asyncio.run(burst(pooled))) for label, pooled in (("inline", False), ("pool", True))]
+    for label, stats in results:
+        print(f"{label:<8} {stats['elapsed']:>8.2f} {stats['stall'] * 1000:>13.1f} {stats['rejected']:>9}  "
+              f"{stats['positions']}")
+
+
+def bench_poster_encoding(budgets=(256, 128, 64)):
+    """Poster bytes to upload and encode time: full-colour PNG vs the budgeted encoder"""
+    with contextlib.chdir(os.path.dirname(os.path.abspath(__file__))), \
+            contextlib.redirect_stdout(io.StringIO()):
+        posters = []
+        original_encode = app.encode_poster
+        app.encode_poster = lambda image, *args, **kwargs: posters.append(image) or original_encode(image, *args, **kwargs)
+        try:
+            for path in sorted(glob.glob("MW Templates/*") + glob.glob("MWT Templates/*")):
+                app.create_event_poster(path, "Semi Final", "CaptainAlpha", "CaptainBravo", "18:30", "17/10")
+        finally:
+            app.encode_poster = original_encode
+
+        rows = []
+        start = time.perf_counter()
+        sizes = []
+        for poster in posters:
+            buffer = io.BytesIO()
+            poster.save(buffer, "PNG")
+            sizes.append(buffer.tell())
+        rows.append(("RGBA PNG", sum(sizes), time.perf_counter() - start, ["png"] * len(posters)))
+        for budget in budgets:
+            start = time.perf_counter()
+            encoded = [app.encode_poster(poster, budget * 1024) for poster in posters]
+            rows.append((f"budget {budget} KB", sum(len(e.data) for e in encoded), time.perf_counter() - start,
+                         [f"{e.format} q{e.quality}" for e in encoded]))
+
+    print(f"== poster encoding: {len(posters)} posters, formats in order {', '.join(app.POSTER_FORMATS)} ==")
+    print(f"{'encoding':<15} {'KB/poster':>10} {'ms/poster':>10}  choices")
+    for label, total, elapsed, choices in rows:
+        counts = {choice: choices.count(choice) for choice in choices}
+        print(f"{label:<15} {total / len(posters) / 1024:>10.0f} {elapsed / len(posters) * 1000:>10.1f}  "
+              + ", ".join(f"{choice} x{count}" for choice, count in counts.items()))
+
+
+def bench_poster_cache(creates=40, matchups=8):
+    """Repeated /event-create calls for the same matchups: renders and time with the poster
+    cache cold, warm, and read back from disk after a restart. Templates are dealt by the
+    real registry, so a matchup must keep the template it was first drawn on."""
+    print(f"== poster cache: {creates} creates over {matchups} distinct posters ==")
+    repo = os.path.dirname(os.path.abspath(__file__))
+    original_cache = app.poster_cache
+    original_registry = app.template_registry
+    renders = []
+    original_create = app.create_event_poster
+
+    def counting_create(*args):
+        renders.append(args)
+        return original_create(*args)
+
+    async def run(cache) -> float:
+        app.poster_cache = cache
+        app.poster_renderer = app.PosterRenderer(app.POSTER_RENDER_WORKERS, creates)
+        start = time.perf_counter()
+        for i in range(creates):
+            # Display names differing only in emoji or spacing sanitize to the same poster
+            team1 = f"Alpha {i % matchups}" + (" 🔥" if i % 2 else "")
+            await app.get_event_poster("MW", "R1", team1, f"Bravo {i % matchups}", "18:30", "17/10")
+        app.poster_renderer.executor.shutdown()
+        return time.perf_counter() - start
+
+    print(f"{'cache':<22} {'renders':>8} {'ms/create':>10} {'hits':>6}")
+    app.create_event_poster = counting_create
+    original_renderer = app.poster_renderer
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir, contextlib.chdir(repo), \
+                contextlib.redirect_stdout(io.StringIO()):
+            def layered():
+                return app.PosterCache(32 * 1024 * 1024, cache_dir, 64 * 1024 * 1024)
+
+            results = []
+            # A zero-byte cache keeps nothing, so every create renders
+            for label, make_cache in (("none", lambda: app.PosterCache(0)), ("memory + disk", layered),
+                                      ("disk, after restart", layered)):
+                cache = make_cache()
+                app.template_registry = app.TemplateRegistry(app.TEMPLATE_FOLDERS)  # a fresh deck, as after a restart
+                renders.clear()
+                elapsed = asyncio.run(run(cache))
+                results.append((label, len(renders), elapsed, cache.hits))
+        for label, rendered, elapsed, hits in results:
+            print(f"{label:<22} {rendered:>8} {elapsed / creates * 1000:>10.1f} {hits:>6}")
+        expected = [creates, matchups, 0]
+        if [rendered for _, rendered, _, _ in results] != expected:
+            print(f"FAILED: expected {expected} renders")
+            sys.exit(1)
+    finally:
+        app.create_event_poster = original_create
+        app.poster_cache = original_cache
+        app.template_registry = original_registry
+        app.poster_renderer = original_renderer
+
+
+class SlowFirestore:
+    """Firestore client whose reads take a simulated round-trip and find nothing"""
+    exists = False
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def collection(self, name):
+        return self
+
+    def document(self, doc_id):
+        return self
+
+    def get(self):
+        time.sleep(self.latency)
+        return self
+
+    def stream(self):
+        time.sleep(self.latency)
+        return []
+
+
+class SlowSheetsClient:
+    """gspread client whose open_by_key and worksheet lookups take a simulated round-trip"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def open_by_key(self, key):
+        time.sleep(self.latency)
+        return self
+
+    def worksheet(self, title):
+        time.sleep(self.latency)
+        return FakeWorksheet(title=title)
+
+
+def bench_startup(firebase_init=0.8, sheets_auth=0.6, sheets_call=0.3, storage_read=0.1, login=0.3, gateway=0.5):
+    """Time to gateway connect and to serving commands: connecting at import vs after login.
+
+    Firebase, Google auth and every remote read sleep for a simulated latency; the real
+    connect and load functions run on top of them.
+    """
+    print(f"== startup: Firebase init {firebase_init}s, Sheets auth {sheets_auth}s + 3 calls of {sheets_call}s, "
+          f"storage reads {storage_read}s, login {login}s, gateway {gateway}s ==")
+    sheets = app.sheet_manager
+    original_sheets = (sheets.client, sheets.spreadsheet, sheets.event_sheet, sheets.attendance_sheet)
+    original_storage = app.storage
+    patches = [
+        (app.firebase_admin, 'initialize_app', lambda cred: time.sleep(firebase_init)),
+        (app.credentials, 'Certificate', lambda cred: cred),
+        (app.firestore, 'client', lambda: SlowFirestore(storage_read)),
+        (app.Credentials, 'from_service_account_file', lambda path, scopes: None),
+        (app.gspread, 'authorize', lambda creds: time.sleep(sheets_auth) or SlowSheetsClient(sheets_call)),
+    ]
+    originals = [(target, name, getattr(target, name)) for target, name, _ in patches]
+    original_env = os.environ.get("FIREBASE_CREDENTIALS")
+
+    def reset():
+        app.db = None
+        app.firebase_ready.clear()
+        sheets.ready.clear()
+        sheets.client = sheets.spreadsheet = sheets.event_sheet = sheets.attendance_sheet = None
+        app.storage = app.FirestoreStorage()
+
+    def legacy() -> tuple:
+        # What import and __main__ used to do before bot.run()
+        start = time.perf_counter()
+        app.connect_firebase()
+        sheets.connect()
+        app.load_scheduled_events()
+        app.load_rules()
+        app.load_staff_stats()
+        time.sleep(login + gateway)
+        connected = time.perf_counter() - start
+        return connected, connected, None
+
+    async def lazy() -> tuple:
+        bot = app.TournamentBot(command_prefix="!", intents=app.intents)
+        stall = 0.0
+
+        async def heartbeat():
+            # The longest the loop went without running us: heartbeats are late by as much
+            nonlocal stall
+            while True:
+                before = time.perf_counter()
+                await asyncio.sleep(0.01)
+                stall = max(stall, time.perf_counter() - before - 0.01)
+
+        beat = asyncio.create_task(heartbeat())
+        start = time.perf_counter()
+        await asyncio.sleep(login)
+        await bot.setup_hook()
+        await asyncio.sleep(gateway)  # the gateway handshake, concurrent with start_services
+        connected = time.perf_counter() - start
+        await bot.data_ready.wait()
+        ready = time.perf_counter() - start
+        await bot.startup_task
+        beat.cancel()
+        await app.persistence_queue.stop()
+        return connected, ready, stall
+
+    print(f"{'startup':<22} {'gateway s':>10} {'commands s':>11} {'loop stall ms':>14}")
+    try:
+        with temp_workdir():
+            for target, name, value in patches:
+                setattr(target, name, value)
+            os.environ["FIREBASE_CREDENTIALS"] = "{}"
+            with open(app.SERVICE_ACCOUNT_FILE, "w") as f:
+                f.write("{}")
+            for label, run in (("connect at import", legacy), ("connect after login", lambda: asyncio.run(lazy()))):
+                reset()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    connected, ready, stall = run()
+                assert app.db is not None and sheets.event_sheet is not None
+                stall = "-" if stall is None else f"{stall * 1000:.0f}"
+                print(f"{label:<22} {connected:>10.2f} {ready:>11.2f} {stall:>14}")
+    finally:
+        for target, name, value in originals:
+            setattr(target, name, value)
+        if original_env is None:
+            os.environ.pop("FIREBASE_CREDENTIALS", None)
+        else:
+            os.environ["FIREBASE_CREDENTIALS"] = original_env
+        app.db = None
+        app.firebase_ready.clear()
+        app.storage = original_storage
+        sheets.client, sheets.spreadsheet, sheets.event_sheet, sheets.attendance_sheet = original_sheets
+        sheets.ready.set()
+
+
+# ===========================================================================================
+# STORAGE BACKEND CONFORMANCE AND THROUGHPUT
+# ===========================================================================================
+
+def stored_event(i: int, **changes) -> dict:
+    """An event the way it reaches storage.write()"""
+    data = app.Event.from_dict(make_event(i)).to_dict()
+    data.update(changes)
+    return data
+
+
+def stored_staff(i: int) -> dict:
+    return {"name": f"Staff {i}", "judge_count": i, "recorder_count": i % 3,
+            "last_activity": datetime.datetime(2026, 1, 1, 12, i % 60).isoformat()}
+
+
+def stored_rules(version: int) -> dict:
+    return {"content": f"Rules v{version}", "last_updated": "2026-01-01T00:00:00",
+            "updated_by": {"user_id": 1, "username": "Organizer"}, "version": version}
+
+
+def check_empty(backend, reopen):
+    for collection in app.STORAGE_COLLECTIONS:
+        assert backend.load(collection) == {}, f"{collection} not empty"
+
+
+def check_round_trip(backend, reopen):
+    backend.write('scheduled_events', {"EVT-1": stored_event(1), "EVT-2": stored_event(2)})
+    backend.write('staff_stats', {"11": stored_staff(11)})
+    backend.write('tournament_rules', {"rules": stored_rules(1)})
+    assert backend.load('scheduled_events') == {"EVT-1": stored_event(1), "EVT-2": stored_event(2)}
+    assert backend.load('staff_stats') == {"11": stored_staff(11)}
+    assert backend.load('tournament_rules') == {"rules": stored_rules(1)}
+
+
+def check_replace(backend, reopen):
+    backend.write('scheduled_events', {"EVT-1": stored_event(1, judge=42, notes="x")})
+    replacement = stored_event(1)
+    backend.write('scheduled_events', {"EVT-1": replacement})
+    assert backend.load('scheduled_events')["EVT-1"] == replacement, "upsert must replace the whole record"
+    backend.write('tournament_rules', {"rules": stored_rules(2)})
+    assert backend.load('tournament_rules') == {"rules": stored_rules(2)}
+
+
+def check_remove(backend, reopen):
+    backend.write('scheduled_events', {"EVT-1": stored_event(1), "EVT-2": stored_event(2)})
+    backend.write('scheduled_events', {}, ["EVT-1", "EVT-missing"])
+    assert list(backend.load('scheduled_events')) == ["EVT-2"]
+    backend.write('scheduled_events', {"EVT-3": stored_event(3)}, ["EVT-2"])
+    assert list(backend.load('scheduled_events')) == ["EVT-3"], "upserts and removes in one write"
+
+
+def check_copies(backend, reopen):
+    backend.write('scheduled_events', {"EVT-1": stored_event(1)})
+    backend.load('scheduled_events')["EVT-1"]['round'] = "changed"
+    assert backend.load('scheduled_events')["EVT-1"]['round'] == "R1", "load() must return copies"
+
+
+def check_active_events(backend, reopen):
+    backend.write('scheduled_events', {"EVT-1": stored_event(1), "EVT-2": stored_event(2, status='completed')})
+    active = backend.load_active_events()
+    assert "EVT-1" in active, "open events must be loaded at startup"
+    assert set(active) <= {"EVT-1", "EVT-2"}
+    assert set(backend.load('scheduled_events')) == {"EVT-1", "EVT-2"}
+
+
+def check_clear(backend, reopen):
+    backend.write('scheduled_events', {"EVT-1": stored_event(1)})
+    backend.write('staff_stats', {"11": stored_staff(11)})
+    backend.clear('scheduled_events')
+    assert backend.load('scheduled_events') == {}
+    assert backend.load('staff_stats') == {"11": stored_staff(11)}, "clear() must only touch one collection"
+
+
+def check_reopen(backend, reopen):
+    backend.write('scheduled_events', {"EVT-1": stored_event(1)})
+    backend.write('staff_stats', {"11": stored_staff(11)})
+    backend.write('tournament_rules', {"rules": stored_rules(3)})
+    reopened = reopen()
+    if reopened is None:
+        return
+    assert reopened.load('scheduled_events') == {"EVT-1": stored_event(1)}
+    assert reopened.load('staff_stats') == {"11": stored_staff(11)}
+    assert reopened.load('tournament_rules') == {"rules": stored_rules(3)}
+
+
+def check_archive(backend, reopen):
+    backend.archive({"EVT-1": stored_event(1, status='completed')})
+    backend.archive({"EVT-2": stored_event(2, status='completed'), "EVT-1": stored_event(1, winner="Team 1")})
+    expected = {"EVT-1": stored_event(1, winner="Team 1"), "EVT-2": stored_event(2, status='completed')}
+    assert backend.load_archive() == expected, "archiving a key again must replace it"
+    assert backend.load('scheduled_events') == {}, "archiving must not touch scheduled_events"
+    reopened = reopen()
+    if reopened is not None:
+        assert reopened.load_archive() == expected
+    backend.clear_archive()
+    assert backend.load_archive() == {}, "clear_archive must delete every archived event"
+    backend.archive({"EVT-3": stored_event(3, status='completed')})
+    assert backend.load_archive() == {"EVT-3": stored_event(3, status='completed')}
+
+
+def check_increment(backend, reopen):
+    backend.write('staff_stats', {"11": stored_staff(11)})
+    backend.increment('staff_stats', {
+        "11": {'inc': {"judge_count": 2}, 'set': {"name": "Renamed"}},
+        "12": {'inc': {"recorder_count": 1}, 'set': {"name": "Staff 12", "last_activity": "2026-02-01T00:00:00"}},
+    })
+    backend.increment('staff_stats', {"12": {'inc': {"recorder_count": 1, "judge_count": 1}, 'set': {}}})
+    expected = {
+        "11": {**stored_staff(11), "judge_count": 13, "name": "Renamed"},
+        "12": {"name": "Staff 12", "judge_count": 1, "recorder_count": 2, "last_activity": "2026-02-01T00:00:00"},
+    }
+    loaded = backend.load('staff_stats')
+    assert {uid: {field: loaded[uid].get(field, 0) for field in expected[uid]} for uid in loaded} == expected
+    # Two judges posting results at once: neither increment may be lost
+    threads = [threading.Thread(target=backend.increment, args=('staff_stats', {"11": {'inc': {"judge_count": 1}, 'set': {}}}))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.load('staff_stats')["11"]["judge_count"] == 21
+    reopened = reopen()
+    if reopened is not None:
+        assert reopened.load('staff_stats')["11"]["judge_count"] == 21
+
+
+CONFORMANCE_CHECKS = [check_empty, check_round_trip, check_replace, check_remove, check_copies,
+                      check_active_events, check_clear, check_reopen, check_archive, check_increment]
+
+
+def run_conformance(backend, reopen) -> bool:
+    """Run every check against a backend, starting each one from empty collections"""
+    passed = True
+    for check in CONFORMANCE_CHECKS:
+        for collection in app.STORAGE_COLLECTIONS:
+            backend.clear(collection)
+        try:
+            check(backend, reopen)
+            result = "ok"
+        except AssertionError as e:
+            passed = False
+            result = f"FAILED {e}"
+        print(f"  {check.__name__:<22} {result}")
+    for collection in app.STORAGE_COLLECTIONS:
+        backend.clear(collection)
+    return passed
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def time_ops(label: str, count: int, op):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        op_start = time.perf_counter()
+        op(i)
+        latencies.append(time.perf_counter() - op_start)
+    total = time.perf_counter() - start
+    print(f"  {label:<22} {count / total:>12.1f} {percentile(latencies, 0.99) * 1000:>10.3f}")
+
+
+def storage_backends():
+    """(label, factory) pairs; each factory returns (backend, reopen)"""
+    def memory():
+        backend = app.MemoryStorage()
+        return backend, lambda: None
+
+    def json_files():
+        return app.JsonStorage(), app.JsonStorage
+
+    def sqlite():
+        return app.SqliteStorage('bench.db'), lambda: app.SqliteStorage('bench.db')
+
+    backends = [("memory", memory), ("json", json_files), ("sqlite", sqlite)]
+    if app.firebase_configured() and app.connect_firebase():
+        def firestore():
+            return app.FirestoreStorage(app.db, prefix="benchmark_"), lambda: app.FirestoreStorage(app.db, prefix="benchmark_")
+        backends.append(("firestore", firestore))
+    return backends
+
+
+def bench_storage(size=1000, ops=500, loads=10):
+    """Conformance checks, then ops/sec and p99 latency for every storage backend"""
+    print(f"== storage backends: conformance, then throughput with {size} stored events ==")
+    if not app.firebase_configured():
+        print("(firestore skipped: Firebase is not configured)")
+    failed = []
+    for label, factory in storage_backends():
+        with temp_workdir():
+            backend, reopen = factory()
+            print(f"[{label}] conformance")
+            if not run_conformance(backend, reopen):
+                failed.append(label)
+                continue
+
+            backend.write('scheduled_events', {f"EVT-{i}": stored_event(i) for i in range(size)})
+            print(f"[{label}] {'operation':<22} {'ops/sec':>12} {'p99 ms':>10}")
+            time_ops("update one event", ops,
+                     lambda i: backend.write('scheduled_events', {f"EVT-{i % size}": stored_event(i % size, judge=i)}))
+            time_ops("create + delete", ops // 2, lambda i: (
+                backend.write('scheduled_events', {f"NEW-{i}": stored_event(size + i)}),
+                backend.write('scheduled_events', {}, [f"NEW-{i}"])))
+            time_ops("update staff record", ops, lambda i: backend.write('staff_stats', {str(i % 50): stored_staff(i)}))
+            time_ops("increment staff counter", ops,
+                     lambda i: backend.increment('staff_stats', {str(i % 50): {'inc': {"judge_count": 1}, 'set': {}}}))
+            time_ops(f"load {size} events", loads, lambda i: backend.load('scheduled_events'))
+            for collection in app.STORAGE_COLLECTIONS:
+                backend.clear(collection)
+    if failed:
+        print(f"Conformance failed for: {', '.join(failed)}")
+        sys.exit(1)
+
+
+BENCHMARKS = {
+    "event_saves": bench_event_saves,
+    "journal": bench_journal,
+    "event_records": bench_event_records,
+    "event_lookups": bench_event_lookups,
+    "event_timeline": bench_event_timeline,
+    "staff_leaderboard": bench_staff_leaderboard,
+    "sheet_writes": bench_sheet_writes,
+    "sheet_lookups": bench_sheet_lookups,
+    "outbox": bench_outbox,
+    "sheet_reconcile": bench_sheet_reconcile,
+    "startup": bench_startup,
+    "poster_fonts": bench_poster_fonts,
+    "poster_templates": bench_poster_templates,
+    "template_picks": bench_template_picks,
+    "poster_outline": bench_poster_outline,
+    "poster_render": bench_poster_render,
+    "poster_encoding": bench_poster_encoding,
+    "poster_cache": bench_poster_cache,
+    "storage": bench_storage,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
+        print()